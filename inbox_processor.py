@@ -5,98 +5,200 @@
 监控或批量处理文件夹中的文件，自动整理归档到知识库中。
 """
 
+import asyncio
+import os
+import queue
 import sys
+import threading
 import time
 import logging
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from functools import cached_property, lru_cache
 from pathlib import Path
-from typing import List, Optional
-from watchdog.observers import Observer
-from watchdog.events import FileSystemEventHandler
+from typing import Any, Dict, List, Optional, Tuple
 
 import click
 from colorama import init, Fore, Style
-
-# 初始化colorama
-init()
+from tqdm import tqdm
 
 # 添加src目录到路径
 sys.path.append(str(Path(__file__).parent / 'src'))
 
+from src.cli_common import common_options
 from src.config_manager import ConfigManager
 from src.file_processor import FileProcessor
-from src.llm_client import LLMClient
-from src.utils import setup_logging, print_banner
+from src.llm_client import LLMClient, SharedRequestLimits
+from src.utils import setup_logging, print_banner, forward_worker_logs, use_parent_log_queue
+
+
+# 重复事件过滤：记录有效期（秒）与最大记录数
+SEEN_TTL = 60
+SEEN_MAXSIZE = 4096
+SEEN_SHARDS = 16  # 分片数，需为2的幂
 
+# 监控事件合并：等待新事件的时间（秒）与单批最多文件数
+BATCH_DEBOUNCE = 0.5
+MAX_EVENT_BATCH = 20
 
-class InboxHandler(FileSystemEventHandler):
-    """文件夹监控处理器"""
+
+class InboxHandler:
+    """
+    文件夹监控处理器
+    
+    watchdog只在监控模式下导入，实际注册给Observer的是 _watchdog_handler_class()
+    返回的子类，它同时继承 FileSystemEventHandler 以获得事件分发。
+    """
     
     def __init__(self, processor_instance):
         self.processor = processor_instance
         self.logger = logging.getLogger(__name__)
-        # 防止重复处理的文件集合
-        self.processing_files = set()
+        # 最近处理过的文件及其过期时间，编辑器连续保存时在有效期内不重复处理
+        # 按路径哈希分片，每片独立加锁，并发处理时减少锁竞争
+        self._seen_shards: List[Tuple[Dict[str, float], threading.Lock]] = [
+            ({}, threading.Lock()) for _ in range(SEEN_SHARDS)
+        ]
+        # watchdog串行调用回调，事件放入队列由工作线程成批处理，回调立即返回
+        self.pending = queue.Queue()
+        self.worker = None
+    
+    def start(self):
+        """启动处理队列的工作线程"""
+        self.worker = threading.Thread(target=self._drain, name='inbox-worker', daemon=True)
+        self.worker.start()
+    
+    def stop(self):
+        """处理完已排队的文件后停止工作线程"""
+        if self.worker is not None:
+            self.pending.put(None)
+            self.worker.join()
+            self.worker = None
     
     def on_created(self, event):
         """文件创建时的处理"""
         if not event.is_directory:
-            file_path = Path(event.src_path)
-            # 延迟一秒确保文件完全写入
-            time.sleep(1)
-            self.process_file_safe(file_path)
+            self.processor._index_add(event.src_path)
+            # 文件可能仍在写入，处理前等待大小稳定
+            self.pending.put((event.src_path, True))
     
     def on_moved(self, event):
         """文件移动时的处理"""
         if not event.is_directory:
-            file_path = Path(event.dest_path)
-            self.process_file_safe(file_path)
+            self.processor._index_discard(event.src_path)
+            self.processor._index_add(event.dest_path)
+            self.pending.put((event.dest_path, False))
     
-    def process_file_safe(self, file_path: Path):
-        """安全处理文件（避免重复处理）"""
-        if str(file_path) in self.processing_files:
+    def on_deleted(self, event):
+        """文件删除（或移出文件夹）时的处理"""
+        if not event.is_directory:
+            self.processor._index_discard(event.src_path)
+    
+    def _drain(self):
+        """工作线程：合并短时间内到达的文件，成批处理"""
+        batch = []
+        while True:
+            try:
+                item = self.pending.get(timeout=BATCH_DEBOUNCE)
+            except queue.Empty:
+                # 一段时间内没有新文件，处理已收集的文件
+                if batch:
+                    self._flush(batch)
+                    batch = []
+                continue
+            
+            if item is None:
+                if batch:
+                    self._flush(batch)
+                return
+            
+            batch.append(item)
+            if len(batch) >= MAX_EVENT_BATCH:
+                self._flush(batch)
+                batch = []
+    
+    def _flush(self, batch: List[Tuple[str, bool]]):
+        """处理一批文件事件"""
+        files = []
+        # 过滤阶段只做字符串操作，交给处理器时才转换为Path
+        for path, wait_stable in batch:
+            if not self.processor._is_supported_name(os.path.basename(path)):
+                continue
+            if wait_stable:
+                _wait_stable(path)
+            if os.path.exists(path) and self._mark_seen(path):
+                files.append(Path(path))
+        
+        if not files:
             return
         
         try:
-            self.processing_files.add(str(file_path))
-            if file_path.exists():
-                self.processor.process_single_file(file_path)
-        finally:
-            self.processing_files.discard(str(file_path))
+            batch_size = self.processor.config.get('processing', {}).get('batch_size', 1)
+            if batch_size > 1 and len(files) > 1:
+                # 一次LLM调用分析多个文件
+                self.processor.process_batch(files, batch_size)
+            else:
+                for file_path in files:
+                    self.processor.process_single_file(file_path)
+        except Exception as e:
+            self.logger.error(f"批量处理文件失败: {e}")
+    
+    def _mark_seen(self, key: str) -> bool:
+        """记录文件，返回 False 表示该文件在有效期内已处理过"""
+        seen, lock = self._seen_shards[hash(key) & (SEEN_SHARDS - 1)]
+        with lock:
+            now = time.monotonic()
+            expires = seen.get(key)
+            if expires is not None and expires > now:
+                return False
+            
+            # 重新插入，使字典顺序与过期时间顺序一致
+            seen.pop(key, None)
+            seen[key] = now + SEEN_TTL
+            
+            # 淘汰过期记录，超出容量时淘汰最早的记录
+            while seen:
+                oldest_key, oldest_expires = next(iter(seen.items()))
+                if oldest_expires > now and len(seen) <= SEEN_MAXSIZE // SEEN_SHARDS:
+                    break
+                del seen[oldest_key]
+            
+            return True
 
 
-class InboxProcessor:
-    """文件夹批处理器"""
+@lru_cache(maxsize=None)
+def _watchdog_handler_class() -> type:
+    """构建继承 watchdog FileSystemEventHandler 的监控处理器类"""
+    from watchdog.events import FileSystemEventHandler
+    return type('WatchdogInboxHandler', (InboxHandler, FileSystemEventHandler), {})
+
+
+def _wait_stable(path: str, interval: float = 0.05, max_wait: float = 5.0) -> bool:
+    """
+    等待文件写入完成：相邻两次采样的文件大小一致即视为稳定
     
-    def __init__(self, config_path: str = None):
-        """初始化处理器"""
-        # 加载配置
-        self.config_manager = ConfigManager(config_path=config_path)
-        self.config = self.config_manager.config
-        
-        # 设置日志
-        setup_logging(self.config, verbose=True)
-        self.logger = logging.getLogger(__name__)
+    Returns:
+        文件是否在 max_wait 秒内稳定
+    """
+    deadline = time.monotonic() + max_wait
+    last_size = None
+    
+    while time.monotonic() < deadline:
+        try:
+            size = os.stat(path).st_size
+        except FileNotFoundError:
+            # 文件仍在创建中
+            size = None
         
-        # 初始化核心组件
-        self.llm_client = LLMClient(self.config)
-        self.file_processor = FileProcessor(self.config, self.llm_client)
+        if size is not None and size == last_size:
+            return True
         
-        # 设置默认文件夹路径
-        self.inbox_folder = Path("./inbox")
-        self.processed_folder = Path("./processed")
-        
-        # 创建必要的文件夹
-        self.setup_folders()
+        last_size = size
+        time.sleep(interval)
     
-    def setup_folders(self):
-        """设置必要的文件夹"""
-        self.inbox_folder.mkdir(exist_ok=True)
-        self.processed_folder.mkdir(exist_ok=True)
-        
-        # 创建说明文件
-        readme_path = self.inbox_folder / "README.md"
-        if not readme_path.exists():
-            readme_path.write_text("""# 📥 待处理文件夹
+    return False
+
+
+# 待处理文件夹中的说明文件，预先编码为字节
+_README_BYTES = """# 📥 待处理文件夹
 
 ## 使用说明
 
@@ -132,302 +234,87 @@ python inbox_processor.py --folder "你的文件夹路径"
 
 ---
 *将文件拖放到此文件夹即可开始整理！*
-""", encoding='utf-8')
-    
-    def process_all_files(self, auto_confirm: bool = False) -> dict:
-        """处理文件夹中的所有文件"""
-        print_banner()
-        
-        # 获取所有支持的文件
-        files = self.get_supported_files()
-        
-        if not files:
-            click.echo(f"{Fore.YELLOW}📂 待处理文件夹为空{Style.RESET_ALL}")
-            return {'total': 0, 'success': 0, 'failed': 0, 'skipped': 0}
-        
-        click.echo(f"{Fore.CYAN}📁 发现 {len(files)} 个待处理文件{Style.RESET_ALL}")
-        
-        if not auto_confirm:
-            if not click.confirm(f"\n🤖 是否开始智能整理这些文件？"):
-                click.echo(f"{Fore.YELLOW}❌ 用户取消操作{Style.RESET_ALL}")
-                return {'total': 0, 'success': 0, 'failed': 0, 'skipped': 0}
-        
-        # 处理所有文件
-        results = {'total': len(files), 'success': 0, 'failed': 0, 'skipped': 0}
-        
-        for i, file_path in enumerate(files, 1):
-            click.echo(f"\n{Fore.BLUE}[{i}/{len(files)}] 🔄 处理: {file_path.name}{Style.RESET_ALL}")
-            
-            try:
-                success = self.process_single_file(file_path)
-                if success:
-                    results['success'] += 1
-                else:
-                    results['skipped'] += 1
-            except Exception as e:
-                self.logger.error(f"处理文件失败 {file_path}: {e}")
-                click.echo(f"  {Fore.RED}❌ 处理失败: {str(e)}{Style.RESET_ALL}")
-                results['failed'] += 1
-        
-        # 显示处理结果
-        self.display_summary(results)
-        return results
-    
-    def process_single_file(self, file_path: Path) -> bool:
-        """处理单个文件"""
-        try:
-            # 使用文件处理器处理文件
-            result = self.file_processor.process_file(file_path, dry_run=False)
-            
-            if result['status'] == 'error':
-                click.echo(f"  {Fore.RED}❌ 分析失败: {result['error']}{Style.RESET_ALL}")
-                return False
-            
-            # 显示处理信息
-            click.echo(f"  {Fore.CYAN}🎯 主体: {result['subject']}{Style.RESET_ALL}")
-            click.echo(f"  {Fore.CYAN}📅 日期: {result['date']}{Style.RESET_ALL}")
-            click.echo(f"  {Fore.YELLOW}📝 新名称: {result['new_name']}{Style.RESET_ALL}")
-            click.echo(f"  {Fore.MAGENTA}📁 存储路径: {Path(result['target_path']).parent}{Style.RESET_ALL}")
-            
-            # 执行文件操作
-            final_result = self.file_processor.execute_operation(result)
-            
-            if final_result['status'] == 'success':
-                click.echo(f"  {Fore.GREEN}✅ 整理完成{Style.RESET_ALL}")
-                
-                # 移动原文件到已处理文件夹
-                processed_path = self.processed_folder / file_path.name
-                if file_path.exists():
-                    file_path.rename(processed_path)
-                    click.echo(f"  {Fore.BLUE}📦 原文件已移至: {processed_path}{Style.RESET_ALL}")
-                
-                return True
-            else:
-                click.echo(f"  {Fore.RED}❌ 操作失败: {final_result.get('error', '未知错误')}{Style.RESET_ALL}")
-                return False
-                
-        except Exception as e:
-            self.logger.error(f"处理文件异常 {file_path}: {e}")
-            click.echo(f"  {Fore.RED}💥 处理异常: {str(e)}{Style.RESET_ALL}")
-            return False
-    
-    def get_supported_files(self) -> List[Path]:
-        """获取文件夹中所有支持的文件"""
-        supported_extensions = self.config['file_processing']['supported_extensions']
-        files = []
-        
-        for file_path in self.inbox_folder.iterdir():
-            if file_path.is_file() and file_path.suffix.lower() in supported_extensions:
-                # 跳过README文件
-                if file_path.name.lower() != 'readme.md':
-                    files.append(file_path)
-        
-        return sorted(files)
-    
-    def watch_folder(self):
-        """监控文件夹变化"""
-        click.echo(f"{Fore.GREEN}👀 开始监控文件夹: {self.inbox_folder.absolute()}{Style.RESET_ALL}")
-        click.echo(f"{Fore.CYAN}💡 请将待处理文件拖放到上述文件夹中{Style.RESET_ALL}")
-        click.echo(f"{Fore.YELLOW}⏹️  按 Ctrl+C 停止监控{Style.RESET_ALL}\n")
-        
-        # 设置文件夹监控
-        event_handler = InboxHandler(self)
-        observer = Observer()
-        observer.schedule(event_handler, str(self.inbox_folder), recursive=False)
-        
-        try:
-            observer.start()
-            
-            # 首先处理现有文件
-            existing_files = self.get_supported_files()
-            if existing_files:
-                click.echo(f"{Fore.CYAN}📁 发现 {len(existing_files)} 个现有文件，开始处理...{Style.RESET_ALL}")
-                for file_path in existing_files:
-                    self.process_single_file(file_path)
-            
-            # 持续监控
-            while True:
-                time.sleep(1)
-                
-        except KeyboardInterrupt:
-            click.echo(f"\n{Fore.YELLOW}🛑 监控已停止{Style.RESET_ALL}")
-        finally:
-            observer.stop()
-            observer.join()
-    
-    def display_summary(self, results: dict):
-        """显示处理结果摘要"""
-        click.echo(f"\n{Fore.CYAN}{'='*50}")
-        click.echo(f"📊 批量处理完成统计:")
-        click.echo(f"  📁 总文件数: {results['total']}")
-        click.echo(f"  {Fore.GREEN}✅ 成功: {results['success']}{Style.RESET_ALL}")
-        click.echo(f"  {Fore.RED}❌ 失败: {results['failed']}{Style.RESET_ALL}")
-        if results['skipped'] > 0:
-            click.echo(f"  {Fore.YELLOW}⏭️ 跳过: {results['skipped']}{Style.RESET_ALL}")
-        click.echo(f"{'='*50}{Style.RESET_ALL}")
-
-
-@click.command()
-@click.option('--folder', '-f', type=click.Path(exists=True), 
-              help='指定待处理文件夹路径（默认: ./inbox）')
-@click.option('--config', '-c', type=click.Path(exists=True), 
-              help='配置文件路径（默认: config.yaml）')
-@click.option('--process-all', '-a', is_flag=True, 
-              help='处理文件夹中的所有文件')
-@click.option('--watch', '-w', is_flag=True, 
-              help='开启文件夹监控模式')
-@click.option('--auto-confirm', '-y', is_flag=True, 
-              help='自动确认，跳过用户确认')
-def main(folder, config, process_all, watch, auto_confirm):
-    """
-    智能文件整理助手 - 文件夹批处理版本
-    
-    将文件放入待处理文件夹，程序自动整理归档。
-    
-    使用方法：
-    1. 将文件拖放到 ./inbox/ 文件夹
-    2. 运行命令进行批量处理
-    
-    示例：
-        # 处理所有待处理文件
-        python inbox_processor.py --process-all
-        
-        # 开启监控模式
-        python inbox_processor.py --watch
-        
-        # 处理指定文件夹
-        python inbox_processor.py --folder "/path/to/files" --process-all
-    """
-    
-    try:
-        # 创建处理器实例
-        processor = InboxProcessor(config_path=config)
-        
-        # 如果指定了自定义文件夹
-        if folder:
-            processor.inbox_folder = Path(folder)
-        
-        if watch:
-            # 监控模式
-            processor.watch_folder()
-        elif process_all:
-            # 批量处理模式
-            processor.process_all_files(auto_confirm=auto_confirm)
-        else:
-            # 显示帮助信息
-            click.echo(f"{Fore.CYAN}🤖 智能文件整理助手 - 文件夹批处理版本{Style.RESET_ALL}")
-            click.echo(f"\n📁 待处理文件夹: {processor.inbox_folder.absolute()}")
-            click.echo(f"📚 知识库路径: {processor.file_processor.knowledge_base_path.absolute()}")
-            
-            files = processor.get_supported_files()
-            if files:
-                click.echo(f"\n{Fore.YELLOW}📋 发现 {len(files)} 个待处理文件：{Style.RESET_ALL}")
-                for file in files:
-                    click.echo(f"  📄 {file.name}")
-                    
-                click.echo(f"\n💡 使用以下命令开始处理：")
-                click.echo(f"  {Fore.GREEN}python inbox_processor.py --process-all{Style.RESET_ALL}")
-                click.echo(f"  {Fore.GREEN}python inbox_processor.py --watch{Style.RESET_ALL}")
-            else:
-                click.echo(f"\n{Fore.YELLOW}📂 待处理文件夹为空{Style.RESET_ALL}")
-                click.echo(f"💡 请将文件拖放到 {processor.inbox_folder} 文件夹中")
-            
-    except Exception as e:
-        click.echo(f"{Fore.RED}❌ 程序运行出错: {str(e)}{Style.RESET_ALL}")
-        logging.error(f"程序运行出错: {str(e)}", exc_info=True)
-        sys.exit(1)
+""".encode('utf-8')
 
 
-if __name__ == '__main__':
-    main() #!/usr/bin/env python3
-"""
-智能文件整理助手 - 文件夹批处理版本
+# 进程池中每个子进程持有一个处理器，复用LLM客户端的HTTP连接
+_WORKER: Optional['InboxProcessor'] = None
 
-监控或批量处理文件夹中的文件，自动整理归档到知识库中。
-"""
 
-import sys
-import time
-import logging
-from pathlib import Path
-from typing import List, Optional
-from watchdog.observers import Observer
-from watchdog.events import FileSystemEventHandler
+def _init_worker(config: Dict[str, Any], log_queue=None,
+                 llm_limits: Optional[SharedRequestLimits] = None):
+    """进程池初始化函数：每个子进程只构建一次处理器"""
+    global _WORKER
+    init()
+    # 日志文件由主进程统一写入，子进程只把记录放入队列
+    use_parent_log_queue(log_queue)
+    _WORKER = InboxProcessor(config=config)
+    # 所有进程共用一份API并发数和每分钟请求数配额
+    if llm_limits is not None:
+        _WORKER.llm_client.share_limits(llm_limits)
 
-import click
-from colorama import init, Fore, Style
-
-# 初始化colorama
-init()
-
-# 添加src目录到路径
-sys.path.append(str(Path(__file__).parent / 'src'))
 
-from src.config_manager import ConfigManager
-from src.file_processor import FileProcessor
-from src.llm_client import LLMClient
-from src.utils import setup_logging, print_banner
-
-
-class InboxHandler(FileSystemEventHandler):
-    """文件夹监控处理器"""
-    
-    def __init__(self, processor_instance):
-        self.processor = processor_instance
-        self.logger = logging.getLogger(__name__)
-        # 防止重复处理的文件集合
-        self.processing_files = set()
-    
-    def on_created(self, event):
-        """文件创建时的处理"""
-        if not event.is_directory:
-            file_path = Path(event.src_path)
-            # 延迟一秒确保文件完全写入
-            time.sleep(1)
-            self.process_file_safe(file_path)
-    
-    def on_moved(self, event):
-        """文件移动时的处理"""
-        if not event.is_directory:
-            file_path = Path(event.dest_path)
-            self.process_file_safe(file_path)
-    
-    def process_file_safe(self, file_path: Path):
-        """安全处理文件（避免重复处理）"""
-        if str(file_path) in self.processing_files:
-            return
-        
-        try:
-            self.processing_files.add(str(file_path))
-            if file_path.exists():
-                self.processor.process_single_file(file_path)
-        finally:
-            self.processing_files.discard(str(file_path))
+def _analyze_one(file_path: str) -> Dict[str, Any]:
+    """进程池工作函数：使用本进程的处理器读取文件并提取主体"""
+    return _WORKER.file_processor.analyze_file(Path(file_path))
 
 
 class InboxProcessor:
     """文件夹批处理器"""
     
-    def __init__(self, config_path: str = None):
-        """初始化处理器"""
+    # 单个文件的输出模板，每个文件只写一次终端
+    _ANALYSIS_TEMPLATE = (
+        f"  {Fore.CYAN}🎯 主体: {{subject}}{Style.RESET_ALL}\n"
+        f"  {Fore.CYAN}📅 日期: {{date}}{Style.RESET_ALL}\n"
+        f"  {Fore.YELLOW}📝 新名称: {{new_name}}{Style.RESET_ALL}\n"
+        f"  {Fore.MAGENTA}📁 存储路径: {{target_folder}}{Style.RESET_ALL}"
+    )
+    _DONE_TEMPLATE = f"  {Fore.GREEN}✅ 整理完成{Style.RESET_ALL}"
+    _MOVED_TEMPLATE = f"\n  {Fore.BLUE}📦 原文件已移至: {{processed_path}}{Style.RESET_ALL}"
+    
+    def __init__(self, config_path: str = None, config: Optional[Dict[str, Any]] = None):
+        """
+        初始化处理器
+        
+        Args:
+            config_path: 配置文件路径
+            config: 已加载的配置字典（子进程中复用父进程配置，跳过重新加载）
+        """
         # 加载配置
-        self.config_manager = ConfigManager(config_path=config_path)
-        self.config = self.config_manager.config
-        
-        # 设置日志
-        setup_logging(self.config, verbose=True)
-        self.logger = logging.getLogger(__name__)
+        if config is None:
+            self.config_manager = ConfigManager(config_path=config_path)
+            self.config = self.config_manager.config
+        else:
+            self.config_manager = None
+            self.config = config
         
-        # 初始化核心组件
-        self.llm_client = LLMClient(self.config)
-        self.file_processor = FileProcessor(self.config, self.llm_client)
+        # 静默模式下不逐个输出文件信息，只显示进度条和错误
+        self.quiet = not self.config.get('output', {}).get('verbose', True)
         
         # 设置默认文件夹路径
         self.inbox_folder = Path("./inbox")
         self.processed_folder = Path("./processed")
         
-        # 创建必要的文件夹
-        self.setup_folders()
+        # 监控模式下维护的待处理文件索引（按加入顺序），由监控事件增量更新
+        self._index: Optional[Dict[str, None]] = None
+    
+    # 日志和核心组件在首次使用时才初始化，仅列出文件等命令无需构建LLM客户端
+    @cached_property
+    def logger(self) -> logging.Logger:
+        """日志器（首次访问时设置日志系统）"""
+        setup_logging(self.config, verbose=True)
+        return logging.getLogger(__name__)
+    
+    @cached_property
+    def llm_client(self) -> LLMClient:
+        """LLM客户端"""
+        self.logger  # 确保初始化日志先于组件输出
+        return LLMClient(self.config)
+    
+    @cached_property
+    def file_processor(self) -> FileProcessor:
+        """文件处理器"""
+        return FileProcessor(self.config, self.llm_client)
     
     def setup_folders(self):
         """设置必要的文件夹"""
@@ -437,46 +324,28 @@ class InboxProcessor:
         # 创建说明文件
         readme_path = self.inbox_folder / "README.md"
         if not readme_path.exists():
-            readme_path.write_text("""# 📥 待处理文件夹
-
-## 使用说明
-
-1. **直接拖放文件**：将需要整理的文件直接拖放到此文件夹中
-2. **支持的格式**：
-   - Word文档 (.docx)
-   - Excel表格 (.xlsx) 
-   - PDF文档 (.pdf)
-   - 文本文件 (.txt)
-   - Markdown文件 (.md)
-
-3. **自动处理**：
-   - 程序会自动检测新文件
-   - 使用AI分析文档内容
-   - 自动重命名并归档到知识库
-
-4. **处理完成后**：
-   - 原文件会移动到 `../processed/` 文件夹
-   - 整理后的文件保存在 `../knowledge_base/` 中
-
-## 批量处理命令
-
-```bash
-# 处理当前文件夹中的所有文件
-python inbox_processor.py --process-all
-
-# 开启文件夹监控模式
-python inbox_processor.py --watch
-
-# 处理指定文件夹
-python inbox_processor.py --folder "你的文件夹路径"
-```
-
----
-*将文件拖放到此文件夹即可开始整理！*
-""", encoding='utf-8')
+            readme_path.write_bytes(_README_BYTES)
     
-    def process_all_files(self, auto_confirm: bool = False) -> dict:
-        """处理文件夹中的所有文件"""
+    def process_all_files(self, auto_confirm: bool = False, workers: Optional[int] = None,
+                          use_processes: Optional[bool] = None,
+                          batch_size: Optional[int] = None,
+                          use_async: Optional[bool] = None,
+                          quiet: Optional[bool] = None) -> dict:
+        """
+        处理文件夹中的所有文件
+        
+        Args:
+            auto_confirm: 是否跳过用户确认
+            workers: 并发处理的文件数，默认读取 processing.workers
+            use_processes: 是否使用多进程，默认读取 processing.use_processes
+            batch_size: 每次LLM调用包含的文件数，默认读取 processing.batch_size
+            use_async: 是否使用asyncio并发分析，默认读取 processing.use_async
+            quiet: 是否只显示进度，默认取 output.verbose 的相反值
+        """
+        if quiet is not None:
+            self.quiet = quiet
+        
+        self.setup_folders()
         print_banner()
         
         # 获取所有支持的文件
@@ -496,8 +365,36 @@ python inbox_processor.py --folder "你的文件夹路径"
         # 处理所有文件
         results = {'total': len(files), 'success': 0, 'failed': 0, 'skipped': 0}
         
-        for i, file_path in enumerate(files, 1):
-            click.echo(f"\n{Fore.BLUE}[{i}/{len(files)}] 🔄 处理: {file_path.name}{Style.RESET_ALL}")
+        processing_config = self.config.get('processing', {})
+        if workers is None:
+            workers = processing_config.get('workers', 1)
+        if use_processes is None:
+            use_processes = processing_config.get('use_processes', False)
+        if batch_size is None:
+            batch_size = processing_config.get('batch_size', 1)
+        if use_async is None:
+            use_async = processing_config.get('use_async', False)
+        
+        if batch_size > 1 and len(files) > 1:
+            results = self.process_batch(files, batch_size)
+            self.display_summary(results)
+            return results
+        
+        # 启用批处理API时同样走异步接口，请求由 LLMClient 攒批提交
+        batch_api = self.config.get('llm', {}).get('batch_api', False)
+        if (use_async and workers > 1 or batch_api) and len(files) > 1:
+            results = asyncio.run(self.process_files_async(files, workers))
+            self.display_summary(results)
+            return results
+        
+        if workers > 1 and len(files) > 1:
+            self._process_files_concurrently(files, results, workers, use_processes)
+            self.display_summary(results)
+            return results
+        
+        for i, file_path in enumerate(self._progress(files, len(files)), 1):
+            if not self.quiet:
+                click.echo(f"\n{Fore.BLUE}[{i}/{len(files)}] 🔄 处理: {file_path.name}{Style.RESET_ALL}")
             
             try:
                 success = self.process_single_file(file_path)
@@ -514,71 +411,274 @@ python inbox_processor.py --folder "你的文件夹路径"
         self.display_summary(results)
         return results
     
+    def _process_files_concurrently(self, files: List[Path], results: dict,
+                                    workers: int, use_processes: bool):
+        """
+        并发处理文件
+        
+        LLM调用以网络等待为主，默认使用线程池；文档解析占主导时可切换为进程池，
+        每个子进程由 _init_worker 构建一次处理器，供该进程的所有任务复用。
+        
+        池中只并发读取文件和提取主体；版本号、目标路径和文件移动在主线程中
+        逐个完成，当前文件归档后才确定下一个文件的目标，避免两个文件选中同一目标路径。
+        """
+        max_workers = min(workers, len(files))
+        log_listener = None
+        # 在主线程中完成组件初始化：目标路径和文件移动由主线程负责，也避免多个线程同时构建
+        self.file_processor
+        if use_processes:
+            mode = '进程'
+            log_queue, log_listener = forward_worker_logs()
+            # 每个进程各有一个LLM客户端，配置的并发数和请求速率上限由所有进程共同遵守
+            llm_limits = SharedRequestLimits(self.config)
+            self.llm_client.share_limits(llm_limits)
+            executor = ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                           initargs=(self.config, log_queue, llm_limits))
+        else:
+            mode = '线程'
+            executor = ThreadPoolExecutor(max_workers=max_workers)
+        click.echo(f"{Fore.CYAN}⚡ 使用 {workers} 个{mode}并发处理{Style.RESET_ALL}")
+        
+        try:
+            with executor:
+                if use_processes:
+                    futures = {executor.submit(_analyze_one, str(file_path)): file_path
+                               for file_path in files}
+                else:
+                    futures = {executor.submit(self.file_processor.analyze_file, file_path): file_path
+                               for file_path in files}
+                
+                for i, future in enumerate(self._progress(as_completed(futures), len(files)), 1):
+                    file_path = futures[future]
+                    if not self.quiet:
+                        click.echo(f"{Fore.BLUE}[{i}/{len(files)}] 📄 {file_path.name}{Style.RESET_ALL}")
+                    
+                    try:
+                        result = self.file_processor.build_result(future.result())
+                        if self._finalize_result(file_path, result):
+                            results['success'] += 1
+                        else:
+                            results['skipped'] += 1
+                    except Exception as e:
+                        self.logger.error(f"处理文件失败 {file_path}: {e}")
+                        click.echo(f"  {Fore.RED}❌ 处理失败: {str(e)}{Style.RESET_ALL}")
+                        results['failed'] += 1
+        finally:
+            if log_listener is not None:
+                log_listener.stop()
+    
+    async def process_files_async(self, files: List[Path], concurrency: int) -> dict:
+        """
+        使用asyncio并发分析文件
+        
+        LLM请求使用 LLMClient 的异步接口，最多 concurrency 个文件同时等待LLM响应，
+        分析完成的文件逐个确定版本号和目标路径并归档，前一个文件归档后才处理下一个，
+        文件移动不会并发进行。请求速率由 LLMClient 按 llm.requests_per_minute 限制。
+        
+        启用 llm.batch_api 时所有文件同时提交，主体提取请求最多等待
+        llm.batch_latency_budget_ms 毫秒，由批处理API攒批完成，超时后改为直接调用。
+        
+        Args:
+            files: 待处理文件列表
+            concurrency: 同时进行的分析数
+            
+        Returns:
+            处理结果统计
+        """
+        results = {'total': len(files), 'success': 0, 'failed': 0, 'skipped': 0}
+        
+        llm_config = self.config.get('llm', {})
+        latency_budget_ms = None
+        if llm_config.get('batch_api', False):
+            # 限制并发会让每批只攒到 concurrency 个请求，批处理时全部同时提交
+            latency_budget_ms = llm_config.get('batch_latency_budget_ms', 3600000)
+            concurrency = len(files)
+            click.echo(f"{Fore.CYAN}📦 通过批处理API提交 {len(files)} 个文件，"
+                       f"最长等待 {latency_budget_ms / 60000:.0f} 分钟{Style.RESET_ALL}")
+        else:
+            click.echo(f"{Fore.CYAN}⚡ 使用asyncio并发分析，最多 {concurrency} 个请求同时进行{Style.RESET_ALL}")
+        
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def analyze(file_path: Path):
+            async with semaphore:
+                return file_path, await self.file_processor.aanalyze_file(file_path,
+                                                                          latency_budget_ms=latency_budget_ms)
+        
+        loop = asyncio.get_running_loop()
+        try:
+            tasks = [asyncio.ensure_future(analyze(file_path)) for file_path in files]
+            for i, task in enumerate(self._progress(asyncio.as_completed(tasks), len(files)), 1):
+                file_path, analysis = await task
+                if not self.quiet:
+                    click.echo(f"\n{Fore.BLUE}[{i}/{len(files)}] 📄 {file_path.name}{Style.RESET_ALL}")
+                
+                try:
+                    # 版本号和目标路径在前一个文件归档后才确定，线程池中执行以免阻塞其他文件的分析
+                    result = await loop.run_in_executor(None, self.file_processor.build_result, analysis)
+                    if self._finalize_result(file_path, result):
+                        results['success'] += 1
+                    else:
+                        results['skipped'] += 1
+                except Exception as e:
+                    self.logger.error(f"处理文件失败 {file_path}: {e}")
+                    click.echo(f"  {Fore.RED}❌ 处理失败: {str(e)}{Style.RESET_ALL}")
+                    results['failed'] += 1
+        finally:
+            # 关闭绑定当前事件循环的aiohttp会话
+            await self.llm_client.aclose()
+        
+        return results
+    
     def process_single_file(self, file_path: Path) -> bool:
         """处理单个文件"""
         try:
             # 使用文件处理器处理文件
             result = self.file_processor.process_file(file_path, dry_run=False)
-            
-            if result['status'] == 'error':
-                click.echo(f"  {Fore.RED}❌ 分析失败: {result['error']}{Style.RESET_ALL}")
-                return False
-            
-            # 显示处理信息
-            click.echo(f"  {Fore.CYAN}🎯 主体: {result['subject']}{Style.RESET_ALL}")
-            click.echo(f"  {Fore.CYAN}📅 日期: {result['date']}{Style.RESET_ALL}")
-            click.echo(f"  {Fore.YELLOW}📝 新名称: {result['new_name']}{Style.RESET_ALL}")
-            click.echo(f"  {Fore.MAGENTA}📁 存储路径: {Path(result['target_path']).parent}{Style.RESET_ALL}")
-            
-            # 执行文件操作
-            final_result = self.file_processor.execute_operation(result)
-            
-            if final_result['status'] == 'success':
-                click.echo(f"  {Fore.GREEN}✅ 整理完成{Style.RESET_ALL}")
-                
-                # 移动原文件到已处理文件夹
-                processed_path = self.processed_folder / file_path.name
-                if file_path.exists():
-                    file_path.rename(processed_path)
-                    click.echo(f"  {Fore.BLUE}📦 原文件已移至: {processed_path}{Style.RESET_ALL}")
-                
-                return True
-            else:
-                click.echo(f"  {Fore.RED}❌ 操作失败: {final_result.get('error', '未知错误')}{Style.RESET_ALL}")
-                return False
+            return self._finalize_result(file_path, result)
                 
         except Exception as e:
             self.logger.error(f"处理文件异常 {file_path}: {e}")
             click.echo(f"  {Fore.RED}💥 处理异常: {str(e)}{Style.RESET_ALL}")
             return False
     
+    def process_batch(self, files: List[Path], batch_size: int) -> dict:
+        """
+        批量处理文件，每 batch_size 个文件合并为一次LLM调用
+        
+        Args:
+            files: 待处理文件列表
+            batch_size: 每次LLM调用包含的文件数
+            
+        Returns:
+            处理结果统计
+        """
+        results = {'total': len(files), 'success': 0, 'failed': 0, 'skipped': 0}
+        click.echo(f"{Fore.CYAN}📦 每 {batch_size} 个文件合并为一次LLM调用{Style.RESET_ALL}")
+        
+        # 逐个消费结果：当前文件归档后才生成下一个结果，保证版本号判断正确
+        analyses = self.file_processor.process_files(files, batch_size=batch_size)
+        for i, (file_path, result) in enumerate(self._progress(zip(files, analyses), len(files)), 1):
+            if not self.quiet:
+                click.echo(f"\n{Fore.BLUE}[{i}/{len(files)}] 🔄 处理: {file_path.name}{Style.RESET_ALL}")
+            
+            try:
+                if self._finalize_result(file_path, result):
+                    results['success'] += 1
+                else:
+                    results['skipped'] += 1
+            except Exception as e:
+                self.logger.error(f"处理文件失败 {file_path}: {e}")
+                click.echo(f"  {Fore.RED}❌ 处理失败: {str(e)}{Style.RESET_ALL}")
+                results['failed'] += 1
+        
+        return results
+    
+    def _finalize_result(self, file_path: Path, result: Dict[str, Any]) -> bool:
+        """显示分析结果并执行文件操作"""
+        if result['status'] == 'error':
+            click.echo(f"  {Fore.RED}❌ 分析失败: {result['error']}{Style.RESET_ALL}")
+            return False
+        
+        # 显示处理信息
+        if not self.quiet:
+            click.echo(self._ANALYSIS_TEMPLATE.format(**result))
+        
+        # 执行文件操作
+        final_result = self.file_processor.execute_operation(result)
+        
+        if final_result['status'] == 'success':
+            message = self._DONE_TEMPLATE
+            
+            # 移动原文件到已处理文件夹
+            # os.replace 在各平台都会覆盖同名文件；原文件已不存在时直接跳过
+            processed_path = self.processed_folder / file_path.name
+            try:
+                os.replace(file_path, processed_path)
+                message += self._MOVED_TEMPLATE.format(processed_path=processed_path)
+            except FileNotFoundError:
+                pass
+            self._index_discard(str(file_path))
+            
+            if not self.quiet:
+                click.echo(message)
+            return True
+        else:
+            click.echo(f"  {Fore.RED}❌ 操作失败: {final_result.get('error', '未知错误')}{Style.RESET_ALL}")
+            return False
+    
+    def _progress(self, iterable, total: int):
+        """静默模式下用进度条包装迭代器"""
+        if self.quiet:
+            return tqdm(iterable, total=total, unit='个文件', mininterval=0.1)
+        return iterable
+    
     def get_supported_files(self) -> List[Path]:
         """获取文件夹中所有支持的文件"""
-        supported_extensions = self.config['file_processing']['supported_extensions']
-        files = []
-        
-        for file_path in self.inbox_folder.iterdir():
-            if file_path.is_file() and file_path.suffix.lower() in supported_extensions:
-                # 跳过README文件
-                if file_path.name.lower() != 'readme.md':
-                    files.append(file_path)
+        if self._index is not None:
+            # 监控模式下索引已随事件更新，无需重新扫描和排序
+            return [Path(path) for path in list(self._index)]
         
-        return sorted(files)
+        return [Path(path) for path in self._scan_inbox()]
+    
+    def _scan_inbox(self) -> List[str]:
+        """扫描待处理文件夹，返回排序后的支持文件路径"""
+        # DirEntry.is_file 直接使用目录读取时返回的文件类型，无需逐个stat；
+        # 扫描和排序都使用字符串路径，最后才转换为Path
+        try:
+            with os.scandir(self.inbox_folder) as entries:
+                paths = [
+                    entry.path for entry in entries
+                    if entry.is_file() and self._is_supported_name(entry.name)
+                ]
+        except FileNotFoundError:
+            # 文件夹尚未创建（仅查看状态时不会创建文件夹）
+            return []
+        
+        paths.sort()
+        return paths
+    
+    def _is_supported_name(self, name: str) -> bool:
+        """文件名是否为需要处理的文件（支持的扩展名且不是README）"""
+        supported_extensions = self.config['file_processing']['supported_extensions']
+        return (os.path.splitext(name)[1].lower() in supported_extensions
+                and name.lower() != 'readme.md')
+    
+    def _index_add(self, path: str):
+        """监控事件：文件加入待处理索引"""
+        if self._index is not None and self._is_supported_name(os.path.basename(path)):
+            self._index[path] = None
+    
+    def _index_discard(self, path: str):
+        """监控事件：文件移出待处理索引"""
+        if self._index is not None:
+            self._index.pop(path, None)
     
     def watch_folder(self):
         """监控文件夹变化"""
+        self.setup_folders()
         click.echo(f"{Fore.GREEN}👀 开始监控文件夹: {self.inbox_folder.absolute()}{Style.RESET_ALL}")
         click.echo(f"{Fore.CYAN}💡 请将待处理文件拖放到上述文件夹中{Style.RESET_ALL}")
         click.echo(f"{Fore.YELLOW}⏹️  按 Ctrl+C 停止监控{Style.RESET_ALL}\n")
         
+        # 仅监控模式需要watchdog，延迟导入以免拖慢其它命令的启动
+        from watchdog.observers import Observer
+        
         # 设置文件夹监控
-        event_handler = InboxHandler(self)
+        event_handler = _watchdog_handler_class()(self)
         observer = Observer()
         observer.schedule(event_handler, str(self.inbox_folder), recursive=False)
         
+        # 监控线程与主线程共用处理器，先完成初始化
+        self.file_processor
+        
         try:
+            event_handler.start()
             observer.start()
             
+            # 建立待处理文件索引，之后由监控事件增量维护
+            self._index = dict.fromkeys(self._scan_inbox())
+            
             # 首先处理现有文件
             existing_files = self.get_supported_files()
             if existing_files:
@@ -595,31 +695,38 @@ python inbox_processor.py --folder "你的文件夹路径"
         finally:
             observer.stop()
             observer.join()
+            event_handler.stop()
+            self._index = None
     
     def display_summary(self, results: dict):
         """显示处理结果摘要"""
-        click.echo(f"\n{Fore.CYAN}{'='*50}")
-        click.echo(f"📊 批量处理完成统计:")
-        click.echo(f"  📁 总文件数: {results['total']}")
-        click.echo(f"  {Fore.GREEN}✅ 成功: {results['success']}{Style.RESET_ALL}")
-        click.echo(f"  {Fore.RED}❌ 失败: {results['failed']}{Style.RESET_ALL}")
+        lines = [
+            f"\n{Fore.CYAN}{'='*50}",
+            f"📊 批量处理完成统计:",
+            f"  📁 总文件数: {results['total']}",
+            f"  {Fore.GREEN}✅ 成功: {results['success']}{Style.RESET_ALL}",
+            f"  {Fore.RED}❌ 失败: {results['failed']}{Style.RESET_ALL}",
+        ]
         if results['skipped'] > 0:
-            click.echo(f"  {Fore.YELLOW}⏭️ 跳过: {results['skipped']}{Style.RESET_ALL}")
-        click.echo(f"{'='*50}{Style.RESET_ALL}")
+            lines.append(f"  {Fore.YELLOW}⏭️ 跳过: {results['skipped']}{Style.RESET_ALL}")
+        lines.append(f"{'='*50}{Style.RESET_ALL}")
+        click.echo('\n'.join(lines))
 
 
 @click.command()
-@click.option('--folder', '-f', type=click.Path(exists=True), 
-              help='指定待处理文件夹路径（默认: ./inbox）')
-@click.option('--config', '-c', type=click.Path(exists=True), 
-              help='配置文件路径（默认: config.yaml）')
+@common_options
 @click.option('--process-all', '-a', is_flag=True, 
               help='处理文件夹中的所有文件')
-@click.option('--watch', '-w', is_flag=True, 
-              help='开启文件夹监控模式')
-@click.option('--auto-confirm', '-y', is_flag=True, 
-              help='自动确认，跳过用户确认')
-def main(folder, config, process_all, watch, auto_confirm):
+@click.option('--batch-size', '-b', type=click.IntRange(min=1), default=None,
+              help='每次LLM调用包含的文件数（默认: 配置文件中的 processing.batch_size）')
+@click.option('--use-processes', is_flag=True, default=None,
+              help='使用多进程代替多线程并发处理')
+@click.option('--async', 'use_async', is_flag=True, default=None,
+              help='使用asyncio并发调用LLM（并发数由 --workers 指定）')
+@click.option('--quiet', '-q', is_flag=True, default=None,
+              help='只显示进度条和错误，不逐个输出文件信息')
+def main(folder, config, process_all, watch, auto_confirm, workers, batch_size, use_processes,
+         use_async, quiet):
     """
     智能文件整理助手 - 文件夹批处理版本
     
@@ -638,7 +745,15 @@ def main(folder, config, process_all, watch, auto_confirm):
         
         # 处理指定文件夹
         python inbox_processor.py --folder "/path/to/files" --process-all
+        
+        # 4个线程并发处理
+        python inbox_processor.py --process-all --workers 4
+        
+        # 每10个文件合并为一次LLM调用
+        python inbox_processor.py --process-all --batch-size 10
     """
+    # 初始化colorama（仅命令行入口需要，作为模块导入时不修改终端输出）
+    init()
     
     try:
         # 创建处理器实例
@@ -653,7 +768,9 @@ def main(folder, config, process_all, watch, auto_confirm):
             processor.watch_folder()
         elif process_all:
             # 批量处理模式
-            processor.process_all_files(auto_confirm=auto_confirm)
+            processor.process_all_files(auto_confirm=auto_confirm, workers=workers,
+                                        use_processes=use_processes, batch_size=batch_size,
+                                        use_async=use_async, quiet=quiet)
         else:
             # 显示帮助信息
             click.echo(f"{Fore.CYAN}🤖 智能文件整理助手 - 文件夹批处理版本{Style.RESET_ALL}")
@@ -680,4 +797,4 @@ def main(folder, config, process_all, watch, auto_confirm):
 
 
 if __name__ == '__main__':
-    main() 
+    main()
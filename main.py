@@ -10,30 +10,21 @@ import click
 from pathlib import Path
 from colorama import init, Fore, Style
 
-# 初始化colorama
-init()
-
 # 添加项目根目录到Python路径
 project_root = Path(__file__).parent
 sys.path.insert(0, str(project_root))
 
 from inbox_processor import InboxProcessor
+from src.cli_common import common_options
 
 
 @click.command()
-@click.option('--folder', '-f', type=click.Path(exists=True), 
-              help='指定待处理文件夹路径（默认: ./inbox）')
-@click.option('--config', '-c', type=click.Path(exists=True), 
-              help='配置文件路径（默认: config.yaml）')
-@click.option('--watch', '-w', is_flag=True, 
-              help='开启文件夹监控模式，自动处理新文件')
-@click.option('--auto-confirm', '-y', is_flag=True, 
-              help='自动确认，跳过用户确认')
+@common_options
 @click.option('--verbose', '-v', is_flag=True, 
               help='显示详细处理信息')
 @click.option('--check', is_flag=True, 
               help='检查环境和配置')
-def main(folder, config, watch, auto_confirm, verbose, check):
+def main(folder, config, watch, auto_confirm, workers, verbose, check):
     """
     🤖 智能文件整理助手
     
@@ -56,7 +47,12 @@ def main(folder, config, watch, auto_confirm, verbose, check):
     
     4. 自动确认处理：
        python main.py -y
+    
+    5. 并发处理：
+       python main.py -j 4
     """
+    # 初始化colorama
+    init()
     
     if check:
         check_environment()
@@ -78,7 +74,7 @@ def main(folder, config, watch, auto_confirm, verbose, check):
             processor.watch_folder()
         else:
             # 批量处理模式
-            results = processor.process_all_files(auto_confirm=auto_confirm)
+            results = processor.process_all_files(auto_confirm=auto_confirm, workers=workers)
             
             # 提示用户可以开启监控模式
             if results['total'] > 0:
@@ -126,9 +122,8 @@ def check_environment():
         
         # 检查API密钥
         try:
-            import yaml
-            with open(config_file, 'r', encoding='utf-8') as f:
-                config = yaml.safe_load(f)
+            from src.config_manager import load_yaml
+            config = load_yaml(config_file)
             
             api_key = config.get('llm', {}).get('api_key', '')
             env_api_key = os.getenv('SMARTFILEORG_LLM_API_KEY')
@@ -0,0 +1,288 @@
+"""
+批量API调度器
+将延迟不敏感的LLM请求攒批后通过服务商的Batch API提交（OpenAI /batches、Anthropic Message Batches），
+费用约为单次请求的一半，并分摊了每次请求的开销
+"""
+
+import json
+import time
+import asyncio
+import logging
+from typing import Dict, Any, List, Optional
+
+
+class BatchDispatcher:
+    """批量API调度器，submit 的请求在攒够数量或等待超时后一次性提交"""
+
+    # 批处理任务的终止状态
+    _OPENAI_FAILED = ('failed', 'expired', 'cancelled')
+
+    def __init__(self, llm_client, window_ms: int = 30000, min_size: int = 10,
+                 poll_interval: float = 30):
+        """
+        初始化批量调度器
+
+        Args:
+            llm_client: LLMClient 实例，复用其HTTP会话和请求构建逻辑
+            window_ms: 第一个请求进入队列后最多等待的毫秒数
+            min_size: 队列达到该数量时立即提交
+            poll_interval: 查询批处理任务状态的间隔秒数
+        """
+        self.client = llm_client
+        self.window_ms = window_ms
+        self.min_size = min_size
+        self.poll_interval = poll_interval
+        self.logger = logging.getLogger(__name__)
+
+        self._pending = []
+        self._timer = None
+        self._tasks = set()
+
+    async def submit(self, prompt: str, max_tokens: int = 1000,
+                     latency_budget_ms: Optional[int] = None) -> str:
+        """
+        提交请求并等待批处理结果
+
+        Args:
+            prompt: 提示词
+            max_tokens: 最大输出token数
+            latency_budget_ms: 调用方可接受的最长等待时间，批处理超时后抛出 asyncio.TimeoutError
+
+        Returns:
+            LLM响应文本
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((prompt, max_tokens, latency_budget_ms, future))
+
+        if len(self._pending) >= self.min_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_ms / 1000, self._flush)
+
+        return await future
+
+    async def drain(self):
+        """立即提交队列中的请求，并等待所有进行中的批处理任务结束"""
+        self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _flush(self):
+        """将当前队列作为一个批处理任务提交"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+
+        items, self._pending = self._pending, []
+        task = asyncio.ensure_future(self._run_batch(items))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, items: List[tuple]):
+        """提交批处理任务并把结果分发给各个请求"""
+        budgets = [budget for _, _, budget, _ in items if budget]
+        deadline = time.monotonic() + min(budgets) / 1000 if budgets else None
+
+        loop = asyncio.get_running_loop()
+        provider = self.client.config.get('provider', 'openai').lower()
+        try:
+            requests_ = [(f"req-{index}", prompt, max_tokens)
+                         for index, (prompt, max_tokens, _, _) in enumerate(items)]
+            self.logger.info(f"提交批处理任务: {len(items)} 个请求")
+
+            if provider == 'openai':
+                batch_id = await loop.run_in_executor(None, self._create_openai_batch, requests_)
+                results = await self._wait_for_batch(self._poll_openai_batch, self._cancel_openai_batch,
+                                                     batch_id, deadline)
+            elif provider == 'anthropic':
+                batch_id = await loop.run_in_executor(None, self._create_anthropic_batch, requests_)
+                results = await self._wait_for_batch(self._poll_anthropic_batch, self._cancel_anthropic_batch,
+                                                     batch_id, deadline)
+            else:
+                raise ValueError(f"提供商不支持批处理API: {provider}")
+        except Exception as e:
+            self.logger.error(f"批处理任务失败: {e}")
+            for _, _, _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for index, (_, _, _, future) in enumerate(items):
+            if future.done():
+                continue
+            result = results.get(f"req-{index}")
+            if result is None:
+                future.set_exception(Exception("批处理结果中缺少该请求"))
+            else:
+                future.set_result(result)
+
+    async def _wait_for_batch(self, poll, cancel, batch_id: str, deadline: Optional[float]) -> Dict[str, str]:
+        """轮询批处理任务直到完成；超过调用方的延迟预算时取消任务并抛出 asyncio.TimeoutError"""
+        loop = asyncio.get_running_loop()
+        while True:
+            results = await loop.run_in_executor(None, poll, batch_id)
+            if results is not None:
+                return results
+            if deadline is not None and time.monotonic() + self.poll_interval > deadline:
+                # 超时后调用方会改为直接请求，先取消批处理任务，避免同一请求被计费两次
+                await loop.run_in_executor(None, self._cancel_batch, cancel, batch_id)
+                raise asyncio.TimeoutError(f"批处理任务 {batch_id} 超出延迟预算")
+            await asyncio.sleep(self.poll_interval)
+
+    def _cancel_batch(self, cancel, batch_id: str):
+        """取消批处理任务，失败时只记录警告"""
+        try:
+            cancel(batch_id)
+            self.logger.info(f"已取消批处理任务: {batch_id}")
+        except Exception as e:
+            self.logger.warning(f"取消批处理任务失败 {batch_id}: {e}")
+
+    def _get_json(self, url: str, headers: Dict[str, str]) -> Dict[str, Any]:
+        """GET请求并解析JSON响应"""
+        response = self.client.session.get(url, headers=headers, timeout=self.client.config.get('timeout', 30))
+        if response.status_code != 200:
+            raise Exception(f"API调用失败: {response.status_code} - {response.text}")
+        return response.json()
+
+    def _create_openai_batch(self, requests_: List[tuple]) -> str:
+        """上传NDJSON请求文件并创建OpenAI批处理任务"""
+        lines = []
+        for custom_id, prompt, max_tokens in requests_:
+            url, headers, data = self.client._build_openai_request(prompt, max_tokens)
+            lines.append(json.dumps({
+                'custom_id': custom_id,
+                'method': 'POST',
+                'url': '/v1/chat/completions',
+                'body': data
+            }, ensure_ascii=False))
+
+        base_url = url.rsplit('/chat/completions', 1)[0]
+        auth = {'Authorization': headers['Authorization']}
+        timeout = self.client.config.get('timeout', 30)
+
+        response = self.client.session.post(
+            f"{base_url}/files",
+            headers=auth,
+            data={'purpose': 'batch'},
+            files={'file': ('batch.jsonl', '\n'.join(lines).encode('utf-8'))},
+            timeout=timeout
+        )
+        if response.status_code != 200:
+            raise Exception(f"上传批处理文件失败: {response.status_code} - {response.text}")
+
+        response = self.client.session.post(
+            f"{base_url}/batches",
+            headers=auth,
+            json={
+                'input_file_id': response.json()['id'],
+                'endpoint': '/v1/chat/completions',
+                'completion_window': '24h'
+            },
+            timeout=timeout
+        )
+        if response.status_code != 200:
+            raise Exception(f"创建批处理任务失败: {response.status_code} - {response.text}")
+        return response.json()['id']
+
+    def _poll_openai_batch(self, batch_id: str) -> Optional[Dict[str, str]]:
+        """查询OpenAI批处理任务，未完成时返回 None"""
+        url, headers, _ = self.client._build_openai_request('', 0)
+        base_url = url.rsplit('/chat/completions', 1)[0]
+        auth = {'Authorization': headers['Authorization']}
+
+        batch = self._get_json(f"{base_url}/batches/{batch_id}", auth)
+        status = batch.get('status')
+        if status in self._OPENAI_FAILED:
+            raise Exception(f"批处理任务 {batch_id} 状态异常: {status}")
+        if status != 'completed':
+            return None
+
+        response = self.client.session.get(
+            f"{base_url}/files/{batch['output_file_id']}/content",
+            headers=auth,
+            timeout=self.client.config.get('timeout', 30)
+        )
+        if response.status_code != 200:
+            raise Exception(f"下载批处理结果失败: {response.status_code} - {response.text}")
+
+        results = {}
+        for line in response.text.splitlines():
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            body = (entry.get('response') or {}).get('body') or {}
+            if body.get('choices'):
+                results[entry['custom_id']] = body['choices'][0]['message']['content']
+        return results
+
+    def _cancel_openai_batch(self, batch_id: str):
+        """取消OpenAI批处理任务"""
+        url, headers, _ = self.client._build_openai_request('', 0)
+        base_url = url.rsplit('/chat/completions', 1)[0]
+        auth = {'Authorization': headers['Authorization']}
+
+        response = self.client.session.post(
+            f"{base_url}/batches/{batch_id}/cancel",
+            headers=auth,
+            timeout=self.client.config.get('timeout', 30)
+        )
+        if response.status_code != 200:
+            raise Exception(f"API调用失败: {response.status_code} - {response.text}")
+
+    def _create_anthropic_batch(self, requests_: List[tuple]) -> str:
+        """创建Anthropic消息批处理任务"""
+        batch_requests = []
+        for custom_id, prompt, max_tokens in requests_:
+            url, headers, data = self.client._build_anthropic_request(prompt, max_tokens)
+            batch_requests.append({'custom_id': custom_id, 'params': data})
+
+        response = self.client.session.post(
+            f"{url}/batches",
+            headers=headers,
+            json={'requests': batch_requests},
+            timeout=self.client.config.get('timeout', 30)
+        )
+        if response.status_code != 200:
+            raise Exception(f"创建批处理任务失败: {response.status_code} - {response.text}")
+        return response.json()['id']
+
+    def _poll_anthropic_batch(self, batch_id: str) -> Optional[Dict[str, str]]:
+        """查询Anthropic消息批处理任务，未完成时返回 None"""
+        url, headers, _ = self.client._build_anthropic_request('', 0)
+
+        batch = self._get_json(f"{url}/batches/{batch_id}", headers)
+        if batch.get('processing_status') != 'ended':
+            return None
+
+        response = self.client.session.get(
+            batch['results_url'],
+            headers=headers,
+            timeout=self.client.config.get('timeout', 30)
+        )
+        if response.status_code != 200:
+            raise Exception(f"下载批处理结果失败: {response.status_code} - {response.text}")
+
+        results = {}
+        for line in response.text.splitlines():
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            result = entry.get('result') or {}
+            if result.get('type') == 'succeeded':
+                results[entry['custom_id']] = result['message']['content'][0]['text']
+        return results
+
+    def _cancel_anthropic_batch(self, batch_id: str):
+        """取消Anthropic消息批处理任务"""
+        url, headers, _ = self.client._build_anthropic_request('', 0)
+
+        response = self.client.session.post(
+            f"{url}/batches/{batch_id}/cancel",
+            headers=headers,
+            timeout=self.client.config.get('timeout', 30)
+        )
+        if response.status_code != 200:
+            raise Exception(f"API调用失败: {response.status_code} - {response.text}")
@@ -0,0 +1,27 @@
+"""
+命令行公共选项
+main.py 与 inbox_processor.py 共用的click选项定义
+"""
+
+import click
+
+
+folder_option = click.option('--folder', '-f', type=click.Path(exists=True),
+                             help='指定待处理文件夹路径（默认: ./inbox）')
+config_option = click.option('--config', '-c', type=click.Path(exists=True),
+                             help='配置文件路径（默认: config.yaml）')
+watch_option = click.option('--watch', '-w', is_flag=True,
+                            help='开启文件夹监控模式，自动处理新文件')
+auto_confirm_option = click.option('--auto-confirm', '-y', is_flag=True,
+                                   help='自动确认，跳过用户确认')
+workers_option = click.option('--workers', '-j', type=click.IntRange(min=1), default=None,
+                              help='并发处理的文件数（默认: 配置文件中的 processing.workers）')
+
+
+def common_options(f):
+    """为命令添加公共选项：--folder、--config、--watch、--auto-confirm、--workers"""
+    # 逆序应用，使 --help 中的顺序与列表一致
+    for option in reversed((folder_option, config_option, watch_option,
+                            auto_confirm_option, workers_option)):
+        f = option(f)
+    return f
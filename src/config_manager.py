@@ -3,10 +3,26 @@
 负责加载配置文件，管理运行时配置，处理环境变量等
 """
 
+import copy
 import os
 import yaml
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
+
+# 优先使用libyaml的C实现解析配置
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+# 已解析的配置，按 (路径, 修改时间) 缓存，文件修改后自动失效
+_CONFIG_CACHE: Dict[Tuple[str, float], Dict[str, Any]] = {}
+
+
+def load_yaml(path) -> Any:
+    """使用安全加载器读取YAML文件（libyaml可用时使用C实现）"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return yaml.load(f, Loader=SafeLoader)
 
 
 class ConfigManager:
@@ -20,8 +36,11 @@ class ConfigManager:
             config_path: 配置文件路径，默认为 config.yaml
         """
         self.config_path = config_path or "config.yaml"
-        self.config = self._load_config()
+        self.config = self._normalize_config(self._load_config())
         self._apply_env_overrides()
+        
+        # 验证结果在首次使用时计算并缓存，修改配置后失效
+        self._validation: Optional[Tuple[bool, List[str]]] = None
     
     def _load_config(self) -> Dict[str, Any]:
         """加载配置文件"""
@@ -32,12 +51,16 @@ class ConfigManager:
             return default_config
         
         try:
-            with open(self.config_path, 'r', encoding='utf-8') as f:
-                file_config = yaml.safe_load(f)
+            cache_key = (os.path.abspath(self.config_path), os.path.getmtime(self.config_path))
+            if cache_key in _CONFIG_CACHE:
+                return copy.deepcopy(_CONFIG_CACHE[cache_key])
+            
+            file_config = load_yaml(self.config_path)
             
             # 合并配置，文件配置覆盖默认配置
             merged_config = self._merge_config(default_config, file_config)
-            return merged_config
+            _CONFIG_CACHE[cache_key] = merged_config
+            return copy.deepcopy(merged_config)
             
         except Exception as e:
             print(f"加载配置文件失败: {e}")
@@ -52,7 +75,15 @@ class ConfigManager:
                 'api_key': '',
                 'base_url': '',
                 'model': 'gpt-3.5-turbo',
-                'timeout': 30
+                'timeout': 30,
+                'max_concurrent_requests': 4,
+                'requests_per_minute': 0,
+                'max_retries': 3,
+                'stream': False,
+                'json_mode': False,
+                'prewarm': True,
+                'cache_dir': '.llm_cache',
+                'cache_ttl_days': 30
             },
             'knowledge_base': {
                 'root_path': './knowledge_base',
@@ -65,6 +96,12 @@ class ConfigManager:
                 'version_format': 'simple',
                 'date_format': '%Y%m%d'
             },
+            'processing': {
+                'workers': 1,
+                'use_processes': False,
+                'batch_size': 1,
+                'use_async': False
+            },
             'date_extraction': {
                 'priority': ['content_date', 'creation_date', 'modification_date', 'current_date']
             },
@@ -76,7 +113,9 @@ class ConfigManager:
             'output': {
                 'verbose': True,
                 'colored_output': True,
-                'log_file': './file_organizer.log'
+                'log_file': './file_organizer.log',
+                'log_max_bytes': 10 * 1024 * 1024,
+                'log_backup_count': 5
             }
         }
     
@@ -92,6 +131,15 @@ class ConfigManager:
         
         return result
     
+    def _normalize_config(self, config: Dict[str, Any]) -> Dict[str, Any]:
+        """规范化配置值"""
+        # 扩展名统一小写并转为frozenset，按文件过滤时为O(1)查找
+        file_processing = config['file_processing']
+        file_processing['supported_extensions'] = frozenset(
+            ext.lower() for ext in file_processing.get('supported_extensions') or ()
+        )
+        return config
+    
     def _apply_env_overrides(self):
         """应用环境变量覆盖"""
         # API密钥从环境变量获取
@@ -107,10 +155,12 @@ class ConfigManager:
     def set_knowledge_base_path(self, path: str):
         """设置知识库路径"""
         self.config['knowledge_base']['root_path'] = path
+        self._validation = None
     
     def set_api_key(self, api_key: str):
         """设置API密钥"""
         self.config['llm']['api_key'] = api_key
+        self._validation = None
     
     def get_knowledge_base_path(self) -> Path:
         """获取知识库路径"""
@@ -120,13 +170,29 @@ class ConfigManager:
         """获取LLM配置"""
         return self.config['llm'].copy()
     
-    def validate_config(self) -> tuple[bool, list[str]]:
+    def validate_config(self) -> Tuple[bool, List[str]]:
         """
-        验证配置的有效性
+        验证配置的有效性（结果会被缓存）
         
         Returns:
             (is_valid, error_messages)
         """
+        if self._validation is None:
+            self._validation = self._validate()
+        return self._validation[0], list(self._validation[1])
+    
+    @property
+    def is_valid(self) -> bool:
+        """配置是否有效"""
+        return self.validate_config()[0]
+    
+    @property
+    def errors(self) -> List[str]:
+        """配置错误信息"""
+        return self.validate_config()[1]
+    
+    def _validate(self) -> Tuple[bool, List[str]]:
+        """执行配置验证"""
         errors = []
         
         # 检查API密钥
@@ -134,12 +200,17 @@ class ConfigManager:
             errors.append("未配置LLM API密钥，请设置环境变量 SMARTFILEORG_LLM_API_KEY 或在配置文件中指定")
         
         # 检查知识库路径
-        kb_path = Path(self.config['knowledge_base']['root_path'])
-        if not kb_path.parent.exists():
-            errors.append(f"知识库父目录不存在: {kb_path.parent}")
+        kb_parent = Path(self.config['knowledge_base']['root_path']).parent
+        if not kb_parent.exists():
+            errors.append(f"知识库父目录不存在: {kb_parent}")
         
         # 检查支持的文件扩展名
-        if not self.config['file_processing']['supported_extensions']:
+        supported_extensions = self.config['file_processing']['supported_extensions']
+        if not supported_extensions:
             errors.append("未配置支持的文件扩展名")
         
+        invalid_extensions = sorted(ext for ext in supported_extensions if not ext.startswith('.'))
+        if invalid_extensions:
+            errors.append(f"文件扩展名需以 . 开头: {', '.join(invalid_extensions)}")
+        
         return len(errors) == 0, errors 
\ No newline at end of file
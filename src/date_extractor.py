@@ -3,13 +3,112 @@
 从文档内容、元数据和文件属性中提取日期信息
 """
 
+import io
 import re
+import time
 import logging
-from datetime import datetime
-from typing import Dict, Any, Optional, List
+from datetime import date, datetime, timedelta
+from typing import Dict, Any, Optional
 from pathlib import Path
 
 
+# 日期格式分两组匹配，每组合并为一个正则，一次扫描找出该组全部候选日期；
+# 每种格式用外层命名组标识，匹配后通过 lastgroup 区分。
+# 各格式都放在零宽前瞻中，匹配不消耗字符：校验失败的候选（如长数字串中的8位数字）
+# 不会吞掉后面另一个日期的开头，与逐个格式分别扫描的结果一致。
+# 年份在前的格式最常见且误匹配少，先单独扫描；
+# 年份在后的美式/欧式格式只在前者没有找到有效日期时才扫描
+_YEAR_FIRST_DATE_RE = re.compile(
+    # YYYY-MM-DD 格式
+    r'(?=(?P<iso>(?P<iso_y>\d{4})[/-](?P<iso_m>\d{1,2})[/-](?P<iso_d>\d{1,2})))'
+    # YYYY年MM月DD日 格式
+    r'|(?=(?P<cn>(?P<cn_y>\d{4})年(?P<cn_m>\d{1,2})月(?P<cn_d>\d{1,2})日))'
+    # YYYYMMDD 格式（只从数字串开头匹配，不在长数字串中逐位滑动）
+    r'|(?<!\d)(?=(?P<compact>(?P<compact_y>\d{4})(?P<compact_m>\d{2})(?P<compact_d>\d{2})))'
+)
+
+_YEAR_LAST_DATE_RE = re.compile(
+    # MM/DD/YYYY 格式
+    r'(?=(?P<us>(?P<us_m>\d{1,2})[/-](?P<us_d>\d{1,2})[/-](?P<us_y>\d{4})))'
+    # DD.MM.YYYY 格式
+    r'|(?=(?P<eu>(?P<eu_d>\d{1,2})\.(?P<eu_m>\d{1,2})\.(?P<eu_y>\d{4})))'
+)
+
+# 所有日期格式都包含连续4位数字（年份），不含的文本无需运行日期正则
+_DATE_HINT_RE = re.compile(r'\d{4}')
+
+# 内容日期扫描的字符上限
+MAX_SCAN_CHARS = 64 * 1024
+
+# 内容日期的最高置信度：最高格式置信度0.9 + 关键词加成0.3
+MAX_CONTENT_CONFIDENCE = 1.2
+
+# 格式名 -> (优先顺序, 置信度, 年/月/日分组名)
+# 年份在后的格式置信度都低于年份在前的格式，因此分组扫描不改变最佳结果
+_DATE_FORMATS = {
+    'iso': (0, 0.9, 'iso_y', 'iso_m', 'iso_d'),                          # 最标准
+    'cn': (1, 0.9, 'cn_y', 'cn_m', 'cn_d'),                              # 中文标准
+    'us': (2, 0.7, 'us_y', 'us_m', 'us_d'),                              # 美式
+    'eu': (3, 0.7, 'eu_y', 'eu_m', 'eu_d'),                              # 欧式
+    'compact': (4, 0.8, 'compact_y', 'compact_m', 'compact_d'),          # 紧凑
+}
+
+
+# 每月天数（平年）
+_DAYS_IN_MONTH = (0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+
+def _is_valid_date(year: int, month: int, day: int) -> bool:
+    """校验年月日是否构成有效日期（范围与datetime一致），无需构造datetime对象"""
+    if not (1 <= year <= 9999 and 1 <= month <= 12 and day >= 1):
+        return False
+    if month == 2 and year % 4 == 0 and (year % 100 != 0 or year % 400 == 0):
+        return day <= 29
+    return day <= _DAYS_IN_MONTH[month]
+
+
+def _fast_format(ymd: tuple, date_format: str) -> str:
+    """格式化已校验的 (年, 月, 日)，常用格式直接拼接字符串"""
+    year, month, day = ymd
+    if date_format == '%Y%m%d':
+        return f"{year:04d}{month:02d}{day:02d}"
+    if date_format == '%Y-%m-%d':
+        return f"{year:04d}-{month:02d}-{day:02d}"
+    if date_format == '%Y年%m月%d日':
+        return f"{year:04d}年{month:02d}月{day:02d}日"
+    return date(year, month, day).strftime(date_format)
+
+
+# 当天日期缓存：(失效时间戳, 当天日期, {日期格式: 格式化结果})，本地时间零点后失效
+_TODAY_CACHE = (0.0, None, {})
+
+
+def _today_cache() -> tuple:
+    """获取当天的缓存元组，已过零点时先换成新的一天"""
+    global _TODAY_CACHE
+    cache = _TODAY_CACHE
+    if time.time() >= cache[0]:
+        today = date.today()
+        next_midnight = datetime.combine(today + timedelta(days=1), datetime.min.time()).timestamp()
+        # 整体替换元组，多线程下不会读到不一致的状态
+        cache = _TODAY_CACHE = (next_midnight, today, {})
+    return cache
+
+
+def get_today() -> date:
+    """获取当天日期（按本地时间缓存到次日零点）"""
+    return _today_cache()[1]
+
+
+def format_today(date_format: str) -> str:
+    """按指定格式格式化当天日期（同一天内每种格式只格式化一次）"""
+    # 日期和格式化结果取自同一个元组，零点切换时不会把前一天的结果存入新一天的缓存
+    _, today, formatted = _today_cache()
+    if date_format not in formatted:
+        formatted[date_format] = today.strftime(date_format)
+    return formatted[date_format]
+
+
 class DateExtractor:
     """日期提取器"""
     
@@ -27,25 +126,19 @@ class DateExtractor:
         self.priority = config['date_extraction']['priority']
         self.date_format = config['file_processing']['date_format']
         
-        # 日期正则表达式模式
-        self.date_patterns = [
-            # YYYY-MM-DD 格式
-            r'(\d{4})[/-](\d{1,2})[/-](\d{1,2})',
-            # YYYY年MM月DD日 格式
-            r'(\d{4})年(\d{1,2})月(\d{1,2})日',
-            # MM/DD/YYYY 格式
-            r'(\d{1,2})[/-](\d{1,2})[/-](\d{4})',
-            # DD.MM.YYYY 格式
-            r'(\d{1,2})\.(\d{1,2})\.(\d{4})',
-            # YYYYMMDD 格式
-            r'(\d{8})',
-        ]
-        
         # 中文日期关键词
         self.chinese_date_keywords = [
             '日期', '时间', '创建时间', '修改时间', '撰写时间',
             '会议时间', '报告时间', '记录时间', '发布时间'
         ]
+        
+        # 日期来源 -> 提取函数（参数均为文件信息字典）
+        self._source_extractors = {
+            'content_date': lambda file_info: self._extract_from_content(file_info.get('content', '')),
+            'creation_date': self._extract_from_file_creation,
+            'modification_date': self._extract_from_file_modification,
+            'current_date': lambda file_info: self._extract_current_date(),
+        }
     
     def extract_date(self, file_info: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -57,84 +150,83 @@ class DateExtractor:
         Returns:
             日期提取结果
         """
-        result = {
-            'date': None,
-            'source': '',
-            'confidence': 0.0,
-            'raw_date': None
-        }
-        
         for source in self.priority:
+            extractor = self._source_extractors.get(source)
+            if extractor is None:
+                continue
+            
             try:
-                if source == 'content_date':
-                    date_result = self._extract_from_content(file_info.get('content', ''))
-                elif source == 'creation_date':
-                    date_result = self._extract_from_file_creation(file_info)
-                elif source == 'modification_date':
-                    date_result = self._extract_from_file_modification(file_info)
-                elif source == 'current_date':
-                    date_result = self._extract_current_date()
-                else:
-                    continue
-                
+                date_result = extractor(file_info)
                 if date_result['date']:
-                    result.update(date_result)
-                    result['source'] = source
-                    self.logger.info(f"从 {source} 提取到日期: {result['date']}")
-                    break
+                    self.logger.info(f"从 {source} 提取到日期: {date_result['date']}")
+                    return {
+                        'date': date_result['date'],
+                        'source': source,
+                        'confidence': date_result['confidence'],
+                        'raw_date': date_result['raw_date']
+                    }
                     
             except Exception as e:
                 self.logger.warning(f"从 {source} 提取日期失败: {e}")
                 continue
         
         # 如果没有提取到任何日期，使用当前日期作为最后回退
-        if not result['date']:
-            result.update(self._extract_current_date())
-            result['source'] = 'fallback_current_date'
-            result['confidence'] = 0.1
-        
-        return result
+        date_result = self._extract_current_date()
+        return {
+            'date': date_result['date'],
+            'source': 'fallback_current_date',
+            'confidence': 0.1,
+            'raw_date': date_result['raw_date']
+        }
     
     def _extract_from_content(self, content: str) -> Dict[str, Any]:
         """从文档内容中提取日期"""
         if not content:
             return {'date': None, 'confidence': 0.0, 'raw_date': None}
         
-        # 查找关键词附近的日期
-        content_lines = content.split('\n')
+        # 查找关键词附近的日期（只扫描前64KB内容）
+        scan_text = content[:MAX_SCAN_CHARS]
+        if not _DATE_HINT_RE.search(scan_text):
+            return {'date': None, 'confidence': 0.0, 'raw_date': None}
+        
         best_date = None
         best_confidence = 0.0
         raw_date = None
         
-        for line in content_lines:
+        # 逐行迭代，不预先拆分出全部行，找到最高置信度的日期后即可提前结束
+        for line in io.StringIO(scan_text):
             line = line.strip()
             if not line:
                 continue
             
+            # 在该行中查找置信度最高的日期
+            line_best = self._find_best_date_in_text(line)
+            if line_best is None:
+                continue
+            
+            ymd, confidence, match_text = line_best
+            
             # 检查是否包含日期关键词
-            has_keyword = any(keyword in line for keyword in self.chinese_date_keywords)
+            if any(keyword in line for keyword in self.chinese_date_keywords):
+                confidence += 0.3  # 如果有关键词，增加置信度
             
-            # 在该行中查找日期
-            dates = self._find_dates_in_text(line)
+            if confidence > best_confidence:
+                best_date = ymd
+                best_confidence = confidence
+                raw_date = match_text
             
-            for date_obj, pattern_confidence, match_text in dates:
-                confidence = pattern_confidence
-                if has_keyword:
-                    confidence += 0.3  # 如果有关键词，增加置信度
-                
-                if confidence > best_confidence:
-                    best_date = date_obj
-                    best_confidence = confidence
-                    raw_date = match_text
+            # 已达到可能的最高置信度，后续行不会再更新结果
+            if best_confidence >= MAX_CONTENT_CONFIDENCE:
+                break
         
         # 如果没有找到关键词附近的日期，在整个内容中查找
         if not best_date:
-            all_dates = self._find_dates_in_text(content[:1000])  # 限制搜索范围
-            if all_dates:
-                best_date, best_confidence, raw_date = all_dates[0]  # 取第一个找到的日期
+            first_best = self._find_best_date_in_text(content[:1000])  # 限制搜索范围
+            if first_best:
+                best_date, best_confidence, raw_date = first_best
         
         if best_date:
-            formatted_date = best_date.strftime(self.date_format)
+            formatted_date = _fast_format(best_date, self.date_format)
             return {
                 'date': formatted_date,
                 'confidence': min(best_confidence, 1.0),
@@ -169,81 +261,49 @@ class DateExtractor:
     
     def _extract_current_date(self) -> Dict[str, Any]:
         """使用当前日期"""
-        current_time = datetime.now()
-        formatted_date = current_time.strftime(self.date_format)
         return {
-            'date': formatted_date,
+            'date': format_today(self.date_format),
             'confidence': 0.5,
-            'raw_date': current_time.isoformat()
+            'raw_date': get_today().isoformat()
         }
     
-    def _find_dates_in_text(self, text: str) -> List[tuple]:
-        """在文本中查找所有日期"""
-        dates = []
+    def _find_best_date_in_text(self, text: str) -> Optional[tuple]:
+        """
+        在文本中查找置信度最高的日期
         
-        for i, pattern in enumerate(self.date_patterns):
-            matches = re.finditer(pattern, text)
-            
-            for match in matches:
-                try:
-                    date_obj = self._parse_date_match(match, i)
-                    if date_obj:
-                        # 根据模式类型设置置信度
-                        confidence = self._get_pattern_confidence(i)
-                        dates.append((date_obj, confidence, match.group(0)))
-                except Exception as e:
-                    self.logger.debug(f"解析日期匹配失败: {e}")
-                    continue
+        置信度相同时取格式优先顺序靠前的，再相同时取位置靠前的。
         
-        # 按置信度排序
-        dates.sort(key=lambda x: x[1], reverse=True)
-        return dates
+        Returns:
+            ((年, 月, 日), 置信度, 匹配文本)，未找到时为 None
+        """
+        # 不含4位连续数字的文本不可能包含日期，跳过完整的日期正则
+        if not _DATE_HINT_RE.search(text):
+            return None
+        
+        return (self._find_best_match(_YEAR_FIRST_DATE_RE, text)
+                or self._find_best_match(_YEAR_LAST_DATE_RE, text))
     
-    def _parse_date_match(self, match: re.Match, pattern_index: int) -> Optional[datetime]:
-        """解析日期匹配结果"""
-        groups = match.groups()
+    def _find_best_match(self, pattern: re.Pattern, text: str) -> Optional[tuple]:
+        """用一组合并的日期正则在文本中查找置信度最高的有效日期"""
+        best = None
+        best_key = None
         
-        try:
-            if pattern_index == 0:  # YYYY-MM-DD
-                year, month, day = map(int, groups)
-                return datetime(year, month, day)
-            
-            elif pattern_index == 1:  # YYYY年MM月DD日
-                year, month, day = map(int, groups)
-                return datetime(year, month, day)
-            
-            elif pattern_index == 2:  # MM/DD/YYYY
-                month, day, year = map(int, groups)
-                return datetime(year, month, day)
-            
-            elif pattern_index == 3:  # DD.MM.YYYY
-                day, month, year = map(int, groups)
-                return datetime(year, month, day)
+        for match in pattern.finditer(text):
+            order, confidence, year_group, month_group, day_group = _DATE_FORMATS[match.lastgroup]
+            key = (confidence, -order)
+            if best_key is not None and key <= best_key:
+                continue
             
-            elif pattern_index == 4:  # YYYYMMDD
-                date_str = groups[0]
-                if len(date_str) == 8:
-                    year = int(date_str[:4])
-                    month = int(date_str[4:6])
-                    day = int(date_str[6:8])
-                    return datetime(year, month, day)
+            # 匹配本身是零宽的，日期文本取自格式的外层分组
+            ymd = (int(match.group(year_group)), int(match.group(month_group)), int(match.group(day_group)))
+            if not _is_valid_date(*ymd):
+                self.logger.debug(f"无效日期: {match.group(match.lastgroup)}")
+                continue
             
-        except (ValueError, IndexError) as e:
-            self.logger.debug(f"日期解析错误: {e}")
-            return None
+            best = (ymd, confidence, match.group(match.lastgroup))
+            best_key = key
         
-        return None
-    
-    def _get_pattern_confidence(self, pattern_index: int) -> float:
-        """根据模式类型获取置信度"""
-        confidence_map = {
-            0: 0.9,  # YYYY-MM-DD (最标准)
-            1: 0.9,  # YYYY年MM月DD日 (中文标准)
-            2: 0.7,  # MM/DD/YYYY (美式)
-            3: 0.7,  # DD.MM.YYYY (欧式)
-            4: 0.8,  # YYYYMMDD (紧凑)
-        }
-        return confidence_map.get(pattern_index, 0.5)
+        return best
     
     def validate_date(self, date_str: str) -> bool:
         """验证日期字符串是否有效"""
@@ -5,16 +5,86 @@
 
 import os
 import re
+import asyncio
+import errno
 import shutil
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterator, List, Optional
 
 from .file_reader import FileReader
-from .date_extractor import DateExtractor
+from .date_extractor import DateExtractor, get_today
 from .llm_client import LLMClient
 
 
+# 预编译的正则表达式
+_VERSION_RE = re.compile(r'v(\d+)\.(\d+)(?:\.(\d+))?', re.IGNORECASE)
+_DATE8_RE = re.compile(r'\d{8}')  # YYYYMMDD格式
+_WORD_RE = re.compile(r'[\u4e00-\u9fff]+|[a-zA-Z]+')
+
+# 关键词提取时移除的常见停用词
+_STOP_WORDS = frozenset({'的', '是', '在', '和', '与', '及', '或', '等', '了', '中', '对', '于'})
+
+# 每次LLM相似性检查合并的候选文件数
+SIMILARITY_BATCH_SIZE = 8
+
+
+def _move_file(source: str, target: str) -> None:
+    """
+    移动文件：同一文件系统内直接原子重命名，跨文件系统时回退到 shutil.move（复制后删除）
+    """
+    try:
+        os.replace(source, target)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        shutil.move(source, target)
+
+
+def _dir_mtime(path: str) -> Optional[int]:
+    """获取目录的修改时间（纳秒），目录不存在时返回 None"""
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _dir_fingerprint(dirs: List[str]) -> List[Optional[int]]:
+    """计算目录列表的修改时间指纹"""
+    return [_dir_mtime(path) for path in dirs]
+
+
+def _iter_tree(root: str) -> Iterator[tuple]:
+    """
+    递归遍历目录，产出 (DirEntry, 相对路径)
+    
+    顺序与 Path.rglob("*") 一致：按深度优先列出每个目录的内容，不进入符号链接目录。
+    DirEntry 缓存了目录读取时得到的文件类型，避免逐个stat和构造Path。
+    """
+    stack = [(root, '')]
+    while stack:
+        directory, prefix = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                entries = list(it)
+        except OSError:
+            continue
+        
+        subdirs = []
+        for entry in entries:
+            relative_path = os.path.join(prefix, entry.name) if prefix else entry.name
+            yield entry, relative_path
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append((entry.path, relative_path))
+        
+        # 逆序入栈，保证先处理第一个子目录
+        stack.extend(reversed(subdirs))
+
+
 class FileProcessor:
     """文件处理器"""
     
@@ -34,9 +104,16 @@ class FileProcessor:
         self.file_reader = FileReader()
         self.date_extractor = DateExtractor(config)
         
+        # 知识库文件内容缓存，按 (路径, 修改时间) 区分，文件修改后自动失效
+        self._cached_content = lru_cache(maxsize=1024)(self._read_content)
+        
         # 知识库路径
         self.knowledge_base_path = Path(config['knowledge_base']['root_path'])
         
+        # 知识库目录树快照，查找相似文件和列出文件夹共用一次遍历
+        self._tree_cache = None
+        self._tree_lock = threading.Lock()
+        
         # 文件处理配置
         self.max_filename_length = config['file_processing']['max_filename_length']
         self.version_format = config['file_processing']['version_format']
@@ -57,6 +134,7 @@ class FileProcessor:
             '\\': '_',
             '/': '_'
         }
+        self._sanitize_table = str.maketrans(self.invalid_chars)
     
     def process_file(self, file_path: Path, dry_run: bool = False) -> Dict[str, Any]:
         """
@@ -69,6 +147,18 @@ class FileProcessor:
         Returns:
             处理结果字典
         """
+        return self.build_result(self.analyze_file(file_path))
+    
+    def analyze_file(self, file_path: Path) -> Dict[str, Any]:
+        """
+        读取文件并提取主体，不依赖知识库中的已有文件，可在线程池或进程池中并发执行
+        
+        Args:
+            file_path: 文件路径
+            
+        Returns:
+            分析结果字典，交给 build_result 生成处理结果；失败时为错误结果
+        """
         try:
             # 1. 读取文件内容
             self.logger.info(f"读取文件: {file_path}")
@@ -77,59 +167,178 @@ class FileProcessor:
             # 2. 提取主体信息
             self.logger.info("提取文档主体")
             subject_result = self.llm_client.extract_subject_and_folder(file_info)
-            subject = subject_result.get('subject', self.fallback_subject)
-            
-            # 3. 提取日期信息
-            self.logger.info("提取日期信息")
-            date_result = self.date_extractor.extract_date(file_info)
-            date = date_result.get('date')
             
-            # 4. 确定版本号
-            self.logger.info("确定版本号")
-            version = self._determine_version(subject, file_info, file_path.parent)
+            return self._analysis(file_path, file_info, subject_result)
             
-            # 5. 生成新文件名
-            new_filename = self._generate_filename(subject, date, version, file_info['suffix'])
-            
-            # 6. 确定目标文件夹
-            target_folder_info = self._determine_target_folder(subject, subject_result)
-            target_folder = target_folder_info['path']
-            folder_will_be_created = target_folder_info['create_new']
+        except Exception as e:
+            self.logger.error(f"处理文件失败: {e}")
+            return self._error_result(file_path, e)
+    
+    def build_result(self, analysis: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        根据 analyze_file 的分析结果确定日期、版本号、文件名和目标文件夹
+        
+        版本号和目标路径取决于知识库中已有的文件，多个文件应逐个调用，
+        并在调用下一个之前执行当前结果的文件操作。
+        
+        Args:
+            analysis: analyze_file 返回的分析结果
             
-            # 7. 构建完整的目标路径
-            target_path = target_folder / new_filename
+        Returns:
+            处理结果字典
+        """
+        if analysis['status'] == 'error':
+            return analysis
+        
+        file_path = Path(analysis['file_path'])
+        try:
+            return self._build_result(file_path, analysis['file_info'], analysis['subject_result'])
+        except Exception as e:
+            self.logger.error(f"处理文件失败: {e}")
+            return self._error_result(file_path, e)
+    
+    async def aanalyze_file(self, file_path: Path,
+                            latency_budget_ms: Optional[int] = None) -> Dict[str, Any]:
+        """
+        analyze_file 的异步版本，读取文件在线程池中执行，等待LLM响应时不占用线程
+        
+        Args:
+            file_path: 文件路径
+            latency_budget_ms: 可接受的最长等待时间，足够长时请求走批处理API
             
-            result = {
-                'status': 'pending',
-                'file_path': str(file_path),
-                'original_name': file_info['name'],
-                'subject': subject,
-                'date': date,
-                'version': version,
-                'new_name': new_filename,
-                'target_folder': str(target_folder),
-                'target_path': str(target_path),
-                'folder_will_be_created': folder_will_be_created,
-                'subject_confidence': subject_result.get('confidence', 0.0),
-                'date_source': date_result.get('source', ''),
-                'date_confidence': date_result.get('confidence', 0.0),
-                'llm_reasoning': subject_result.get('reasoning', ''),
-            }
+        Returns:
+            分析结果字典，交给 build_result 生成处理结果；失败时为错误结果
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            self.logger.info(f"读取文件: {file_path}")
+            file_info = await loop.run_in_executor(None, self.file_reader.read_file, file_path)
             
-            # 检查目标文件是否已存在
-            if target_path.exists():
-                result['warning'] = f"目标文件已存在: {target_path}"
+            self.logger.info("提取文档主体")
+            subject_result = await self.llm_client.aextract_subject_and_folder(file_info, latency_budget_ms)
             
-            return result
+            return self._analysis(file_path, file_info, subject_result)
             
         except Exception as e:
             self.logger.error(f"处理文件失败: {e}")
-            return {
-                'status': 'error',
-                'file_path': str(file_path),
-                'original_name': file_path.name,
-                'error': str(e)
-            }
+            return self._error_result(file_path, e)
+    
+    def process_files(self, file_paths: List[Path], batch_size: int = 20,
+                      dry_run: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        批量处理文件，每批文件只调用一次LLM提取主体
+        
+        结果按 file_paths 顺序逐个生成。版本号依赖知识库中已有的文件，
+        调用方应在获取下一个结果前执行当前结果的文件操作。
+        
+        Args:
+            file_paths: 文件路径列表
+            batch_size: 每次LLM调用包含的文件数
+            dry_run: 是否为预览模式
+            
+        Yields:
+            处理结果字典
+        """
+        for start in range(0, len(file_paths), batch_size):
+            chunk = file_paths[start:start + batch_size]
+            
+            # 并发读取文件内容（本地操作，读取失败的文件直接记为错误）
+            file_infos = {}
+            errors = {}
+            self.logger.info(f"读取文件: {len(chunk)} 个")
+            for file_path, file_info in zip(chunk, self.file_reader.read_files(chunk)):
+                if isinstance(file_info, Exception):
+                    self.logger.error(f"处理文件失败: {file_info}")
+                    errors[file_path] = file_info
+                else:
+                    file_infos[file_path] = file_info
+            
+            # 一次LLM调用提取整批文件的主体
+            subject_results = {}
+            if file_infos:
+                self.logger.info(f"批量提取文档主体: {len(file_infos)} 个文件")
+                batch_results = self.llm_client.extract_subjects_batch(list(file_infos.values()))
+                subject_results = dict(zip(file_infos, batch_results))
+            
+            # 逐个取出已处理文件的内容，生成结果后即可释放，不必保留整批文档
+            for file_path in chunk:
+                if file_path in errors:
+                    yield self._error_result(file_path, errors.pop(file_path))
+                    continue
+                
+                try:
+                    file_info = file_infos.pop(file_path)
+                    yield self._build_result(file_path, file_info, subject_results.pop(file_path))
+                except Exception as e:
+                    self.logger.error(f"处理文件失败: {e}")
+                    yield self._error_result(file_path, e)
+    
+    def _build_result(self, file_path: Path, file_info: Dict[str, Any],
+                      subject_result: Dict[str, Any]) -> Dict[str, Any]:
+        """根据已提取的主体信息完成日期、版本、文件名和目标文件夹的确定"""
+        subject = subject_result.get('subject', self.fallback_subject)
+        
+        # 3. 提取日期信息
+        self.logger.info("提取日期信息")
+        date_result = self.date_extractor.extract_date(file_info)
+        date = date_result.get('date')
+        
+        # 4. 确定版本号
+        self.logger.info("确定版本号")
+        version = self._determine_version(subject, file_info, file_path.parent)
+        
+        # 5. 生成新文件名
+        new_filename = self._generate_filename(subject, date, version, file_info['suffix'])
+        
+        # 6. 确定目标文件夹
+        target_folder_info = self._determine_target_folder(subject, subject_result)
+        target_folder = target_folder_info['path']
+        folder_will_be_created = target_folder_info['create_new']
+        
+        # 7. 构建完整的目标路径
+        target_path = target_folder / new_filename
+        
+        result = {
+            'status': 'pending',
+            'file_path': str(file_path),
+            'original_name': file_info['name'],
+            'subject': subject,
+            'date': date,
+            'version': version,
+            'new_name': new_filename,
+            'target_folder': str(target_folder),
+            'target_path': str(target_path),
+            'folder_will_be_created': folder_will_be_created,
+            'subject_confidence': subject_result.get('confidence', 0.0),
+            'date_source': date_result.get('source', ''),
+            'date_confidence': date_result.get('confidence', 0.0),
+            'llm_reasoning': subject_result.get('reasoning', ''),
+        }
+        
+        # 检查目标文件是否已存在
+        if target_path.exists():
+            result['warning'] = f"目标文件已存在: {target_path}"
+        
+        return result
+    
+    def _analysis(self, file_path: Path, file_info: Dict[str, Any],
+                  subject_result: Dict[str, Any]) -> Dict[str, Any]:
+        """构建 analyze_file 的分析结果字典"""
+        return {
+            'status': 'analyzed',
+            'file_path': str(file_path),
+            'file_info': file_info,
+            'subject_result': subject_result
+        }
+    
+    def _error_result(self, file_path: Path, error: Exception) -> Dict[str, Any]:
+        """构建处理失败的结果字典"""
+        return {
+            'status': 'error',
+            'file_path': str(file_path),
+            'original_name': file_path.name,
+            'error': str(error)
+        }
     
     def execute_operation(self, result: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -155,11 +364,12 @@ class FileProcessor:
             if target_path.exists():
                 backup_path = self._get_backup_path(target_path)
                 self.logger.warning(f"目标文件已存在，备份到: {backup_path}")
-                shutil.move(str(target_path), str(backup_path))
+                _move_file(str(target_path), str(backup_path))
             
             # 移动并重命名文件
             self.logger.info(f"移动文件: {source_path} -> {target_path}")
-            shutil.move(str(source_path), str(target_path))
+            _move_file(str(source_path), str(target_path))
+            self._tree_cache = None
             
             return {
                 'status': 'success',
@@ -201,66 +411,80 @@ class FileProcessor:
         if not self.knowledge_base_path.exists():
             return similar_files
         
-        # 搜索包含主体关键词的文件
-        subject_keywords = self._extract_keywords(subject)
+        # 搜索包含主体关键词的文件（关键词只转换一次小写）
+        keywords_lower = tuple(keyword.lower() for keyword in self._extract_keywords(subject))
+        if not keywords_lower:
+            # 没有关键词时不会有文件匹配，无需遍历知识库
+            return similar_files
         
-        for file_path in self.knowledge_base_path.rglob("*"):
-            if not file_path.is_file():
-                continue
-            
-            filename = file_path.stem.lower()
-            
-            # 检查文件名是否包含主体关键词
-            if any(keyword.lower() in filename for keyword in subject_keywords):
-                # 使用LLM进行更精确的相似性检查
-                if self.llm_client.enabled:
-                    try:
-                        existing_file_info = self.file_reader.read_file(file_path)
-                        similarity_result = self.llm_client.check_content_similarity(
-                            file_info.get('content', ''),
-                            existing_file_info.get('content', '')
-                        )
-                        
-                        if similarity_result.get('is_similar', False):
-                            similar_files.append(file_path)
-                    except Exception as e:
-                        self.logger.debug(f"相似性检查失败 {file_path}: {e}")
-                else:
-                    # 回退到简单的文件名匹配
-                    similar_files.append(file_path)
+        # 1. 只按文件名筛选候选文件，不读取内容
+        candidates = [path for stem_lower, path in self._tree_snapshot()['files']
+                      if any(keyword in stem_lower for keyword in keywords_lower)]
+        
+        if not candidates:
+            return similar_files
+        
+        if not self.llm_client.enabled:
+            # 回退到简单的文件名匹配
+            return [Path(path) for path in candidates]
+        
+        # 2. 使用LLM进行更精确的相似性检查，只在此时读取候选文件内容；
+        #    候选文件按批合并为一次LLM调用，各批并发进行（同时请求数由LLM客户端限制）
+        incoming_content = file_info.get('content', '')
+        
+        readable = []
+        contents = []
+        for path in candidates:
+            try:
+                contents.append(self._cached_content(path, os.stat(path).st_mtime_ns))
+                readable.append(path)
+            except Exception as e:
+                self.logger.debug(f"读取候选文件失败 {path}: {e}")
+        
+        if not readable:
+            return similar_files
+        
+        chunks = [contents[i:i + SIMILARITY_BATCH_SIZE]
+                  for i in range(0, len(contents), SIMILARITY_BATCH_SIZE)]
+        
+        def check_chunk(chunk: List[str]) -> List[bool]:
+            try:
+                results = self.llm_client.check_content_similarity_batch(incoming_content, chunk)
+                return [result.get('is_similar', False) for result in results]
+            except Exception as e:
+                self.logger.debug(f"相似性检查失败: {e}")
+                return [False] * len(chunk)
+        
+        max_workers = min(self.config['llm'].get('max_concurrent_requests', 4), len(chunks))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            flags = [similar for chunk_flags in executor.map(check_chunk, chunks) for similar in chunk_flags]
+        
+        for path, similar in zip(readable, flags):
+            if similar:
+                similar_files.append(Path(path))
         
         return similar_files
     
+    def _read_content(self, path: str, mtime_ns: int) -> str:
+        """读取知识库文件内容（mtime_ns 仅作为缓存键）"""
+        return self.file_reader.read_file(Path(path)).get('content', '')
+    
     def _extract_keywords(self, subject: str) -> List[str]:
         """从主体中提取关键词"""
-        # 移除常见的停用词
-        stop_words = {'的', '是', '在', '和', '与', '及', '或', '等', '了', '中', '对', '于'}
-        
-        # 简单的分词（可以使用更复杂的分词库）
-        words = re.findall(r'[\u4e00-\u9fff]+|[a-zA-Z]+', subject)
-        keywords = [word for word in words if len(word) > 1 and word not in stop_words]
-        
-        return keywords
+        # 简单的分词（可以使用更复杂的分词库），并移除常见的停用词
+        return [word for word in _WORD_RE.findall(subject) if len(word) > 1 and word not in _STOP_WORDS]
     
     def _get_highest_version(self, files: List[Path]) -> str:
         """获取文件列表中的最高版本号"""
-        versions = []
-        
-        version_pattern = r'v(\d+)\.(\d+)(?:\.(\d+))?'
-        
-        for file_path in files:
-            filename = file_path.stem
-            match = re.search(version_pattern, filename, re.IGNORECASE)
-            
-            if match:
-                major = int(match.group(1))
-                minor = int(match.group(2))
-                patch = int(match.group(3)) if match.group(3) else 0
-                versions.append((major, minor, patch))
-        
-        if versions:
-            # 找到最高版本
-            highest = max(versions)
+        # 单次遍历取最大值，不构建中间列表；海象运算符避免重复匹配
+        highest = max(
+            ((int(match.group(1)), int(match.group(2)), int(match.group(3) or 0))
+             for file_path in files
+             if (match := _VERSION_RE.search(file_path.stem))),
+            default=None
+        )
+        
+        if highest is not None:
             if self.version_format == 'semantic':
                 return f"v{highest[0]}.{highest[1]}.{highest[2]}"
             else:
@@ -270,8 +494,7 @@ class FileProcessor:
     
     def _increment_version(self, version: str) -> str:
         """递增版本号"""
-        version_pattern = r'v(\d+)\.(\d+)(?:\.(\d+))?'
-        match = re.match(version_pattern, version, re.IGNORECASE)
+        match = _VERSION_RE.match(version)
         
         if match:
             major = int(match.group(1))
@@ -319,8 +542,7 @@ class FileProcessor:
             
             if self.config['knowledge_base']['archive_by_year']:
                 # 按年份归档
-                from datetime import datetime
-                year = datetime.now().year
+                year = get_today().year
                 folder_path = self.knowledge_base_path / str(year) / safe_subject
             else:
                 folder_path = self.knowledge_base_path / safe_subject
@@ -339,8 +561,7 @@ class FileProcessor:
         safe_subject = self._sanitize_filename(subject)
         
         # 检查主体中是否已经包含日期
-        date_pattern = r'\d{8}'  # YYYYMMDD格式
-        has_date_in_subject = re.search(date_pattern, safe_subject)
+        has_date_in_subject = _DATE8_RE.search(safe_subject)
         
         if has_date_in_subject:
             # 如果主体中已包含日期，只添加版本号
@@ -367,35 +588,60 @@ class FileProcessor:
     
     def _sanitize_filename(self, filename: str) -> str:
         """清理文件名，移除或替换非法字符"""
-        # 替换特殊字符
-        for invalid_char, replacement in self.invalid_chars.items():
-            filename = filename.replace(invalid_char, replacement)
-        
-        # 移除首尾空格
-        filename = filename.strip()
-        
-        # 如果文件名为空，使用默认名称
-        if not filename:
-            filename = "untitled"
-        
-        return filename
+        # 一次遍历替换所有特殊字符，并移除首尾空格；为空时使用默认名称
+        return filename.translate(self._sanitize_table).strip() or "untitled"
     
     def _get_backup_path(self, target_path: Path) -> Path:
         """生成备份文件路径"""
-        from datetime import datetime
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         
         backup_name = f"{target_path.stem}_backup_{timestamp}{target_path.suffix}"
-        return target_path.parent / backup_name
+        backup_path = target_path.parent / backup_name
+        
+        # 同一秒内多次备份同一文件时追加序号，避免覆盖之前的备份
+        counter = 1
+        while backup_path.exists():
+            backup_name = f"{target_path.stem}_backup_{timestamp}_{counter}{target_path.suffix}"
+            backup_path = target_path.parent / backup_name
+            counter += 1
+        return backup_path
     
     def get_existing_folders(self) -> List[str]:
         """获取知识库中现有的文件夹列表"""
-        folders = []
+        return list(self._tree_snapshot()['folders'])
+    
+    def _tree_snapshot(self) -> Dict[str, Any]:
+        """
+        获取知识库目录树快照，一次遍历同时得到文件和文件夹
         
-        if self.knowledge_base_path.exists():
-            for item in self.knowledge_base_path.rglob("*"):
-                if item.is_dir():
-                    relative_path = item.relative_to(self.knowledge_base_path)
-                    folders.append(str(relative_path))
+        快照以各目录的修改时间为指纹：目录中增删文件或子目录都会改变其mtime，
+        因此复用前只需stat已知目录，无需重新列出全部文件。
         
-        return folders 
\ No newline at end of file
+        Returns:
+            包含 files（(小写文件名主干, 路径) 列表）和 folders（相对路径列表）的字典
+        """
+        with self._tree_lock:
+            snapshot = self._tree_cache
+            if snapshot is not None and _dir_fingerprint(snapshot['dirs']) == snapshot['fingerprint']:
+                return snapshot
+            
+            root = str(self.knowledge_base_path)
+            dirs = [root]
+            fingerprint = [_dir_mtime(root)]
+            files = []
+            folders = []
+            splitext = os.path.splitext
+            
+            for entry, relative_path in _iter_tree(root):
+                if entry.is_dir(follow_symlinks=False):
+                    # 在列出该目录内容之前记录mtime，遍历期间的修改会使快照失效
+                    dirs.append(entry.path)
+                    fingerprint.append(_dir_mtime(entry.path))
+                if entry.is_dir():
+                    folders.append(relative_path)
+                elif entry.is_file():
+                    files.append((splitext(entry.name)[0].lower(), entry.path))
+            
+            snapshot = {'dirs': dirs, 'fingerprint': fingerprint, 'files': files, 'folders': folders}
+            self._tree_cache = snapshot
+            return snapshot
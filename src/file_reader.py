@@ -3,10 +3,22 @@
 支持读取不同格式文件的内容：.docx, .xlsx, .pdf, .txt, .md
 """
 
+import io
 import os
+import re
+import codecs
+import mmap
+import pickle
+import hashlib
 import logging
+import tempfile
+import multiprocessing
+import zipfile
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterable, List, Optional, Union
 from datetime import datetime
 
 # 导入文件处理库
@@ -22,20 +34,403 @@ try:
 except ImportError:
     XLSX_AVAILABLE = False
 
+# 可选：基于Rust的calamine解析器，读取xlsx比openpyxl快得多
+try:
+    from python_calamine import CalamineWorkbook
+    CALAMINE_AVAILABLE = True
+except ImportError:
+    CALAMINE_AVAILABLE = False
+
 try:
     import PyPDF2
+    from PyPDF2.generic import DecodedStreamObject, NameObject
     import pdfplumber
     PDF_AVAILABLE = True
 except ImportError:
     PDF_AVAILABLE = False
 
+# 可选：基于MuPDF的PyMuPDF，文本提取在C代码中完成，比pdfplumber快得多
+try:
+    import fitz
+    FITZ_AVAILABLE = True
+    # 只提取页面范围内的文本，不保留图像块
+    _FITZ_TEXT_FLAGS = fitz.TEXT_PRESERVE_LIGATURES | fitz.TEXT_PRESERVE_WHITESPACE | fitz.TEXT_MEDIABOX_CLIP
+except ImportError:
+    FITZ_AVAILABLE = False
+
+# 可选：lxml，直接流式解析docx中的XML，无需构建python-docx的对象树
+try:
+    from lxml import etree
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+# 可选：编码检测库，非UTF-8文本无需逐个尝试编码
+try:
+    import charset_normalizer
+    CHARSET_NORMALIZER_AVAILABLE = True
+except ImportError:
+    CHARSET_NORMALIZER_AVAILABLE = False
+
+# 纯文本文件依次尝试的编码（latin1 可以解码任意字节，作为最后的回退）
+_TEXT_ENCODINGS = ('utf-8', 'gbk', 'gb2312', 'utf-16', 'latin1')
+# 字节顺序标记 -> 编码（UTF-32 的标记以 UTF-16 的标记开头，需先检查）
+_BOM_ENCODINGS = (
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+# 目录 -> 该目录中上一个非UTF-8文本文件的编码，同一目录的文件通常使用相同编码
+_ENCODING_HINTS: Dict[str, str] = {}
+# 可作为目录编码提示的编码：多字节编码对不匹配的字节会解码失败；
+# cp1252、utf-16（无BOM）等几乎能解码任意字节，用作提示会把其他编码的文件解成乱码
+_HINTABLE_ENCODINGS = frozenset({
+    'gbk', 'gb2312', 'gb18030', 'big5', 'big5hkscs',
+    'shift_jis', 'cp932', 'euc_jp', 'euc_kr', 'cp949'
+})
+# 检测编码时采样的字节数
+ENCODING_SNIFF_BYTES = 64 * 1024
+# 超过该大小的文本文件通过内存映射解码，不再额外复制一份字节缓冲
+MMAP_MIN_BYTES = 1024 * 1024
+
+# 按页数选择PDF提取方式：
+# PyMuPDF 单页只需几毫秒，页数超过该值时才值得启动进程池并行提取
+PARALLEL_PDF_MIN_PAGES = 200
+# 未安装 PyMuPDF 时，页数超过该值的文档跳过较慢的 pdfplumber，直接使用 PyPDF2
+PLUMBER_MAX_PAGES = 200
+# 并行提取单个PDF的最大进程数
+MAX_PDF_WORKERS = 8
+
+# 内容流超过该大小的PDF页面在PyPDF2提取文本前先去除图形绘制指令
+PDF_STREAM_FILTER_BYTES = 256 * 1024
+
+# 文本对象（BT ... ET），其中的指令全部保留
+_PDF_TEXT_OBJECT_RE = re.compile(rb'(?<![^\s])BT(?=\s).*?(?<=\s)ET(?![^\s])', re.DOTALL)
+# 文本对象之外的路径构造、绘制和裁剪指令（连同其数字操作数），不产生任何文本
+_PDF_GRAPHICS_OP_RE = re.compile(
+    rb'(?<![^\s])(?:[-+]?(?:\d+\.?\d*|\.\d+)\s+){0,6}'
+    rb'(?:re|[mlcvyh]|[SsFn]|[fBb]\*?|W\*?)(?=\s|$)'
+)
+# 内联图像的二进制数据可能恰好匹配上述模式，含内联图像的内容流不做处理
+_PDF_INLINE_IMAGE_RE = re.compile(rb'(?<![^\s])BI(?=\s)')
+
+# 内存中缓存的文件解析结果数量
+READ_CACHE_SIZE = 512
+
+# Office文档核心属性（docProps/core.xml）中的命名空间和对应的元数据键
+_CORE_PROPS_NS = {
+    'dc': 'http://purl.org/dc/elements/1.1/',
+    'dcterms': 'http://purl.org/dc/terms/',
+}
+_CORE_PROPS_FIELDS = (
+    ('dc:title', 'title'),
+    ('dc:creator', 'author'),
+    ('dc:subject', 'subject'),
+    ('dcterms:created', 'created'),
+    ('dcterms:modified', 'modified'),
+)
+
+
+def _read_core_properties(file_path: Path) -> Dict[str, Any]:
+    """
+    直接从Office文档压缩包中读取核心属性，无需加载整个文档
+    
+    Returns:
+        元数据字典（title, author, subject, created, modified），缺失的属性不包含在内
+    """
+    metadata = {}
+    try:
+        with zipfile.ZipFile(file_path) as archive:
+            root = ET.fromstring(archive.read('docProps/core.xml'))
+    except (KeyError, zipfile.BadZipFile, ET.ParseError, OSError):
+        return metadata
+    
+    for tag, key in _CORE_PROPS_FIELDS:
+        element = root.find(tag, _CORE_PROPS_NS)
+        if element is None or not element.text:
+            continue
+        value = element.text.strip()
+        if key in ('created', 'modified'):
+            # W3CDTF格式（如 2024-01-02T03:04:05Z），与openpyxl一致转换为不带时区的datetime
+            try:
+                value = datetime.fromisoformat(value.rstrip('Z'))
+            except ValueError:
+                pass
+        metadata[key] = value
+    
+    return metadata
+
+
+# python-docx / openpyxl 文档属性名 -> 元数据键
+_DOCX_CORE_PROPS = (
+    ('title', 'title'),
+    ('author', 'author'),
+    ('subject', 'subject'),
+    ('created', 'created'),
+    ('modified', 'modified'),
+)
+_XLSX_CORE_PROPS = (
+    ('title', 'title'),
+    ('creator', 'author'),
+    ('subject', 'subject'),
+    ('created', 'created'),
+    ('modified', 'modified'),
+)
+
+
+def _extract_core_props(props: Any, fields: tuple) -> Dict[str, Any]:
+    """从文档属性对象中提取非空属性，每个属性只读取一次"""
+    metadata = {}
+    for attr, key in fields:
+        value = getattr(props, attr, None)
+        if value:
+            metadata[key] = value
+    return metadata
+
+
+# PyMuPDF元数据键 -> PDF标准元数据键（与pdfplumber/PyPDF2提取的键名保持一致）
+_FITZ_METADATA_KEYS = {
+    'title': 'Title',
+    'author': 'Author',
+    'subject': 'Subject',
+    'keywords': 'Keywords',
+    'creator': 'Creator',
+    'producer': 'Producer',
+    'creationDate': 'CreationDate',
+    'modDate': 'ModDate',
+}
+
+
+def _join_lines(texts: Iterable[Optional[str]]) -> str:
+    """
+    按顺序拼接文本片段（如PDF各页、表格各行，跳过空片段），片段间以换行分隔
+    
+    逐个写入缓冲区，每个片段写入后即可回收，不必同时保留所有片段的列表。
+    """
+    buffer = io.StringIO()
+    separator = ''
+    for text in texts:
+        if text:
+            buffer.write(separator)
+            buffer.write(text)
+            separator = '\n'
+    return buffer.getvalue()
+
+
+def _plumber_page_texts(pdf) -> Iterable[Optional[str]]:
+    """逐页提取pdfplumber文档的文本，提取后立即释放该页解析出的对象缓存"""
+    for page in pdf.pages:
+        yield page.extract_text()
+        page.flush_cache()
+
+
+def _extract_pdf_pages(path: str, start: int, end: int) -> tuple:
+    """进程池工作函数：使用PyMuPDF提取 [start, end) 页的文本，返回 (start, 各页文本列表)"""
+    with fitz.open(path) as doc:
+        return start, [doc[index].get_text("text", flags=_FITZ_TEXT_FLAGS) for index in range(start, end)]
+
+
+# WordprocessingML 中用到的标签
+_W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+_W_P = _W_NS + 'p'
+_W_R = _W_NS + 'r'
+_W_T = _W_NS + 't'
+_W_TAB = _W_NS + 'tab'
+_W_BR = _W_NS + 'br'
+_W_CR = _W_NS + 'cr'
+_W_HYPERLINK = _W_NS + 'hyperlink'
+_W_TBL = _W_NS + 'tbl'
+_W_TR = _W_NS + 'tr'
+_W_TC = _W_NS + 'tc'
+_W_TCPR = _W_NS + 'tcPr'
+_W_GRID_SPAN = _W_NS + 'gridSpan'
+_W_VMERGE = _W_NS + 'vMerge'
+_W_TYPE = _W_NS + 'type'
+_W_VAL = _W_NS + 'val'
+
+
+def _docx_paragraph_text(paragraph) -> str:
+    """拼接段落中各文本块（包括超链接中的文本块）的文本，与 python-docx 的 paragraph.text 一致"""
+    parts = []
+    for child in paragraph.iterchildren(_W_R, _W_HYPERLINK):
+        runs = child.iterchildren(_W_R) if child.tag == _W_HYPERLINK else (child,)
+        for run in runs:
+            for element in run.iterchildren(_W_T, _W_TAB, _W_BR, _W_CR):
+                tag = element.tag
+                if tag == _W_T:
+                    parts.append(element.text or '')
+                elif tag == _W_TAB:
+                    parts.append('\t')
+                elif tag == _W_CR or element.get(_W_TYPE, 'textWrapping') == 'textWrapping':
+                    parts.append('\n')
+    return ''.join(parts)
+
+
+def _docx_table_rows(table) -> List[str]:
+    """
+    提取表格各行的文本，每行为 ' | ' 连接的非空单元格文本
+    
+    与 python-docx 的 row.cells 一致：横向合并的单元格按跨越的列数重复，
+    纵向合并的后续单元格取合并起始单元格的文本。
+    """
+    rows = []
+    previous_row = []
+    for row in table.iterchildren(_W_TR):
+        cells = []
+        for cell in row.iterchildren(_W_TC):
+            span = 1
+            vmerge_continue = False
+            properties = cell.find(_W_TCPR)
+            if properties is not None:
+                grid_span = properties.find(_W_GRID_SPAN)
+                if grid_span is not None:
+                    span = int(grid_span.get(_W_VAL, 1))
+                vmerge = properties.find(_W_VMERGE)
+                vmerge_continue = vmerge is not None and vmerge.get(_W_VAL, 'continue') == 'continue'
+            
+            column = len(cells)
+            if vmerge_continue and column < len(previous_row):
+                text = previous_row[column]
+            else:
+                text = '\n'.join(_docx_paragraph_text(p) for p in cell.iterchildren(_W_P)).strip()
+            cells.extend([text] * span)
+        
+        previous_row = cells
+        row_text = [text for text in cells if text]
+        if row_text:
+            rows.append(' | '.join(row_text))
+    return rows
+
+
+def _collect_docx_element(element, paragraphs: List[str], table_rows: List[str]):
+    """处理一个正文元素：段落文本加入 paragraphs，表格各行加入 table_rows，其他元素忽略"""
+    if element.tag == _W_P:
+        text = _docx_paragraph_text(element).strip()
+        if text:
+            paragraphs.append(text)
+    elif element.tag == _W_TBL:
+        table_rows.extend(_docx_table_rows(element))
+
+
+def _openpyxl_sheet_lines(workbook) -> Iterable[str]:
+    """逐行产出openpyxl只读工作簿的内容：每个工作表先产出表名，再产出有数据的行"""
+    for sheet_name in workbook.sheetnames:
+        sheet = workbook[sheet_name]
+        yield f"工作表: {sheet_name}"
+        
+        # 部分程序生成的文件记录的尺寸不正确（如大表格记录为A1:A1），
+        # 只读模式会按记录的尺寸截断，此时重新按实际数据读取
+        if sheet.max_row is None or sheet.calculate_dimension() == 'A1:A1':
+            sheet.reset_dimensions()
+        
+        # 读取有数据的行
+        for row in sheet.iter_rows(values_only=True):
+            row_data = [str(cell) if cell is not None else '' for cell in row]
+            # 一次拼接后整体判断是否全为空白，不逐个单元格检查
+            text = ''.join(row_data)
+            if text and not text.isspace():
+                yield ' | '.join(row_data)
+
+
+def _calamine_sheet_lines(workbook) -> Iterable[str]:
+    """逐行产出calamine工作簿的内容，格式与 _openpyxl_sheet_lines 相同"""
+    for sheet_name in workbook.sheet_names:
+        sheet = workbook.get_sheet_by_name(sheet_name)
+        yield f"工作表: {sheet_name}"
+        
+        # 读取有数据的行
+        for row in sheet.to_python(skip_empty_area=True):
+            row_data = [_format_cell(cell) if cell is not None else '' for cell in row]
+            # 一次拼接后整体判断是否全为空白，不逐个单元格检查
+            text = ''.join(row_data)
+            if text and not text.isspace():
+                yield ' | '.join(row_data)
+
+
+def _filter_pdf_stream(data: bytes) -> bytes:
+    """
+    去除PDF内容流中文本对象之外的图形绘制指令
+    
+    插图较多的页面中路径和填充指令可能占内容流的绝大部分，却不产生任何文本。
+    文本对象内部以及坐标变换（cm）、图形状态（q/Q/gs）、外部对象（Do）等指令原样保留，
+    不影响文本提取结果。
+    """
+    if _PDF_INLINE_IMAGE_RE.search(data):
+        return data
+    
+    parts = []
+    position = 0
+    for match in _PDF_TEXT_OBJECT_RE.finditer(data):
+        parts.append(_PDF_GRAPHICS_OP_RE.sub(b'', data[position:match.start()]))
+        parts.append(match.group(0))
+        position = match.end()
+    parts.append(_PDF_GRAPHICS_OP_RE.sub(b'', data[position:]))
+    return b'\n'.join(parts)
+
+
+def _pypdf2_page_texts(reader) -> Iterable[Optional[str]]:
+    """逐页提取PyPDF2文档的文本，内容流很大的页面先去除图形绘制指令"""
+    for page in reader.pages:
+        try:
+            contents = page.get_contents()
+            data = contents.get_data() if contents is not None else b''
+            if len(data) >= PDF_STREAM_FILTER_BYTES:
+                filtered = _filter_pdf_stream(data)
+                if len(filtered) < len(data):
+                    # 只替换内存中的页面对象，不修改文件
+                    stream = DecodedStreamObject()
+                    stream.set_data(filtered)
+                    page[NameObject('/Contents')] = stream
+        except Exception:
+            # 过滤失败时按原始内容提取
+            pass
+        yield page.extract_text()
+
+
+def _format_cell(value: Any) -> str:
+    """格式化单元格的值；整数值的浮点数按整数输出，与openpyxl的结果保持一致"""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+# 依赖可选库的文件类型是否可读（未列出的类型不需要额外的库）
+_READER_AVAILABLE = {
+    '.docx': DOCX_AVAILABLE or LXML_AVAILABLE,
+    '.xlsx': XLSX_AVAILABLE or CALAMINE_AVAILABLE,
+    '.pdf': PDF_AVAILABLE or FITZ_AVAILABLE,
+}
+
 
 class FileReader:
     """文件内容读取器"""
     
-    def __init__(self):
-        """初始化文件读取器"""
+    # 文件扩展名 -> 读取方法名
+    _READERS = {
+        '.txt': '_read_text',
+        '.md': '_read_text',
+        '.docx': '_read_docx',
+        '.xlsx': '_read_xlsx',
+        '.pdf': '_read_pdf',
+    }
+    
+    def __init__(self, cache_dir: Optional[Path] = None):
+        """
+        初始化文件读取器
+        
+        Args:
+            cache_dir: 可选的磁盘缓存目录，设置后解析结果会持久化，重新运行时无需重新解析未修改的文件
+        """
         self.logger = logging.getLogger(__name__)
+        
+        # 解析结果缓存，按 (路径, 修改时间, 大小) 区分，文件修改后自动失效
+        self._cached_read = lru_cache(maxsize=READ_CACHE_SIZE)(self._read_uncached)
+        
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        if self.cache_dir is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
     
     def read_file(self, file_path: Path) -> Dict[str, Any]:
         """
@@ -47,35 +442,86 @@ class FileReader:
         Returns:
             包含文件内容和元数据的字典
         """
-        if not file_path.exists():
-            raise FileNotFoundError(f"文件不存在: {file_path}")
+        # 先检查扩展名，不支持的文件无需访问文件系统
+        suffix = file_path.suffix.lower()
+        if suffix not in self._READERS:
+            raise ValueError(f"不支持的文件类型: {suffix}")
+        
+        try:
+            stat = file_path.stat()
+        except FileNotFoundError:
+            raise FileNotFoundError(f"文件不存在: {file_path}") from None
+        
+        file_info = self._cached_read(str(file_path), stat.st_mtime_ns, stat.st_size, stat.st_ctime)
+        
+        # 返回副本，调用方修改结果不会影响缓存
+        return {**file_info, 'metadata': dict(file_info['metadata'])}
+    
+    def _read_uncached(self, path: str, mtime_ns: int, size: int, ctime: float) -> Dict[str, Any]:
+        """读取并解析文件（文件状态信息同时作为缓存键），设置了磁盘缓存时优先使用磁盘缓存"""
+        if self.cache_dir is not None:
+            file_info = self._load_disk_cache(path, mtime_ns, size)
+            if file_info is not None:
+                return file_info
+        
+        file_info = self._parse_file(Path(path), mtime_ns, size, ctime)
         
+        if self.cache_dir is not None:
+            self._save_disk_cache(path, mtime_ns, size, file_info)
+        
+        return file_info
+    
+    def _disk_cache_path(self, path: str) -> Path:
+        """磁盘缓存文件路径，以源文件路径的哈希值命名"""
+        return self.cache_dir / f"{hashlib.sha1(path.encode('utf-8')).hexdigest()}.pkl"
+    
+    def _load_disk_cache(self, path: str, mtime_ns: int, size: int) -> Optional[Dict[str, Any]]:
+        """读取磁盘缓存，源文件已修改或缓存损坏时返回 None"""
+        try:
+            with open(self._disk_cache_path(path), 'rb') as f:
+                entry = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            self.logger.debug(f"读取磁盘缓存失败 {path}: {e}")
+            return None
+        
+        if entry.get('mtime_ns') != mtime_ns or entry.get('size') != size:
+            return None
+        return entry.get('file_info')
+    
+    def _save_disk_cache(self, path: str, mtime_ns: int, size: int, file_info: Dict[str, Any]):
+        """写入磁盘缓存：先写临时文件再原子替换，避免并发读取到不完整的缓存"""
+        entry = {'mtime_ns': mtime_ns, 'size': size, 'file_info': file_info}
+        temp_path = None
+        try:
+            with tempfile.NamedTemporaryFile(dir=self.cache_dir, suffix='.tmp', delete=False) as f:
+                temp_path = f.name
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self._disk_cache_path(path))
+        except Exception as e:
+            self.logger.debug(f"写入磁盘缓存失败 {path}: {e}")
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
+    
+    def _parse_file(self, file_path: Path, mtime_ns: int, size: int, ctime: float) -> Dict[str, Any]:
+        """解析文件内容和元数据（文件状态信息由调用方的 stat 结果传入，不再重复获取）"""
         # 获取文件基本信息
-        stat = file_path.stat()
         file_info = {
             'path': str(file_path),
             'name': file_path.name,
             'stem': file_path.stem,
             'suffix': file_path.suffix.lower(),
-            'size': stat.st_size,
-            'creation_time': datetime.fromtimestamp(stat.st_ctime),
-            'modification_time': datetime.fromtimestamp(stat.st_mtime),
+            'size': size,
+            'creation_time': datetime.fromtimestamp(ctime),
+            'modification_time': datetime.fromtimestamp(mtime_ns / 1e9),
             'content': '',
             'metadata': {}
         }
         
         # 根据文件扩展名选择合适的读取方法
         try:
-            if file_info['suffix'] == '.docx':
-                file_info.update(self._read_docx(file_path))
-            elif file_info['suffix'] == '.xlsx':
-                file_info.update(self._read_xlsx(file_path))
-            elif file_info['suffix'] == '.pdf':
-                file_info.update(self._read_pdf(file_path))
-            elif file_info['suffix'] in ['.txt', '.md']:
-                file_info.update(self._read_text(file_path))
-            else:
-                raise ValueError(f"不支持的文件类型: {file_info['suffix']}")
+            file_info.update(getattr(self, self._READERS[file_info['suffix']])(file_path))
                 
         except Exception as e:
             self.logger.error(f"读取文件内容失败 {file_path}: {e}")
@@ -83,47 +529,75 @@ class FileReader:
         
         return file_info
     
+    def read_files(self, file_paths: List[Path], max_workers: Optional[int] = None,
+                   use_processes: bool = False) -> List[Union[Dict[str, Any], Exception]]:
+        """
+        并发读取多个文件
+        
+        解析库在解压和读取磁盘时会释放GIL，默认使用线程池重叠各文件的I/O；
+        以CPU解析为主的批次（如大量PDF）可改用进程池。
+        
+        Args:
+            file_paths: 文件路径列表
+            max_workers: 最大并发数，默认线程池为 min(32, CPU核心数*2)，进程池为CPU核心数
+            use_processes: 是否使用进程池
+            
+        Returns:
+            与 file_paths 顺序一致的列表，读取成功为文件信息字典，失败为对应的异常对象
+        """
+        if len(file_paths) <= 1:
+            return [self._read_file_safe(file_path) for file_path in file_paths]
+        
+        cpu_count = os.cpu_count() or 1
+        if use_processes:
+            executor = ProcessPoolExecutor(max_workers=min(max_workers or cpu_count, len(file_paths)))
+            worker = _read_file_in_process
+        else:
+            executor = ThreadPoolExecutor(max_workers=min(max_workers or min(32, cpu_count * 2), len(file_paths)))
+            worker = self._read_file_safe
+        
+        with executor:
+            return list(executor.map(worker, file_paths))
+    
+    def _read_file_safe(self, file_path: Path) -> Union[Dict[str, Any], Exception]:
+        """读取单个文件，失败时返回异常对象而不是抛出，便于批量读取"""
+        try:
+            return self.read_file(file_path)
+        except Exception as e:
+            return e
+    
     def _read_docx(self, file_path: Path) -> Dict[str, Any]:
         """读取Word文档"""
+        if LXML_AVAILABLE:
+            try:
+                return self._read_docx_fast(file_path)
+            except Exception as e:
+                if not DOCX_AVAILABLE:
+                    self.logger.error(f"读取Word文档失败: {e}")
+                    raise
+                self.logger.warning(f"快速解析Word文档失败，改用python-docx: {e}")
+        
         if not DOCX_AVAILABLE:
             raise ImportError("未安装 python-docx 库，无法读取 .docx 文件")
         
         try:
-            doc = Document(file_path)
+            # 自行打开文件：python-docx 加载失败时不会关闭它打开的压缩包，
+            # 由 with 保证任何情况下都立即释放文件句柄
+            with open(file_path, 'rb') as f:
+                doc = Document(f)
             
-            # 提取文本内容
-            content = []
-            for paragraph in doc.paragraphs:
-                if paragraph.text.strip():
-                    content.append(paragraph.text.strip())
-            
-            # 提取表格内容
-            for table in doc.tables:
-                for row in table.rows:
-                    row_text = []
-                    for cell in row.cells:
-                        if cell.text.strip():
-                            row_text.append(cell.text.strip())
-                    if row_text:
-                        content.append(' | '.join(row_text))
+            # 一次遍历正文元素同时提取段落和表格内容，
+            # 直接读取XML，不为每个元素构建 Paragraph/Table 包装对象
+            paragraphs = []
+            table_rows = []
+            for element in doc.element.body.iterchildren(_W_P, _W_TBL):
+                _collect_docx_element(element, paragraphs, table_rows)
             
             # 提取文档属性
-            core_props = doc.core_properties
-            metadata = {}
-            
-            if core_props.title:
-                metadata['title'] = core_props.title
-            if core_props.author:
-                metadata['author'] = core_props.author
-            if core_props.subject:
-                metadata['subject'] = core_props.subject
-            if core_props.created:
-                metadata['created'] = core_props.created
-            if core_props.modified:
-                metadata['modified'] = core_props.modified
+            metadata = _extract_core_props(doc.core_properties, _DOCX_CORE_PROPS)
             
             return {
-                'content': '\n'.join(content),
+                'content': '\n'.join(paragraphs + table_rows),
                 'metadata': metadata
             }
             
@@ -131,117 +605,216 @@ class FileReader:
             self.logger.error(f"读取Word文档失败: {e}")
             raise
     
+    def _read_docx_fast(self, file_path: Path) -> Dict[str, Any]:
+        """
+        直接从压缩包中流式解析 word/document.xml 读取Word文档
+        
+        只处理正文的直接子元素（与 python-docx 的 doc.paragraphs / doc.tables 范围一致），
+        每个元素处理后立即释放，内存占用与文档大小无关。输出顺序与 python-docx 路径相同：
+        先所有段落，再所有表格行。
+        """
+        paragraphs = []
+        table_rows = []
+        
+        with zipfile.ZipFile(file_path) as archive, archive.open('word/document.xml') as stream:
+            depth = 0
+            for event, element in etree.iterparse(stream, events=('start', 'end'), resolve_entities=False):
+                if event == 'start':
+                    depth += 1
+                    continue
+                
+                depth -= 1
+                # document(0) -> body(1) -> 正文元素(2)
+                if depth != 2:
+                    continue
+                
+                _collect_docx_element(element, paragraphs, table_rows)
+                
+                # 释放已处理的元素
+                element.clear()
+                while element.getprevious() is not None:
+                    del element.getparent()[0]
+        
+        return {
+            'content': '\n'.join(paragraphs + table_rows),
+            'metadata': _read_core_properties(file_path)
+        }
+    
     def _read_xlsx(self, file_path: Path) -> Dict[str, Any]:
         """读取Excel文档"""
+        if CALAMINE_AVAILABLE:
+            return self._read_xlsx_calamine(file_path)
+        
         if not XLSX_AVAILABLE:
             raise ImportError("未安装 openpyxl 库，无法读取 .xlsx 文件")
         
         try:
-            workbook = openpyxl.load_workbook(file_path, data_only=True)
-            
-            content = []
-            metadata = {}
-            
-            # 提取工作表内容
-            for sheet_name in workbook.sheetnames:
-                sheet = workbook[sheet_name]
-                content.append(f"工作表: {sheet_name}")
-                
-                # 读取有数据的行
-                for row in sheet.iter_rows(values_only=True):
-                    row_data = [str(cell) if cell is not None else '' for cell in row]
-                    if any(cell.strip() for cell in row_data):
-                        content.append(' | '.join(row_data))
+            # 只读模式按流式方式解析工作表XML，不为每个单元格构建对象，内存占用恒定
+            workbook = openpyxl.load_workbook(file_path, data_only=True, read_only=True)
+        except Exception as e:
+            self.logger.error(f"读取Excel文档失败: {e}")
+            raise
+        
+        try:
+            # 提取工作表内容，逐行写入缓冲区
+            content = _join_lines(_openpyxl_sheet_lines(workbook))
             
             # 提取文档属性
-            props = workbook.properties
-            if props.title:
-                metadata['title'] = props.title
-            if props.creator:
-                metadata['author'] = props.creator
-            if props.subject:
-                metadata['subject'] = props.subject
-            if props.created:
-                metadata['created'] = props.created
-            if props.modified:
-                metadata['modified'] = props.modified
-            
-            workbook.close()
+            metadata = _extract_core_props(workbook.properties, _XLSX_CORE_PROPS)
             
             return {
-                'content': '\n'.join(content),
+                'content': content,
                 'metadata': metadata
             }
             
         except Exception as e:
             self.logger.error(f"读取Excel文档失败: {e}")
             raise
+        finally:
+            # 只读模式会一直持有文件句柄，必须关闭
+            workbook.close()
+    
+    def _read_xlsx_calamine(self, file_path: Path) -> Dict[str, Any]:
+        """使用calamine读取Excel文档，整张工作表在原生代码中一次解析"""
+        try:
+            workbook = CalamineWorkbook.from_path(str(file_path))
+        except Exception as e:
+            self.logger.error(f"读取Excel文档失败: {e}")
+            raise
+        
+        try:
+            return {
+                'content': _join_lines(_calamine_sheet_lines(workbook)),
+                'metadata': _read_core_properties(file_path)
+            }
+            
+        except Exception as e:
+            self.logger.error(f"读取Excel文档失败: {e}")
+            raise
+        finally:
+            # 较新版本的 python-calamine 提供 close()，立即释放文件句柄
+            close = getattr(workbook, 'close', None)
+            if close is not None:
+                close()
     
     def _read_pdf(self, file_path: Path) -> Dict[str, Any]:
         """读取PDF文档"""
+        if FITZ_AVAILABLE:
+            try:
+                return self._read_pdf_fitz(file_path)
+            except Exception as e:
+                if not PDF_AVAILABLE:
+                    self.logger.error(f"PyMuPDF提取失败: {e}")
+                    raise
+                self.logger.warning(f"PyMuPDF提取失败，尝试pdfplumber: {e}")
+        
         if not PDF_AVAILABLE:
             raise ImportError("未安装 PyPDF2 或 pdfplumber 库，无法读取 .pdf 文件")
         
-        content = []
-        metadata = {}
+        # pdfplumber 逐页分析版面，文本质量更好但每页耗时远高于 PyPDF2，
+        # 页数很多的文档直接使用 PyPDF2
+        try:
+            with open(file_path, 'rb') as file:
+                page_count = len(PyPDF2.PdfReader(file).pages)
+        except Exception:
+            page_count = 0
+        
+        if page_count <= PLUMBER_MAX_PAGES:
+            try:
+                return self._read_pdf_plumber(file_path)
+            except Exception as e:
+                self.logger.warning(f"pdfplumber提取失败，尝试PyPDF2: {e}")
+        else:
+            self.logger.debug(f"PDF共 {page_count} 页，使用PyPDF2提取")
         
-        # 首先尝试使用pdfplumber（更好的文本提取）
         try:
-            with pdfplumber.open(file_path) as pdf:
-                for page in pdf.pages:
-                    text = page.extract_text()
-                    if text:
-                        content.append(text)
-                
-                # 提取元数据
-                if pdf.metadata:
-                    metadata.update({
-                        k.replace('/', ''): v for k, v in pdf.metadata.items() if v
-                    })
+            return self._read_pdf_pypdf2(file_path)
         except Exception as e:
-            self.logger.warning(f"pdfplumber提取失败，尝试PyPDF2: {e}")
+            self.logger.error(f"PyPDF2提取也失败: {e}")
+            raise
+    
+    def _read_pdf_plumber(self, file_path: Path) -> Dict[str, Any]:
+        """使用pdfplumber读取PDF文档"""
+        with pdfplumber.open(file_path) as pdf:
+            content = _join_lines(_plumber_page_texts(pdf))
             
-            # 回退到PyPDF2
-            try:
-                with open(file_path, 'rb') as file:
-                    reader = PyPDF2.PdfReader(file)
-                    
-                    # 提取文本
-                    for page in reader.pages:
-                        text = page.extract_text()
-                        if text:
-                            content.append(text)
-                    
-                    # 提取元数据
-                    if reader.metadata:
-                        metadata.update({
-                            k.replace('/', ''): v for k, v in reader.metadata.items() if v
-                        })
-                        
-            except Exception as e:
-                self.logger.error(f"PyPDF2提取也失败: {e}")
-                raise
+            # 提取元数据
+            metadata = {k.replace('/', ''): v for k, v in (pdf.metadata or {}).items() if v}
+        
+        return {
+            'content': content,
+            'metadata': metadata
+        }
+    
+    def _read_pdf_pypdf2(self, file_path: Path) -> Dict[str, Any]:
+        """使用PyPDF2读取PDF文档"""
+        with open(file_path, 'rb') as file:
+            reader = PyPDF2.PdfReader(file)
+            
+            # 提取文本
+            content = _join_lines(_pypdf2_page_texts(reader))
+            
+            # 提取元数据
+            metadata = {k.replace('/', ''): v for k, v in (reader.metadata or {}).items() if v}
+        
+        return {
+            'content': content,
+            'metadata': metadata
+        }
+    
+    def _read_pdf_fitz(self, file_path: Path) -> Dict[str, Any]:
+        """使用PyMuPDF读取PDF文档"""
+        with fitz.open(file_path) as doc:
+            page_count = doc.page_count
+            metadata = {
+                _FITZ_METADATA_KEYS[key]: value
+                for key, value in (doc.metadata or {}).items()
+                if value and key in _FITZ_METADATA_KEYS
+            }
+            # 守护进程（如其他进程池的工作进程）不能再创建子进程
+            parallel = page_count > PARALLEL_PDF_MIN_PAGES and not multiprocessing.current_process().daemon
+            if not parallel:
+                content = _join_lines(page.get_text("text", flags=_FITZ_TEXT_FLAGS) for page in doc)
+        
+        if parallel:
+            content = self._read_pdf_pages_parallel(str(file_path), page_count)
         
         return {
-            'content': '\n'.join(content),
+            'content': content,
             'metadata': metadata
         }
     
+    def _read_pdf_pages_parallel(self, path: str, page_count: int) -> str:
+        """
+        将PDF页面均分给多个进程并行提取文本，按页码顺序拼接
+        
+        注意：文件位于机械硬盘时多个进程随机读取可能反而比顺序读取慢。
+        """
+        workers = min(os.cpu_count() or 1, MAX_PDF_WORKERS)
+        step = -(-page_count // workers)
+        ranges = [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+        
+        self.logger.debug(f"并行提取PDF文本: {page_count} 页, {len(ranges)} 个进程")
+        with ProcessPoolExecutor(max_workers=len(ranges)) as executor:
+            futures = [executor.submit(_extract_pdf_pages, path, start, end) for start, end in ranges]
+            # 按提交顺序（即页码顺序）收集结果
+            results = [future.result() for future in futures]
+        
+        return _join_lines(text for _, texts in results for text in texts)
+    
     def _read_text(self, file_path: Path) -> Dict[str, Any]:
         """读取纯文本文件"""
         try:
-            # 尝试不同的编码
-            encodings = ['utf-8', 'gbk', 'gb2312', 'utf-16', 'latin1']
-            
-            for encoding in encodings:
-                try:
-                    with open(file_path, 'r', encoding=encoding) as f:
-                        content = f.read()
-                    break
-                except UnicodeDecodeError:
-                    continue
+            # 只读取一次文件，在内存中解码；大文件直接从内存映射解码
+            if file_path.stat().st_size >= MMAP_MIN_BYTES:
+                with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    content, encoding = self._decode_text(mapped, str(file_path.parent))
             else:
-                raise UnicodeDecodeError("无法使用常见编码读取文件")
+                content, encoding = self._decode_text(file_path.read_bytes(), str(file_path.parent))
+            
+            # 与文本模式读取一致，统一换行符
+            if '\r' in content:
+                content = content.replace('\r\n', '\n').replace('\r', '\n')
             
             return {
                 'content': content,
@@ -252,16 +825,70 @@ class FileReader:
             self.logger.error(f"读取文本文件失败: {e}")
             raise
     
+    def _decode_text(self, raw, hint_key: Optional[str] = None) -> tuple:
+        """
+        解码文本文件内容
+        
+        带字节顺序标记的文件直接按标记解码；UTF-8 最常见，直接尝试；
+        否则先尝试同一目录上一个文件的编码，再在安装了 charset_normalizer 时
+        根据文件开头检测编码，最后依次尝试常见编码。所有候选编码都严格解码；
+        单字节编码几乎不会解码失败，只有多字节编码（见 _HINTABLE_ENCODINGS）才记为目录提示。
+        
+        Args:
+            raw: 文件内容，bytes 或内存映射等支持缓冲区协议的对象
+            hint_key: 编码提示的键（文件所在目录）
+            
+        Returns:
+            (文本内容, 编码名称)
+        """
+        prefix = raw[:4]
+        for bom, encoding in _BOM_ENCODINGS:
+            if prefix.startswith(bom):
+                try:
+                    return str(raw, encoding), encoding
+                except UnicodeDecodeError:
+                    break
+        
+        try:
+            return str(raw, 'utf-8'), 'utf-8'
+        except UnicodeDecodeError:
+            pass
+        
+        hint = _ENCODING_HINTS.get(hint_key) if hint_key else None
+        if hint:
+            try:
+                return str(raw, hint), hint
+            except UnicodeDecodeError:
+                pass
+        
+        candidates = list(_TEXT_ENCODINGS[1:])
+        if CHARSET_NORMALIZER_AVAILABLE:
+            best = charset_normalizer.from_bytes(raw[:ENCODING_SNIFF_BYTES]).best()
+            if best is not None:
+                # 采样部分检测出的编码不一定适用于整个文件，失败时继续尝试常见编码
+                candidates.insert(0, best.encoding)
+        
+        for encoding in candidates:
+            try:
+                content = str(raw, encoding)
+            except (UnicodeDecodeError, LookupError):
+                continue
+            
+            # 单字节编码几乎能解码任意字节，不能作为同目录其他文件的提示
+            if hint_key and codecs.lookup(encoding).name in _HINTABLE_ENCODINGS:
+                _ENCODING_HINTS[hint_key] = encoding
+            return content, encoding
+        
+        # latin1 可以解码任意字节，不会执行到这里
+        return str(raw, 'utf-8', 'replace'), 'utf-8'
+    
     @staticmethod
     def get_supported_extensions() -> list[str]:
         """获取支持的文件扩展名"""
-        extensions = ['.txt', '.md']
-        
-        if DOCX_AVAILABLE:
-            extensions.append('.docx')
-        if XLSX_AVAILABLE:
-            extensions.append('.xlsx')
-        if PDF_AVAILABLE:
-            extensions.append('.pdf')
-        
-        return extensions 
\ No newline at end of file
+        return [extension for extension in FileReader._READERS
+                if _READER_AVAILABLE.get(extension, True)]
+
+
+def _read_file_in_process(file_path: Path) -> Union[Dict[str, Any], Exception]:
+    """进程池工作函数：在子进程中读取单个文件"""
+    return FileReader()._read_file_safe(file_path)
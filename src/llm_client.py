@@ -4,14 +4,604 @@ LLM客户端
 """
 
 import json
+import asyncio
+import pickle
+import random
+import hashlib
 import logging
+import multiprocessing
+import tempfile
+import threading
+import time
 import requests
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import MaxRetryError
+from urllib3.util.retry import Retry
 from typing import Dict, Any, Optional, List
 from datetime import datetime
 import re
 import os
+import bisect
 from pathlib import Path
-import yaml
+
+from .config_manager import load_yaml
+from .batch_dispatcher import BatchDispatcher
+
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+try:
+    import numpy as np
+    from sentence_transformers import SentenceTransformer
+    SEMANTIC_CACHE_AVAILABLE = True
+except ImportError:
+    SEMANTIC_CACHE_AVAILABLE = False
+
+# 响应解析使用的正则表达式
+_JSON_ARRAY_FENCED_RE = re.compile(r'```(?:json)?\s*(\[.*?\])\s*```', re.DOTALL)
+_POTENTIAL_SUBJECT_RE = re.compile(r'["\']([^"\']{3,50})["\']')
+
+# 文件夹建议解析失败时，从响应文本中查找的常见文件夹名（按优先级排列）
+_FALLBACK_FOLDERS = ('会议纪要', '项目文档', '技术文档', '财务报告', '人力资源',
+                     '管理制度', '客户资料', '培训材料', '技术方案', '项目管理')
+_FALLBACK_FOLDERS_RE = re.compile('|'.join(_FALLBACK_FOLDERS))
+
+# 强制匹配时使用的通用分类规则，优先级从高到低
+_GENERIC_CLASSIFICATION_RULES = (
+    # 技术相关
+    {
+        'keywords': ['技术', '开发', '系统', '软件', '代码', '程序', '工程', 'tech', 'dev'],
+        'target_patterns': ['技术', '开发', '工程', 'tech']
+    },
+    # 管理相关
+    {
+        'keywords': ['管理', '项目', '计划', '规划', '策略', 'management', 'project'],
+        'target_patterns': ['项目', '管理', 'project']
+    },
+    # 业务相关
+    {
+        'keywords': ['业务', '流程', '规范', '标准', '需求', 'business'],
+        'target_patterns': ['业务', '流程', 'business']
+    },
+    # 人事相关
+    {
+        'keywords': ['人事', '人力', '员工', '招聘', '培训', '面试', 'hr'],
+        'target_patterns': ['人力资源', '人事', 'hr', '培训']
+    },
+    # 财务相关
+    {
+        'keywords': ['财务', '预算', '成本', '费用', '报告', 'finance'],
+        'target_patterns': ['财务', 'finance', '报告']
+    },
+    # 会议交流相关
+    {
+        'keywords': ['会议', '纪要', '讨论', '沟通', 'meeting'],
+        'target_patterns': ['会议', 'meeting', '沟通']
+    },
+    # 学习成长相关
+    {
+        'keywords': ['学习', '成长', '知识', '教育', '哲学', '思考'],
+        'target_patterns': ['学习', '成长', '知识', '教育']
+    }
+)
+
+_JSON_DECODER = json.JSONDecoder()
+
+def _json_default(value: Any) -> str:
+    """JSON编码无法直接表示的值：日期时间格式化为字符串，其他对象使用 str()"""
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    return str(value)
+
+
+# JSON编解码：安装了orjson时使用其C实现（解析错误同样是 json.JSONDecodeError 的子类）
+if ORJSON_AVAILABLE:
+    _json_loads = orjson.loads
+
+    def _json_body(obj: Any) -> bytes:
+        """编码请求体为UTF-8 JSON"""
+        return orjson.dumps(obj)
+
+    def _json_pretty(obj: Any) -> str:
+        """编码为缩进2格的JSON文本，保留非ASCII字符，日期时间等对象由 _json_default 转换"""
+        return orjson.dumps(
+            obj, default=_json_default,
+            option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        ).decode('utf-8')
+else:
+    _json_loads = json.loads
+
+    def _json_body(obj: Any) -> bytes:
+        """编码请求体为UTF-8 JSON"""
+        return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+    def _json_pretty(obj: Any) -> str:
+        """编码为缩进2格的JSON文本，保留非ASCII字符，日期时间等对象由 _json_default 转换"""
+        return json.dumps(obj, ensure_ascii=False, indent=2, default=_json_default)
+
+# 严格文件夹建议提示词模板，{SUBJECT}/{STRUCTURE}/{EXISTING} 在调用时填充
+_FOLDER_SUGGESTION_TEMPLATE = """
+请为文档主体"{SUBJECT}"建议合适的文件夹归档路径。
+
+**当前知识库文件夹结构参考：**
+{STRUCTURE}
+
+**现有文件夹完整列表：**
+{EXISTING}
+
+**绝对严格要求（违反将导致处理失败）：**
+1. **suggested_path必须完全等于现有文件夹列表中的某一项**
+2. **绝对禁止创建任何新文件夹，create_new必须为false**
+3. **必须从上述现有文件夹列表中选择最匹配的一个**
+4. **如果主体包含"运维"、"监控"、"部署"关键词，必须选择"技术方案/DevOps运维"**
+5. **如果主体包含"容器"、"Docker"关键词，必须选择"技术方案/容器化部署"**
+
+**强制选择逻辑（按此优先级执行）：**
+- 运维/监控/部署相关 → 强制选择 "技术方案/DevOps运维"
+- 容器/Docker相关 → 强制选择 "技术方案/容器化部署"  
+- 项目管理相关 → 强制选择 "项目文档/项目管理"
+- 会议记录相关 → 强制选择 "会议纪要"
+- 培训相关 → 强制选择 "人力资源/培训计划"
+- 面试相关 → 强制选择 "人力资源/面试记录"
+- 其他技术文档 → 强制选择 "技术方案"
+
+**请严格按照JSON格式返回：**
+
+{{
+    "suggested_path": "必须是现有文件夹列表中的完整路径",
+    "create_new": false,
+    "reasoning": "详细说明为什么选择这个现有文件夹"
+}}
+
+**最后检查：返回前确认suggested_path确实在现有文件夹列表中！**
+"""
+
+# 不符合Windows文件系统规范的字符统一替换为下划线
+_FILENAME_TRANS = str.maketrans(dict.fromkeys('<>:"|?*/\\', '_'))
+
+# 知识库结构文件中文件夹结构部分的起止标记
+_STRUCTURE_START_MARKER = "## 🗂️ 当前文件夹结构"
+_STRUCTURE_END_MARKER = "## 📋 分类规则"
+
+
+# 需要重试的HTTP状态码（限流与服务端错误）及重试退避参数
+_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+_RETRY_BACKOFF_FACTOR = 0.3
+_RETRY_JITTER = 0.5
+
+
+# 服务端要求等待超过该秒数(Retry-After)时不再重试，避免调用方长时间挂起
+_MAX_RETRY_AFTER = 60
+
+
+def _retry_delay(attempt: int, retry_after: Optional[str]) -> Optional[float]:
+    """
+    计算第 attempt 次重试前的等待秒数：优先遵循 Retry-After，否则指数退避，并加入随机抖动避免请求同时重试
+    
+    Returns:
+        等待秒数；Retry-After 超过 _MAX_RETRY_AFTER 时返回 None，表示放弃重试
+    """
+    try:
+        delay = float(retry_after)
+    except (TypeError, ValueError):
+        delay = _RETRY_BACKOFF_FACTOR * (2 ** attempt)
+    else:
+        if delay > _MAX_RETRY_AFTER:
+            return None
+    return delay + random.uniform(0, _RETRY_JITTER)
+
+
+class _CappedRetry(Retry):
+    """Retry-After 超过 _MAX_RETRY_AFTER 时放弃重试，直接把限流响应返回给调用方"""
+    
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        if response is not None:
+            retry_after = self.get_retry_after(response)
+            if retry_after is not None and retry_after > _MAX_RETRY_AFTER:
+                raise MaxRetryError(_pool, url, f"Retry-After {retry_after:.0f} 秒超过上限 {_MAX_RETRY_AFTER} 秒")
+        return super().increment(method, url, response=response, error=error, _pool=_pool, _stacktrace=_stacktrace)
+
+
+# 按token截断时先按字符粗截，避免对超长文档整体分词（单个token很少超过8个字符）
+_CHARS_PER_TOKEN_BOUND = 8
+
+
+@lru_cache(maxsize=1)
+def _get_token_encoding():
+    """加载tiktoken编码（首次使用时加载，失败时返回 None 并回退到按字符截断）"""
+    try:
+        return tiktoken.get_encoding('cl100k_base')
+    except Exception as e:
+        logging.getLogger(__name__).warning(f"加载tiktoken编码失败，按字符截断内容: {e}")
+        return None
+
+
+def _truncate_to_tokens(text: str, max_tokens: int, max_chars: int) -> str:
+    """按token数截断文本；未安装tiktoken时按字符数截断"""
+    encoding = _get_token_encoding() if TIKTOKEN_AVAILABLE else None
+    if encoding is None:
+        return text[:max_chars]
+    
+    text = text[:max_tokens * _CHARS_PER_TOKEN_BOUND]
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    # 截断处可能落在多字节字符中间，去掉解码产生的替换字符
+    return encoding.decode(tokens[:max_tokens]).rstrip('\ufffd')
+
+
+def _dir_mtime(path: str) -> Optional[int]:
+    """获取目录的修改时间（纳秒），目录不存在时返回 None"""
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+@lru_cache(maxsize=4)
+def _folder_name_index(names: frozenset) -> Dict[str, Any]:
+    """
+    构建文件夹名称索引（按文件夹名集合缓存，文件夹变化时重建）
+    
+    automaton: 所有文件夹名的Aho-Corasick自动机，一次扫描即可找出主体中出现的全部文件夹名；
+    joined/offsets: 文件夹名以空字符拼接后的字符串及各名称起始位置，用于反查包含某个词的文件夹名
+    """
+    ordered = sorted(names)
+    offsets = []
+    position = 0
+    for name in ordered:
+        offsets.append(position)
+        position += len(name) + 1
+    
+    automaton = None
+    if AHOCORASICK_AVAILABLE:
+        automaton = ahocorasick.Automaton()
+        for name in ordered:
+            if name:
+                automaton.add_word(name, name)
+        if len(automaton):
+            automaton.make_automaton()
+        else:
+            automaton = None
+    
+    return {'names': ordered, 'offsets': offsets, 'joined': '\x00'.join(ordered), 'automaton': automaton}
+
+
+def _build_keyword_index(rules: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    构建分类关键词的反向索引
+    
+    categories: 关键词（小写）到 {类别: 该关键词在类别中出现的次数} 的映射；
+    order: 类别在规则中的顺序，用于保持同分时的选择结果；
+    automaton: 可选的Aho-Corasick自动机，一次扫描找出主体中出现的全部关键词；
+    scoring: 类别到 (关键词总数, 优先级, 优先级加分) 的映射；
+    subfolders: 类别到 ((子文件夹名, 小写关键词元组, 关键词总数), ...) 的映射
+    """
+    categories = {}
+    scoring = {}
+    subfolders = {}
+    for category_name, category_info in rules.items():
+        priority = category_info.get('priority', 99)
+        # 优先级调整：优先级越高（数值越小），加分越多
+        scoring[category_name] = (len(category_info.get('keywords', [])), priority,
+                                  max(0, (100 - priority) / 100 * 0.1))
+        subfolders[category_name] = tuple(
+            (subfolder_name,
+             tuple(keyword.lower() for keyword in subfolder_config.get('keywords', []) if isinstance(keyword, str)),
+             len(subfolder_config.get('keywords', [])))
+            for subfolder_name, subfolder_config in (category_info.get('subfolders') or {}).items()
+        )
+        for keyword in category_info.get('keywords', []):
+            if isinstance(keyword, str):
+                counts = categories.setdefault(keyword.lower(), {})
+                counts[category_name] = counts.get(category_name, 0) + 1
+    
+    automaton = None
+    if AHOCORASICK_AVAILABLE and any(categories):
+        automaton = ahocorasick.Automaton()
+        for keyword in categories:
+            if keyword:
+                automaton.add_word(keyword, keyword)
+        automaton.make_automaton()
+    
+    return {
+        'categories': categories,
+        'order': {name: rank for rank, name in enumerate(rules)},
+        'automaton': automaton,
+        'scoring': scoring,
+        'subfolders': subfolders
+    }
+
+
+def _build_generic_rule_automaton():
+    """构建通用分类规则关键词的Aho-Corasick自动机，值为包含该关键词的规则序号元组；未安装 pyahocorasick 时返回 None"""
+    if not AHOCORASICK_AVAILABLE:
+        return None
+    
+    rule_indexes = {}
+    for rule_index, rule in enumerate(_GENERIC_CLASSIFICATION_RULES):
+        for keyword in rule['keywords']:
+            rule_indexes.setdefault(keyword, []).append(rule_index)
+    
+    automaton = ahocorasick.Automaton()
+    for keyword, indexes in rule_indexes.items():
+        automaton.add_word(keyword, tuple(indexes))
+    automaton.make_automaton()
+    return automaton
+
+
+_GENERIC_RULE_AUTOMATON = _build_generic_rule_automaton()
+
+
+def _match_generic_rules(subject_lower: str) -> List[int]:
+    """返回主体中出现了关键词的通用分类规则序号（按优先级顺序），有自动机时只扫描主体一次"""
+    if _GENERIC_RULE_AUTOMATON is None:
+        return [rule_index for rule_index, rule in enumerate(_GENERIC_CLASSIFICATION_RULES)
+                if any(keyword in subject_lower for keyword in rule['keywords'])]
+    
+    hits = set()
+    for _, indexes in _GENERIC_RULE_AUTOMATON.iter(subject_lower):
+        hits.update(indexes)
+    return sorted(hits)
+
+
+# 匹配结果缓存的最大条目数，超出时淘汰最早加入的条目
+_MATCH_MEMO_SIZE = 4096
+
+# 区分"未缓存"与缓存的 None 结果
+_MISSING = object()
+
+
+def _memo_put(memo: Dict[Any, Any], key: Any, value: Any):
+    """写入匹配结果缓存（包括 None 结果），超出容量时淘汰最早加入的条目"""
+    if len(memo) >= _MATCH_MEMO_SIZE:
+        try:
+            del memo[next(iter(memo))]
+        except (StopIteration, KeyError, RuntimeError):
+            pass
+    memo[key] = value
+
+
+def _first_pattern_folder(patterns: List[str], folders: List[str],
+                          cache: Optional[Dict[tuple, Any]] = None) -> Optional[tuple]:
+    """
+    按模式顺序、再按文件夹顺序查找第一个包含模式的文件夹
+    
+    Args:
+        patterns: 目标模式列表
+        folders: 文件夹路径列表
+        cache: 与 folders 对应的结果缓存，文件夹列表不变时同一组模式只需查找一次
+        
+    Returns:
+        (模式, 文件夹路径)，没有匹配时返回 None
+    """
+    key = tuple(patterns)
+    if cache is not None and key in cache:
+        return cache[key]
+    
+    result = None
+    for pattern in key:
+        for folder_path in folders:
+            if pattern in folder_path:
+                result = (pattern, folder_path)
+                break
+        if result:
+            break
+    
+    if cache is not None:
+        cache[key] = result
+    return result
+
+
+def _best_scored_category(category_scores: Dict[str, tuple]) -> Optional[str]:
+    """从 _score_categories 的结果中选出分数最高的类别，同分时优先级数值小者优先，再按规则顺序"""
+    best_name = None
+    best_key = None
+    for category_name, (score, _, priority) in category_scores.items():
+        key = (score, -priority)
+        if best_key is None or key > best_key:
+            best_name, best_key = category_name, key
+    return best_name
+
+
+@lru_cache(maxsize=8)
+def _load_rules_cached(path: str, mtime_ns: int) -> Dict[str, Any]:
+    """按 (路径, 修改时间) 缓存的分类规则，文件修改后自动重新解析（返回值为共享对象，不可修改）"""
+    return load_yaml(path)
+
+
+@lru_cache(maxsize=8)
+def _load_structure_cached(path: str, mtime_ns: int) -> str:
+    """按 (路径, 修改时间) 缓存的知识库结构摘要：文件夹结构部分，找不到标记时取前1000字符"""
+    with open(path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    
+    start_idx = content.find(_STRUCTURE_START_MARKER)
+    end_idx = content.find(_STRUCTURE_END_MARKER)
+    if start_idx != -1 and end_idx != -1:
+        return content[start_idx:end_idx].strip()
+    return content[:1000]
+
+
+def _extract_json_object(text: str, required_key: str) -> Optional[Dict[str, Any]]:
+    """从任意位置开始逐个尝试解码JSON对象，返回第一个包含 required_key 的对象（支持嵌套和```代码块）"""
+    start = text.find('{')
+    while start != -1:
+        try:
+            obj, end = _JSON_DECODER.raw_decode(text, start)
+        except ValueError:
+            start = text.find('{', start + 1)
+            continue
+        if isinstance(obj, dict) and required_key in obj:
+            return obj
+        start = text.find('{', end)
+    return None
+
+
+class _SemanticCache:
+    """
+    基于提示词向量的语义缓存
+    
+    提示词编码为归一化向量，内积即余弦相似度；与已缓存提示词的相似度达到阈值时直接复用其响应。
+    条目数超过上限时淘汰最久未命中的条目，向量与响应分别持久化为 .npy 和 .pkl 文件。
+    """
+    
+    def __init__(self, cache_dir: Optional[Path], model_name: str, threshold: float, max_entries: int):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.logger = logging.getLogger(__name__)
+        self._model_name = model_name
+        self._model = None
+        self._lock = threading.Lock()
+        self._clock = 0
+        
+        self._vectors_path = cache_dir / 'semantic_vectors.npy' if cache_dir else None
+        self._entries_path = cache_dir / 'semantic_entries.pkl' if cache_dir else None
+        self._vectors = None
+        self._responses = []
+        self._last_used = []
+        self._load()
+    
+    def get(self, prompt: str) -> Optional[str]:
+        """查找语义相近的已缓存响应"""
+        vector = self._encode(prompt)
+        with self._lock:
+            if not self._responses:
+                return None
+            scores = self._vectors @ vector
+            best = int(scores.argmax())
+            if scores[best] < self.threshold:
+                return None
+            self._clock += 1
+            self._last_used[best] = self._clock
+            self.logger.debug(f"语义缓存命中，相似度: {scores[best]:.3f}")
+            return self._responses[best]
+    
+    def put(self, prompt: str, response: str):
+        """缓存新的响应，超出上限时淘汰最久未命中的条目"""
+        vector = self._encode(prompt)
+        with self._lock:
+            self._clock += 1
+            if self._vectors is None:
+                self._vectors = vector[None, :]
+            elif len(self._responses) >= self.max_entries:
+                oldest = min(range(len(self._last_used)), key=self._last_used.__getitem__)
+                self._vectors[oldest] = vector
+                self._responses[oldest] = response
+                self._last_used[oldest] = self._clock
+                self._save()
+                return
+            else:
+                self._vectors = np.vstack([self._vectors, vector[None, :]])
+            self._responses.append(response)
+            self._last_used.append(self._clock)
+            self._save()
+    
+    def _encode(self, prompt: str):
+        """编码提示词，嵌入模型在首次使用时加载"""
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = SentenceTransformer(self._model_name)
+        return self._model.encode(prompt, normalize_embeddings=True).astype(np.float32)
+    
+    def _load(self):
+        """读取持久化的语义缓存，文件缺失或不一致时从空缓存开始"""
+        if self._vectors_path is None:
+            return
+        try:
+            vectors = np.load(self._vectors_path)
+            with open(self._entries_path, 'rb') as f:
+                entries = pickle.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            self.logger.debug(f"读取语义缓存失败: {e}")
+            return
+        
+        if len(vectors) != len(entries['responses']):
+            return
+        self._vectors = vectors
+        self._responses = entries['responses']
+        self._last_used = entries['last_used']
+        self._clock = max(self._last_used, default=0)
+    
+    def _save(self):
+        """持久化语义缓存：先写临时文件再原子替换"""
+        if self._vectors_path is None:
+            return
+        try:
+            self._vectors_path.parent.mkdir(parents=True, exist_ok=True)
+            for path, write in ((self._vectors_path, lambda f: np.save(f, self._vectors)),
+                                (self._entries_path, lambda f: pickle.dump(
+                                    {'responses': self._responses, 'last_used': self._last_used}, f))):
+                with tempfile.NamedTemporaryFile(dir=path.parent, suffix='.tmp', delete=False) as f:
+                    write(f)
+                os.replace(f.name, path)
+        except Exception as e:
+            self.logger.debug(f"写入语义缓存失败: {e}")
+
+
+class SharedRequestLimits:
+    """
+    多个进程共用的API并发数与每分钟请求数限制
+    
+    进程池的初始化参数把同一个实例传给各子进程，主进程和子进程的LLM客户端
+    通过 LLMClient.share_limits 共用同一份配额，总请求量仍符合配置的上限。
+    """
+    
+    def __init__(self, config: Dict[str, Any]):
+        """
+        Args:
+            config: 包含LLM配置的字典
+        """
+        llm_config = config.get('llm', {})
+        self.requests_per_minute = llm_config.get('requests_per_minute', 0)
+        self.slots = multiprocessing.BoundedSemaphore(llm_config.get('max_concurrent_requests', 4))
+        self._lock = multiprocessing.Lock()
+        # 最近 requests_per_minute 次请求的时间（环形缓冲）与下一个写入位置
+        self._request_times = multiprocessing.Array('d', max(self.requests_per_minute, 1), lock=False)
+        self._next_index = multiprocessing.Value('i', 0, lock=False)
+    
+    def throttle(self, logger: logging.Logger):
+        """按 requests_per_minute 限制所有进程的请求速率，超出时等待最早的请求移出窗口"""
+        if not self.requests_per_minute:
+            return
+        
+        with self._lock:
+            index = self._next_index.value
+            oldest = self._request_times[index]
+            wait = 60 - (time.time() - oldest)
+            if oldest and wait > 0:
+                logger.info(f"已达到每分钟请求上限，等待 {wait:.1f} 秒")
+                time.sleep(wait)
+            
+            self._request_times[index] = time.time()
+            self._next_index.value = (index + 1) % len(self._request_times)
 
 
 class LLMClient:
@@ -28,8 +618,87 @@ class LLMClient:
         self.enabled = self.config.get('enabled', True)  # 默认启用
         self.logger = logging.getLogger(__name__)
         
+        # 并发处理时限制同时进行的API请求数，避免触发服务商限流
+        max_concurrent = self.config.get('max_concurrent_requests', 4)
+        self._request_slots = threading.BoundedSemaphore(max_concurrent)
+        
+        # 复用TCP/TLS连接，连接池大小与并发请求数一致；限流和服务端错误按退避策略自动重试
+        self.session = requests.Session()
+        retry_options = dict(
+            total=self.config.get('max_retries', 3),
+            backoff_factor=_RETRY_BACKOFF_FACTOR,
+            status_forcelist=_RETRY_STATUSES,
+            allowed_methods=frozenset({'GET', 'POST'}),
+            raise_on_status=False
+        )
+        try:
+            retry = _CappedRetry(backoff_jitter=_RETRY_JITTER, **retry_options)
+        except TypeError:
+            # urllib3 1.x 不支持退避抖动
+            retry = _CappedRetry(**retry_options)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrent, max_retries=retry)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        
+        # 异步接口使用的aiohttp会话与信号量，首次调用时在当前事件循环中创建
+        self._max_concurrent = max_concurrent
+        self._async_session = None
+        self._async_slots = None
+        self._async_loop = None
+        
+        # 批处理API：延迟预算不低于 batch_min_latency_ms 的异步请求攒批提交
+        self._batch_enabled = self.config.get('batch_api', False)
+        self._batch_min_latency_ms = self.config.get('batch_min_latency_ms', 600000)
+        self._batch_dispatcher = None
+        self._batch_loop = None
+        
+        # 每分钟请求数上限（0 表示不限制），记录最近一分钟内的请求时间
+        self._requests_per_minute = self.config.get('requests_per_minute', 0)
+        self._request_times = deque()
+        self._rate_lock = threading.Lock()
+        # 进程池处理时由 share_limits 设置，改用进程间共享的限制
+        self._shared_limits = None
+        
+        # 响应磁盘缓存：相同提示词的结果跨运行复用，cache_dir 为空时禁用
+        cache_dir = self.config.get('cache_dir', '.llm_cache')
+        self._cache_dir = Path(cache_dir) if cache_dir else None
+        self._cache_ttl = self.config.get('cache_ttl_days', 30) * 86400
+        
+        # 可选的语义缓存：提示词向量足够接近时复用已有响应（需要 sentence-transformers）
+        self._semantic_cache = None
+        if self.config.get('semantic_cache', False):
+            if SEMANTIC_CACHE_AVAILABLE:
+                self._semantic_cache = _SemanticCache(
+                    self._cache_dir,
+                    self.config.get('semantic_cache_model', 'all-MiniLM-L6-v2'),
+                    self.config.get('semantic_cache_threshold', 0.87),
+                    self.config.get('semantic_cache_max_entries', 5000)
+                )
+            else:
+                self.logger.warning("未安装 sentence-transformers，语义缓存已禁用")
+        
+        # 文件夹建议结果，按 (主体, 文件夹集合) 缓存，相同主体的文档无需重复匹配和调用LLM
+        self._suggestion_cache_size = self.config.get('suggestion_cache_size', 1024)
+        self._suggestion_cache = OrderedDict()
+        self._suggestion_lock = threading.Lock()
+        
+        # 知识库文件夹扫描结果，按各目录的mtime指纹缓存
+        self._folders_cache = None
+        self._folders_lock = threading.Lock()
+        
+        # 后台预热知识库结构和文件夹扫描缓存，与下面的规则加载并行进行，缩短首次文件夹建议的耗时
+        if self.config.get('prewarm', True):
+            prewarm = ThreadPoolExecutor(max_workers=2, thread_name_prefix='llm-prewarm')
+            prewarm.submit(self._read_knowledge_base_structure)
+            prewarm.submit(self._scan_current_folders)
+            prewarm.shutdown(wait=False)
+        
         # 加载分类规则配置
         self.classification_rules = self._load_classification_rules()
+        self._keyword_index = _build_keyword_index(
+            (self.classification_rules or {}).get('classification_rules') or {})
+        # 语义分类结果，按小写主体缓存
+        self._category_matches = {}
         
         # API密钥获取优先级：config.yaml > 环境变量
         api_key = self.config.get('api_key')
@@ -63,14 +732,15 @@ class LLMClient:
         """加载分类规则配置"""
         try:
             rules_file = Path("config/classification_rules.yaml")
-            if rules_file.exists():
-                with open(rules_file, 'r', encoding='utf-8') as f:
-                    rules = yaml.safe_load(f)
-                self.logger.info("成功加载分类规则配置")
-                return rules
-            else:
+            try:
+                mtime_ns = rules_file.stat().st_mtime_ns
+            except FileNotFoundError:
                 self.logger.warning("分类规则配置文件不存在，使用默认规则")
                 return self._get_default_classification_rules()
+            
+            rules = _load_rules_cached(str(rules_file), mtime_ns)
+            self.logger.info("成功加载分类规则配置")
+            return rules
         except Exception as e:
             self.logger.error(f"加载分类规则失败: {e}")
             return self._get_default_classification_rules()
@@ -126,7 +796,7 @@ class LLMClient:
             prompt = self._build_subject_extraction_prompt(file_info)
             
             # 调用LLM API
-            response = self._call_llm_api(prompt)
+            response = self._call_llm_api(prompt, json_object=True)
             
             # 解析响应
             result = self._parse_subject_response(response)
@@ -143,6 +813,38 @@ class LLMClient:
                 'reasoning': f'LLM调用失败: {str(e)}'
             }
     
+    def extract_subjects_batch(self, file_infos: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        在一次LLM调用中提取多个文档的主体
+        
+        Args:
+            file_infos: 文件信息字典列表
+            
+        Returns:
+            与 file_infos 顺序一致的结果列表，格式同 extract_subject_and_folder
+        """
+        if len(file_infos) <= 1 or not self.enabled:
+            return [self.extract_subject_and_folder(info) for info in file_infos]
+        
+        parsed = {}
+        try:
+            prompt = self._build_batch_subject_extraction_prompt(file_infos)
+            # 每个文档的结果约占150个token
+            response = self._call_llm_api(prompt, max_tokens=max(1000, 150 * len(file_infos)))
+            parsed = self._parse_batch_subject_response(response)
+            self.logger.info(f"LLM批量提取主体成功: {len(parsed)}/{len(file_infos)}")
+        except Exception as e:
+            self.logger.error(f"LLM批量提取主体失败: {e}")
+        
+        # 批量响应中缺失的文档逐个重新提取
+        results = []
+        for index, file_info in enumerate(file_infos):
+            result = parsed.get(index)
+            if result is None:
+                result = self.extract_subject_and_folder(file_info)
+            results.append(result)
+        return results
+    
     def check_content_similarity(self, content1: str, content2: str) -> Dict[str, Any]:
         """
         检查两个文档内容的相似性
@@ -163,7 +865,7 @@ class LLMClient:
         
         try:
             prompt = self._build_similarity_prompt(content1, content2)
-            response = self._call_llm_api(prompt)
+            response = self._call_llm_api(prompt, json_object=True)
             result = self._parse_similarity_response(response)
             
             self.logger.info(f"内容相似性检查完成: {result['similarity_score']}")
@@ -177,6 +879,33 @@ class LLMClient:
                 'reasoning': f'LLM调用失败: {str(e)}'
             }
     
+    def check_content_similarity_batch(self, content: str, candidates: List[str]) -> List[Dict[str, Any]]:
+        """
+        在一次LLM调用中检查一个文档与多个文档的相似性
+        
+        Args:
+            content: 待比较的文档内容
+            candidates: 已有文档内容列表
+            
+        Returns:
+            与 candidates 顺序一致的相似性结果列表，格式同 check_content_similarity
+        """
+        if len(candidates) <= 1 or not self.enabled:
+            return [self.check_content_similarity(content, candidate) for candidate in candidates]
+        
+        parsed = {}
+        try:
+            prompt = self._build_batch_similarity_prompt(content, candidates)
+            response = self._call_llm_api(prompt, max_tokens=max(1000, 100 * len(candidates)))
+            parsed = self._parse_batch_similarity_response(response)
+            self.logger.info(f"批量相似性检查完成: {len(parsed)}/{len(candidates)}")
+        except Exception as e:
+            self.logger.error(f"批量相似性检查失败: {e}")
+        
+        # 批量响应中缺失的文档逐个重新检查
+        return [parsed.get(index) or self.check_content_similarity(content, candidate)
+                for index, candidate in enumerate(candidates)]
+    
     def suggest_folder_structure(self, subject: str, existing_folders: List[str]) -> Dict[str, Any]:
         """
         基于主体和现有文件夹建议合适的文件夹结构
@@ -196,170 +925,360 @@ class LLMClient:
             }
         
         try:
-            self.logger.info(f"开始文件夹建议 - 主体: {subject}")
-            
             # 重新扫描文件夹结构，确保获取最新的手动修改
-            refreshed_folders = self._scan_current_folders()
-            combined_folders = list(set(existing_folders + refreshed_folders))
-            self.logger.info(f"合并后的文件夹列表: {combined_folders}")
+            folder_index = self._get_folder_index(existing_folders)
+            cache_key = (subject, folder_index['path_set'])
+            cached = self._get_cached_suggestion(cache_key)
+            if cached is not None:
+                return cached
             
-            # 第一步：尝试精确文本匹配
-            exact_match = self._find_exact_folder_match(subject, combined_folders)
-            if exact_match:
-                self.logger.info(f"找到精确匹配，返回: {exact_match}")
-                return {
-                    'suggested_path': exact_match,
-                    'create_new': False,
-                    'reasoning': f'找到精确匹配的文件夹: {exact_match}'
-                }
+            result = self._match_folder_locally(subject, folder_index)
+            if not result:
+                # 第四步：如果没有找到匹配，调用LLM进行智能建议
+                prompt = self._build_strict_folder_suggestion_prompt(subject, folder_index['paths'])
+                response = self._call_llm_api(prompt, json_object=True)
+                result = self._finalize_folder_suggestion(subject, folder_index, response)
             
-            # 第二步：使用配置化语义分析匹配
-            semantic_match = self._find_semantic_folder_match(subject, combined_folders)
-            if semantic_match:
-                # 检查是否是二级文件夹路径
-                is_secondary_path = '/' in semantic_match
-                create_new_flag = is_secondary_path or semantic_match not in combined_folders
-                
-                self.logger.info(f"找到语义匹配，返回: {semantic_match}, 创建新文件夹: {create_new_flag}")
-                return {
-                    'suggested_path': semantic_match,
-                    'create_new': create_new_flag,
-                    'reasoning': f'通过语义分析找到匹配的文件夹: {semantic_match}'
-                }
+            self._cache_suggestion(cache_key, result)
+            return result
             
-            # 第二步补充：如果语义匹配找到了类别但没有对应现有文件夹，创建新文件夹
-            semantic_category = self._find_semantic_category_match(subject)
-            if semantic_category:
-                self.logger.info(f"语义分析找到类别但无现有文件夹，创建新文件夹: {semantic_category}")
-                return {
-                    'suggested_path': semantic_category,
-                    'create_new': True,
-                    'reasoning': f'通过语义分析创建新类别文件夹: {semantic_category}'
-                }
+        except Exception as e:
+            self.logger.error(f"文件夹建议失败: {e}")
+            return {
+                'suggested_path': subject,
+                'create_new': True,
+                'reasoning': f'LLM调用失败: {str(e)}'
+            }
+    
+    async def aextract_subject_and_folder(self, file_info: Dict[str, Any],
+                                          latency_budget_ms: Optional[int] = None) -> Dict[str, Any]:
+        """
+        extract_subject_and_folder 的异步版本，可配合 asyncio.gather 并发处理多个文档
+        
+        Args:
+            file_info: 文件信息字典
+            latency_budget_ms: 可接受的最长等待时间，足够长时请求走批处理API
+        """
+        if not self.enabled:
+            return self.extract_subject_and_folder(file_info)
+        
+        try:
+            prompt = self._build_subject_extraction_prompt(file_info)
+            response = await self._acall_llm_api(prompt, latency_budget_ms=latency_budget_ms, json_object=True)
+            result = self._parse_subject_response(response)
             
-            # 第三步：尝试相似性匹配
-            similar_match = self._find_similar_folder_match(subject, combined_folders)
-            if similar_match:
-                self.logger.info(f"找到相似匹配，返回: {similar_match}")
-                return {
-                    'suggested_path': similar_match,
-                    'create_new': False,
-                    'reasoning': f'找到相似匹配的文件夹: {similar_match}'
-                }
+            self.logger.info(f"LLM提取主体成功: {result['subject']}")
+            return result
+            
+        except Exception as e:
+            self.logger.error(f"LLM提取主体失败: {e}")
+            return {
+                'subject': self._extract_fallback_subject(file_info),
+                'suggested_folder': '',
+                'confidence': 0.0,
+                'reasoning': f'LLM调用失败: {str(e)}'
+            }
+    
+    async def acheck_content_similarity(self, content1: str, content2: str) -> Dict[str, Any]:
+        """check_content_similarity 的异步版本"""
+        if not self.enabled:
+            return self.check_content_similarity(content1, content2)
+        
+        try:
+            prompt = self._build_similarity_prompt(content1, content2)
+            response = await self._acall_llm_api(prompt, json_object=True)
+            result = self._parse_similarity_response(response)
+            
+            self.logger.info(f"内容相似性检查完成: {result['similarity_score']}")
+            return result
+            
+        except Exception as e:
+            self.logger.error(f"相似性检查失败: {e}")
+            return {
+                'is_similar': False,
+                'similarity_score': 0.0,
+                'reasoning': f'LLM调用失败: {str(e)}'
+            }
+    
+    async def asuggest_folder_structure(self, subject: str, existing_folders: List[str],
+                                        latency_budget_ms: Optional[int] = None) -> Dict[str, Any]:
+        """suggest_folder_structure 的异步版本，仅在本地匹配失败时才发起LLM请求（latency_budget_ms 含义同上）"""
+        if not self.enabled:
+            return self.suggest_folder_structure(subject, existing_folders)
+        
+        try:
+            folder_index = self._get_folder_index(existing_folders)
+            cache_key = (subject, folder_index['path_set'])
+            cached = self._get_cached_suggestion(cache_key)
+            if cached is not None:
+                return cached
             
-            self.logger.info("未找到精确、语义或相似匹配，调用LLM")
+            result = self._match_folder_locally(subject, folder_index)
+            if not result:
+                prompt = self._build_strict_folder_suggestion_prompt(subject, folder_index['paths'])
+                response = await self._acall_llm_api(prompt, latency_budget_ms=latency_budget_ms, json_object=True)
+                result = self._finalize_folder_suggestion(subject, folder_index, response)
             
-            # 第四步：如果没有找到匹配，调用LLM进行智能建议
-            prompt = self._build_strict_folder_suggestion_prompt(subject, combined_folders)
-            response = self._call_llm_api(prompt)
-            result = self._parse_folder_response(response)
+            self._cache_suggestion(cache_key, result)
+            return result
             
-            self.logger.info(f"LLM原始响应结果: {result}")
+        except Exception as e:
+            self.logger.error(f"文件夹建议失败: {e}")
+            return {
+                'suggested_path': subject,
+                'create_new': True,
+                'reasoning': f'LLM调用失败: {str(e)}'
+            }
+    
+    async def aclose(self):
+        """等待进行中的批处理任务，并关闭异步接口使用的aiohttp会话"""
+        if self._batch_dispatcher is not None:
+            await self._batch_dispatcher.drain()
+            self._batch_dispatcher = None
+        if self._async_session is not None:
+            await self._async_session.close()
+            self._async_session = None
+            self._async_slots = None
+            self._async_loop = None
+    
+    def _get_cached_suggestion(self, cache_key: tuple) -> Optional[Dict[str, Any]]:
+        """查找相同主体、相同文件夹集合下的文件夹建议，命中时返回副本"""
+        with self._suggestion_lock:
+            result = self._suggestion_cache.get(cache_key)
+            if result is None:
+                return None
+            self._suggestion_cache.move_to_end(cache_key)
+        self.logger.info(f"文件夹建议命中缓存: {result['suggested_path']}")
+        return dict(result)
+    
+    def _cache_suggestion(self, cache_key: tuple, result: Dict[str, Any]):
+        """缓存文件夹建议，超出容量时淘汰最久未使用的条目"""
+        if self._suggestion_cache_size <= 0:
+            return
+        with self._suggestion_lock:
+            self._suggestion_cache[cache_key] = dict(result)
+            self._suggestion_cache.move_to_end(cache_key)
+            if len(self._suggestion_cache) > self._suggestion_cache_size:
+                self._suggestion_cache.popitem(last=False)
+    
+    def _match_folder_locally(self, subject: str, folder_index: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        不调用LLM的文件夹匹配（精确、语义、相似匹配）
+        
+        Args:
+            subject: 文档主体
+            folder_index: 合并后的文件夹索引，见 _get_folder_index
             
-            # 验证LLM建议的路径是否确实存在
-            if not result.get('create_new', True):
-                suggested_path = result.get('suggested_path', '')
-                # 统一路径分隔符进行比较
-                normalized_suggested = suggested_path.replace('\\', '/')
-                normalized_folders = [f.replace('\\', '/') for f in combined_folders]
-                
-                if normalized_suggested not in normalized_folders:
-                    self.logger.warning(f"LLM建议的路径不存在: {suggested_path}，改为创建新文件夹")
-                    result['create_new'] = True
-                    result['reasoning'] = f"LLM建议的路径不存在，改为创建: {suggested_path}"
-                else:
-                    self.logger.info(f"LLM建议的路径验证通过: {suggested_path}")
+        Returns:
+            匹配结果，未找到时返回 None
+        """
+        self.logger.info(f"开始文件夹建议 - 主体: {subject}")
+        
+        combined_folders = folder_index['paths']
+        self.logger.info(f"合并后的文件夹列表: {combined_folders}")
+        
+        # 第一步：尝试精确文本匹配
+        exact_match = self._find_exact_folder_match(subject, combined_folders, folder_index['leaf_lower'])
+        if exact_match:
+            self.logger.info(f"找到精确匹配，返回: {exact_match}")
+            return {
+                'suggested_path': exact_match,
+                'create_new': False,
+                'reasoning': f'找到精确匹配的文件夹: {exact_match}'
+            }
+        
+        # 第二步：使用配置化语义分析匹配
+        semantic_match = self._find_semantic_folder_match(subject, combined_folders, folder_index['path_set'],
+                                                          folder_index['memo'])
+        if semantic_match:
+            # 检查是否是二级文件夹路径
+            is_secondary_path = '/' in semantic_match
+            create_new_flag = is_secondary_path or semantic_match not in folder_index['path_set']
+            
+            self.logger.info(f"找到语义匹配，返回: {semantic_match}, 创建新文件夹: {create_new_flag}")
+            return {
+                'suggested_path': semantic_match,
+                'create_new': create_new_flag,
+                'reasoning': f'通过语义分析找到匹配的文件夹: {semantic_match}'
+            }
+        
+        # 第二步补充：如果语义匹配找到了类别但没有对应现有文件夹，创建新文件夹
+        semantic_category = self._find_semantic_category_match(subject)
+        if semantic_category:
+            self.logger.info(f"语义分析找到类别但无现有文件夹，创建新文件夹: {semantic_category}")
+            return {
+                'suggested_path': semantic_category,
+                'create_new': True,
+                'reasoning': f'通过语义分析创建新类别文件夹: {semantic_category}'
+            }
+        
+        # 第三步：尝试相似性匹配
+        similar_match = self._find_similar_folder_match(subject, combined_folders)
+        if similar_match:
+            self.logger.info(f"找到相似匹配，返回: {similar_match}")
+            return {
+                'suggested_path': similar_match,
+                'create_new': False,
+                'reasoning': f'找到相似匹配的文件夹: {similar_match}'
+            }
+        
+        self.logger.info("未找到精确、语义或相似匹配，调用LLM")
+        return None
+    
+    def _finalize_folder_suggestion(self, subject: str, folder_index: Dict[str, Any], response: str) -> Dict[str, Any]:
+        """解析LLM的文件夹建议，并校验、修正其中不存在或新建的路径"""
+        combined_folders = folder_index['paths']
+        result = self._parse_folder_response(response)
+        
+        self.logger.info(f"LLM原始响应结果: {result}")
+        
+        # 验证LLM建议的路径是否确实存在
+        if not result.get('create_new', True):
+            suggested_path = result.get('suggested_path', '')
+            # 统一路径分隔符进行比较
+            normalized_suggested = suggested_path.replace('\\', '/')
+            normalized_folders = folder_index['normalized_set']
             
-            # 第五步：如果LLM试图创建新文件夹，进行最终处理
-            if result.get('create_new', True):
-                # 如果没有任何现有文件夹，允许创建语义匹配的分类文件夹
-                if not combined_folders:
+            if normalized_suggested not in normalized_folders:
+                self.logger.warning(f"LLM建议的路径不存在: {suggested_path}，改为创建新文件夹")
+                result['create_new'] = True
+                result['reasoning'] = f"LLM建议的路径不存在，改为创建: {suggested_path}"
+            else:
+                self.logger.info(f"LLM建议的路径验证通过: {suggested_path}")
+        
+        # 第五步：如果LLM试图创建新文件夹，进行最终处理
+        if result.get('create_new', True):
+            # 如果没有任何现有文件夹，允许创建语义匹配的分类文件夹
+            if not combined_folders:
+                semantic_category = self._find_semantic_category_match(subject)
+                if semantic_category:
+                    self.logger.info(f"无现有文件夹时，允许创建语义分类文件夹: {semantic_category}")
+                    result = {
+                        'suggested_path': semantic_category,
+                        'create_new': True,
+                        'reasoning': f'无现有文件夹，创建语义分类文件夹: {semantic_category}'
+                    }
+                else:
+                    self.logger.info(f"无语义匹配，使用主体作为文件夹名: {subject}")
+                    result = {
+                        'suggested_path': subject,
+                        'create_new': True,
+                        'reasoning': f'无现有文件夹和语义匹配，使用主体名称: {subject}'
+                    }
+            else:
+                # 有现有文件夹但LLM试图创建新文件夹，强制选择现有分类
+                self.logger.warning("LLM试图创建新文件夹，启动强制匹配")
+                forced_match = self._force_existing_folder_match(subject, combined_folders, folder_index['path_set'],
+                                                                 folder_index['memo'])
+                if forced_match:
+                    result = {
+                        'suggested_path': forced_match,
+                        'create_new': False,
+                        'reasoning': f'强制使用现有文件夹: {forced_match}（LLM试图创建新文件夹）'
+                    }
+                    self.logger.warning(f"LLM试图创建新文件夹，强制使用现有分类: {forced_match}")
+                else:
+                    # 如果强制匹配也失败，允许创建语义分类文件夹
                     semantic_category = self._find_semantic_category_match(subject)
                     if semantic_category:
-                        self.logger.info(f"无现有文件夹时，允许创建语义分类文件夹: {semantic_category}")
+                        self.logger.info(f"强制匹配失败，创建语义分类文件夹: {semantic_category}")
                         result = {
                             'suggested_path': semantic_category,
                             'create_new': True,
-                            'reasoning': f'无现有文件夹，创建语义分类文件夹: {semantic_category}'
+                            'reasoning': f'强制匹配失败，创建语义分类文件夹: {semantic_category}'
                         }
-                    else:
-                        self.logger.info(f"无语义匹配，使用主体作为文件夹名: {subject}")
-                        result = {
-                            'suggested_path': subject,
-                            'create_new': True,
-                            'reasoning': f'无现有文件夹和语义匹配，使用主体名称: {subject}'
-                        }
-                else:
-                    # 有现有文件夹但LLM试图创建新文件夹，强制选择现有分类
-                    self.logger.warning("LLM试图创建新文件夹，启动强制匹配")
-                    forced_match = self._force_existing_folder_match(subject, combined_folders)
-                    if forced_match:
-                        result = {
-                            'suggested_path': forced_match,
-                            'create_new': False,
-                            'reasoning': f'强制使用现有文件夹: {forced_match}（LLM试图创建新文件夹）'
-                        }
-                        self.logger.warning(f"LLM试图创建新文件夹，强制使用现有分类: {forced_match}")
-                    else:
-                        # 如果强制匹配也失败，允许创建语义分类文件夹
-                        semantic_category = self._find_semantic_category_match(subject)
-                        if semantic_category:
-                            self.logger.info(f"强制匹配失败，创建语义分类文件夹: {semantic_category}")
-                            result = {
-                                'suggested_path': semantic_category,
-                                'create_new': True,
-                                'reasoning': f'强制匹配失败，创建语义分类文件夹: {semantic_category}'
-                            }
+        
+        self.logger.info(f"文件夹建议完成: {result['suggested_path']}")
+        return result
+
+    def _scan_current_folders(self) -> List[str]:
+        """实时扫描当前知识库文件夹结构"""
+        return list(self._folder_scan()['folders'])
+    
+    def _get_folder_index(self, existing_folders: List[str]) -> Dict[str, Any]:
+        """
+        合并传入的文件夹与实时扫描结果，并预先计算匹配时需要的派生数据
+        
+        结果保存在扫描缓存中，目录树和传入列表都未变化时直接复用。
+        
+        Returns:
+            包含 paths（去重后保持顺序的路径列表）、path_set、normalized_set（统一为/分隔的路径集合）、
+            leaf_lower（各路径最后一级名称的小写形式）和 memo（该文件夹列表下的匹配结果缓存：
+            pattern_folders 为目标模式到首个匹配文件夹，semantic_folders 为小写主体到语义匹配结果）的字典
+        """
+        scan = self._folder_scan()
+        key = tuple(existing_folders)
+        cached = scan.get('combined')
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        
+        paths = list(dict.fromkeys(key + tuple(scan['folders'])))
+        index = {
+            'paths': paths,
+            'path_set': frozenset(paths),
+            'normalized_set': frozenset(path.replace('\\', '/') for path in paths),
+            'leaf_lower': [path.split('/')[-1].lower() for path in paths],
+            'memo': {'pattern_folders': {}, 'semantic_folders': {}}
+        }
+        scan['combined'] = (key, index)
+        return index
+    
+    def _folder_scan(self) -> Dict[str, Any]:
+        """
+        扫描知识库文件夹结构，返回扫描缓存
+        
+        结果以各目录的mtime为指纹缓存：目录中增删子目录会改变其mtime，
+        因此目录树未变化时只需stat已知目录，无需重新遍历。
+        """
+        kb_path = "knowledge_base"
+        with self._folders_lock:
+            cache = self._folders_cache
+            if cache is not None and [_dir_mtime(path) for path in cache['dirs']] == cache['fingerprint']:
+                return cache
             
-            self.logger.info(f"文件夹建议完成: {result['suggested_path']}")
-            return result
+            dirs = []
+            fingerprint = []
+            folders = []
+            stack = [(kb_path, '')]
+            while stack:
+                directory, prefix = stack.pop()
+                # 在列出目录内容之前记录mtime，遍历期间的修改会使缓存失效
+                dirs.append(directory)
+                fingerprint.append(_dir_mtime(directory))
+                try:
+                    with os.scandir(directory) as it:
+                        entries = list(it)
+                except OSError:
+                    continue
+                
+                for entry in entries:
+                    if not entry.is_dir():
+                        continue
+                    relative_path = os.path.join(prefix, entry.name) if prefix else entry.name
+                    folders.append(relative_path)
+                    # 与 os.walk 一致：列出指向目录的符号链接，但不进入
+                    if not entry.is_symlink():
+                        stack.append((entry.path, relative_path))
             
-        except Exception as e:
-            self.logger.error(f"文件夹建议失败: {e}")
-            return {
-                'suggested_path': subject,
-                'create_new': True,
-                'reasoning': f'LLM调用失败: {str(e)}'
-            }
-    
-    def _scan_current_folders(self) -> List[str]:
-        """实时扫描当前知识库文件夹结构"""
-        folders = []
-        try:
-            kb_path = Path("knowledge_base")
-            if kb_path.exists():
-                for root, dirs, files in os.walk(kb_path):
-                    for dir_name in dirs:
-                        full_path = Path(root) / dir_name
-                        relative_path = full_path.relative_to(kb_path)
-                        folders.append(str(relative_path))
-        except Exception as e:
-            self.logger.warning(f"扫描文件夹失败: {e}")
-        return folders
+            self._folders_cache = {'dirs': dirs, 'fingerprint': fingerprint, 'folders': folders}
+            return self._folders_cache
     
     def _serialize_metadata_safely(self, metadata: Dict[str, Any]) -> str:
-        """安全地序列化metadata，处理datetime对象"""
+        """安全地序列化metadata，datetime等无法直接编码的对象在编码时转换为字符串"""
         if not metadata:
             return '无'
         
-        safe_metadata = {}
-        for key, value in metadata.items():
-            if isinstance(value, datetime):
-                safe_metadata[key] = value.strftime('%Y-%m-%d %H:%M:%S')
-            elif hasattr(value, '__str__'):
-                safe_metadata[key] = str(value)
-            else:
-                safe_metadata[key] = value
-                
         try:
-            return json.dumps(safe_metadata, ensure_ascii=False, indent=2)
+            return _json_pretty(metadata)
         except Exception as e:
             self.logger.warning(f"序列化metadata失败: {e}")
-            return str(safe_metadata)
+            return str(metadata)
     
     def _build_subject_extraction_prompt(self, file_info: Dict[str, Any]) -> str:
         """构建主体提取提示词"""
-        content = file_info.get('content', '')[:3000]  # 限制内容长度
+        # 限制内容长度：安装了tiktoken时按token数截断，CJK文本不会超出预算，英文文本可保留更多内容
+        content = _truncate_to_tokens(file_info.get('content', ''),
+                                      self.config.get('content_token_limit', 2000), 3000)
         metadata = file_info.get('metadata', {})
         
         prompt = f"""
@@ -383,6 +1302,45 @@ class LLMClient:
     "reasoning": "提取主体和建议文件夹的理由"
 }}
 
+文件夹建议原则：
+1. 优先按主题分类：会议纪要、项目文档、技术方案、财务报告、人力资源等
+2. 避免为每个文档创建单独文件夹，应归类到合适的主题文件夹
+3. 文件夹名称简洁清晰，避免过长
+4. 考虑文档的业务类型和用途
+"""
+        return prompt
+    
+    def _build_batch_subject_extraction_prompt(self, file_infos: List[Dict[str, Any]]) -> str:
+        """构建批量主体提取提示词"""
+        documents = []
+        for index, file_info in enumerate(file_infos):
+            content = file_info.get('content', '')[:1000]  # 批量时每个文档的内容更短
+            documents.append(f"""<doc index="{index}">
+文件名: {file_info['name']}
+文件类型: {file_info['suffix']}
+元数据信息: {self._serialize_metadata_safely(file_info.get('metadata', {}))}
+文档内容:
+{content}
+</doc>""")
+        
+        joined = '\n\n'.join(documents)
+        prompt = f"""
+请分别分析以下 {len(file_infos)} 个文档，为每个文档提取核心主体并建议合适的文件夹路径。
+
+{joined}
+
+**重要说明：请严格按照JSON数组格式返回结果，每个文档一个对象，不要添加任何额外的文字说明**
+
+[
+    {{
+        "index": 0,
+        "subject": "文档的核心主体，用作重命名的基础（简洁明了，适合作为文件名）",
+        "suggested_folder": "建议的文件夹路径（如果需要多层级，用/分隔）",
+        "confidence": 0.85,
+        "reasoning": "提取主体和建议文件夹的理由"
+    }}
+]
+
 文件夹建议原则：
 1. 优先按主题分类：会议纪要、项目文档、技术方案、财务报告、人力资源等
 2. 避免为每个文档创建单独文件夹，应归类到合适的主题文件夹
@@ -420,90 +1378,212 @@ class LLMClient:
 """
         return prompt
     
-    def _build_strict_folder_suggestion_prompt(self, subject: str, existing_folders: List[str]) -> str:
-        """构建严格的文件夹建议提示词"""
-        existing_str = "\n".join(f"- {folder}" for folder in existing_folders) if existing_folders else "暂无现有文件夹"
-        
-        # 读取知识库结构文件
-        structure_content = self._read_knowledge_base_structure()
+    def _build_batch_similarity_prompt(self, content: str, candidates: List[str]) -> str:
+        """构建批量相似性检查提示词"""
+        # 限制内容长度避免超出token限制
+        documents = '\n\n'.join(
+            f'<doc index="{index}">\n{candidate[:2000]}\n</doc>'
+            for index, candidate in enumerate(candidates)
+        )
         
         prompt = f"""
-请为文档主体"{subject}"建议合适的文件夹归档路径。
-
-**当前知识库文件夹结构参考：**
-{structure_content}
-
-**现有文件夹完整列表：**
-{existing_str}
+请将目标文档分别与以下 {len(candidates)} 个已有文档比较，判断每个已有文档是否可能与目标文档是同一主题的不同版本。
 
-**绝对严格要求（违反将导致处理失败）：**
-1. **suggested_path必须完全等于现有文件夹列表中的某一项**
-2. **绝对禁止创建任何新文件夹，create_new必须为false**
-3. **必须从上述现有文件夹列表中选择最匹配的一个**
-4. **如果主体包含"运维"、"监控"、"部署"关键词，必须选择"技术方案/DevOps运维"**
-5. **如果主体包含"容器"、"Docker"关键词，必须选择"技术方案/容器化部署"**
-
-**强制选择逻辑（按此优先级执行）：**
-- 运维/监控/部署相关 → 强制选择 "技术方案/DevOps运维"
-- 容器/Docker相关 → 强制选择 "技术方案/容器化部署"  
-- 项目管理相关 → 强制选择 "项目文档/项目管理"
-- 会议记录相关 → 强制选择 "会议纪要"
-- 培训相关 → 强制选择 "人力资源/培训计划"
-- 面试相关 → 强制选择 "人力资源/面试记录"
-- 其他技术文档 → 强制选择 "技术方案"
+目标文档内容:
+{content[:2000]}
 
-**请严格按照JSON格式返回：**
+已有文档:
+{documents}
 
-{{
-    "suggested_path": "必须是现有文件夹列表中的完整路径",
-    "create_new": false,
-    "reasoning": "详细说明为什么选择这个现有文件夹"
-}}
+请以JSON数组格式返回结果，每个已有文档一个对象：
+[
+    {{
+        "index": 0,
+        "is_similar": true/false,
+        "similarity_score": 相似度分数(0-1),
+        "reasoning": "相似性判断的理由"
+    }}
+]
 
-**最后检查：返回前确认suggested_path确实在现有文件夹列表中！**
+判断标准：
+- 如果两个文档讨论的是同一个主题、项目或事件，即使内容有差异也应该被认为是相似的
+- 相似度分数应该反映主题相关性而不是文字重复度
+- 0.7以上可以认为是同一主题的不同版本
 """
         return prompt
     
+    def _build_strict_folder_suggestion_prompt(self, subject: str, existing_folders: List[str]) -> str:
+        """构建严格的文件夹建议提示词"""
+        existing_str = "\n".join(f"- {folder}" for folder in existing_folders) if existing_folders else "暂无现有文件夹"
+        
+        # 读取知识库结构文件
+        structure_content = self._read_knowledge_base_structure()
+        return _FOLDER_SUGGESTION_TEMPLATE.format(
+            SUBJECT=subject, STRUCTURE=structure_content, EXISTING=existing_str)
+    
     def _read_knowledge_base_structure(self) -> str:
         """读取知识库结构文件"""
         try:
             structure_file = Path("knowledge_base/structure.md")
-            if structure_file.exists():
-                with open(structure_file, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                # 提取文件夹结构部分（从"当前文件夹结构"到"分类规则"）
-                start_marker = "## 🗂️ 当前文件夹结构"
-                end_marker = "## 📋 分类规则"
-                
-                start_idx = content.find(start_marker)
-                end_idx = content.find(end_marker)
-                
-                if start_idx != -1 and end_idx != -1:
-                    structure_section = content[start_idx:end_idx].strip()
-                    return structure_section
-                else:
-                    return content[:1000]  # 返回前1000字符作为备选
-            else:
+            try:
+                mtime_ns = structure_file.stat().st_mtime_ns
+            except FileNotFoundError:
                 return "知识库结构文件不存在，请按标准分类创建文件夹"
+            
+            # 提取文件夹结构部分（从"当前文件夹结构"到"分类规则"），文件未修改时直接复用
+            return _load_structure_cached(str(structure_file), mtime_ns)
         except Exception as e:
             self.logger.warning(f"读取知识库结构失败: {e}")
             return "无法读取知识库结构，请按标准分类创建文件夹"
     
-    def _call_llm_api(self, prompt: str) -> str:
-        """调用LLM API"""
+    def _call_llm_api(self, prompt: str, max_tokens: int = 1000, json_object: bool = False) -> str:
+        """
+        调用LLM API，相同或语义相近的请求优先返回缓存中的响应
+        
+        json_object 表示提示词要求返回单个JSON对象，开启 json_mode 时据此约束输出格式
+        """
+        cache_key, cached = self._lookup_response(prompt, max_tokens)
+        if cached is not None:
+            return cached
+        
+        response = self._request_llm_api(prompt, max_tokens, json_object)
+        self._store_response(cache_key, prompt, response)
+        return response
+    
+    def _request_llm_api(self, prompt: str, max_tokens: int, json_object: bool = False) -> str:
+        """按配置的提供商发起API请求"""
         provider = self.config.get('provider', 'openai').lower()
         
-        if provider == 'openai':
-            return self._call_openai_api(prompt)
-        elif provider == 'anthropic':
-            return self._call_anthropic_api(prompt)
-        elif provider == 'zhipu':
-            return self._call_zhipu_api(prompt)
-        else:
-            raise ValueError(f"不支持的LLM提供商: {provider}")
+        self._throttle()
+        with self._request_slots:
+            if provider == 'openai':
+                return self._call_openai_api(prompt, max_tokens, json_object)
+            elif provider == 'anthropic':
+                return self._call_anthropic_api(prompt, max_tokens)
+            elif provider == 'zhipu':
+                return self._call_zhipu_api(prompt)
+            else:
+                raise ValueError(f"不支持的LLM提供商: {provider}")
+    
+    def _lookup_response(self, prompt: str, max_tokens: int):
+        """依次查找磁盘缓存和语义缓存，返回 (缓存键, 缓存的响应或None)"""
+        cache_key = self._cache_key(prompt, max_tokens)
+        cached = self._cache_get(cache_key)
+        if cached is None and self._semantic_cache is not None:
+            try:
+                cached = self._semantic_cache.get(prompt)
+            except Exception as e:
+                self.logger.warning(f"语义缓存查询失败: {e}")
+        return cache_key, cached
     
-    def _call_openai_api(self, prompt: str) -> str:
+    def _store_response(self, cache_key: str, prompt: str, response: str):
+        """将新响应写入磁盘缓存和语义缓存"""
+        self._cache_put(cache_key, response)
+        if self._semantic_cache is not None:
+            try:
+                self._semantic_cache.put(prompt, response)
+            except Exception as e:
+                self.logger.warning(f"写入语义缓存失败: {e}")
+    
+    def _cache_key(self, prompt: str, max_tokens: int) -> str:
+        """缓存键：提供商、模型、max_tokens 与提示词的 SHA-256"""
+        provider = self.config.get('provider', 'openai').lower()
+        model = self.config.get('model', '')
+        raw = f"{provider}\x00{model}\x00{max_tokens}\x00{prompt.strip()}"
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+    
+    def _cache_path(self, key: str) -> Path:
+        """缓存文件路径，按哈希前缀分两级目录，避免单个目录下文件过多"""
+        return self._cache_dir / key[:2] / key[2:4] / f"{key}.json"
+    
+    def _cache_get(self, key: str) -> Optional[str]:
+        """读取缓存的响应，不存在、已过期或损坏时返回 None"""
+        if self._cache_dir is None:
+            return None
+        
+        path = self._cache_path(key)
+        try:
+            if self._cache_ttl and time.time() - path.stat().st_mtime > self._cache_ttl:
+                return None
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)['response']
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            self.logger.debug(f"读取LLM响应缓存失败 {path}: {e}")
+            return None
+    
+    def _cache_put(self, key: str, response: str):
+        """写入响应缓存：先写临时文件再原子替换，避免并发读取到不完整的缓存"""
+        if self._cache_dir is None:
+            return
+        
+        path = self._cache_path(key)
+        temp_path = None
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=path.parent,
+                                             suffix='.tmp', delete=False) as f:
+                temp_path = f.name
+                json.dump({'model': self.config.get('model', ''), 'response': response}, f, ensure_ascii=False)
+            os.replace(temp_path, path)
+        except Exception as e:
+            self.logger.debug(f"写入LLM响应缓存失败 {path}: {e}")
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
+    
+    def share_limits(self, limits: SharedRequestLimits):
+        """改用多个进程共用的并发数与请求速率限制（进程池中每个进程各有一个客户端）"""
+        self._shared_limits = limits
+        self._request_slots = limits.slots
+    
+    def _throttle(self):
+        """按 requests_per_minute 限制请求速率，超出时等待最早的请求移出窗口"""
+        if self._shared_limits is not None:
+            self._shared_limits.throttle(self.logger)
+            return
+        if not self._requests_per_minute:
+            return
+        
+        with self._rate_lock:
+            now = time.monotonic()
+            while self._request_times and now - self._request_times[0] >= 60:
+                self._request_times.popleft()
+            
+            if len(self._request_times) >= self._requests_per_minute:
+                wait = 60 - (now - self._request_times.popleft())
+                self.logger.info(f"已达到每分钟请求上限，等待 {wait:.1f} 秒")
+                time.sleep(wait)
+            
+            self._request_times.append(time.monotonic())
+    
+    def _call_openai_api(self, prompt: str, max_tokens: int = 1000, json_object: bool = False) -> str:
         """调用OpenAI API"""
+        url, headers, data = self._build_openai_request(prompt, max_tokens, json_object)
+        stream = self.config.get('stream', False)
+        if stream:
+            data['stream'] = True
+        
+        response = self.session.post(
+            url, 
+            headers=headers, 
+            data=_json_body(data), 
+            timeout=self.config.get('timeout', 30),
+            stream=stream
+        )
+        
+        if response.status_code != 200:
+            raise Exception(f"API调用失败: {response.status_code} - {response.text}")
+        
+        if stream:
+            return self._read_event_stream(
+                response, lambda event: ((event.get('choices') or [{}])[0].get('delta') or {}).get('content'))
+        
+        result = response.json()
+        return result['choices'][0]['message']['content']
+    
+    def _build_openai_request(self, prompt: str, max_tokens: int, json_object: bool = False):
+        """构建OpenAI请求的URL、请求头和请求体"""
         url = self.config.get('base_url', 'https://api.openai.com/v1') + '/chat/completions'
         
         headers = {
@@ -517,24 +1597,62 @@ class LLMClient:
                 {'role': 'user', 'content': prompt}
             ],
             'temperature': 0.3,
-            'max_tokens': 1000
+            'max_tokens': max_tokens
         }
+        # 结构化输出：约束模型只返回合法的JSON对象，避免解析失败
+        if json_object and self.config.get('json_mode', False):
+            data['response_format'] = {'type': 'json_object'}
+        return url, headers, data
+    
+    def _call_anthropic_api(self, prompt: str, max_tokens: int = 1000) -> str:
+        """调用Anthropic API（Claude）"""
+        url, headers, data = self._build_anthropic_request(prompt, max_tokens)
+        stream = self.config.get('stream', False)
+        if stream:
+            data['stream'] = True
         
-        response = requests.post(
+        response = self.session.post(
             url, 
             headers=headers, 
-            json=data, 
-            timeout=self.config.get('timeout', 30)
+            data=_json_body(data), 
+            timeout=self.config.get('timeout', 30),
+            stream=stream
         )
         
         if response.status_code != 200:
             raise Exception(f"API调用失败: {response.status_code} - {response.text}")
         
+        if stream:
+            return self._read_event_stream(
+                response, lambda event: (event.get('delta') or {}).get('text')
+                if event.get('type') == 'content_block_delta' else None)
+        
         result = response.json()
-        return result['choices'][0]['message']['content']
+        return result['content'][0]['text']
     
-    def _call_anthropic_api(self, prompt: str) -> str:
-        """调用Anthropic API（Claude）"""
+    def _read_event_stream(self, response, extract_text) -> str:
+        """
+        读取SSE流式响应，边接收边解析各个增量事件并拼接文本
+        
+        Args:
+            response: 以 stream=True 发起的响应
+            extract_text: 从单个事件中取出增量文本的函数，无文本时返回 None
+        """
+        parts = []
+        with response:
+            for line in response.iter_lines():
+                if not line.startswith(b'data:'):
+                    continue
+                payload = line[5:].strip()
+                if payload == b'[DONE]':
+                    break
+                text = extract_text(_json_loads(payload))
+                if text:
+                    parts.append(text)
+        return ''.join(parts)
+    
+    def _build_anthropic_request(self, prompt: str, max_tokens: int):
+        """构建Anthropic请求的URL、请求头和请求体"""
         url = self.config.get('base_url', 'https://api.anthropic.com/v1') + '/messages'
         
         headers = {
@@ -545,35 +1663,109 @@ class LLMClient:
         
         data = {
             'model': self.config.get('model', 'claude-3-haiku-20240307'),
-            'max_tokens': 1000,
+            'max_tokens': max_tokens,
             'messages': [
                 {'role': 'user', 'content': prompt}
             ]
         }
-        
-        response = requests.post(
-            url, 
-            headers=headers, 
-            json=data, 
-            timeout=self.config.get('timeout', 30)
-        )
-        
-        if response.status_code != 200:
-            raise Exception(f"API调用失败: {response.status_code} - {response.text}")
-        
-        result = response.json()
-        return result['content'][0]['text']
+        return url, headers, data
     
     def _call_zhipu_api(self, prompt: str) -> str:
         """调用智谱AI API"""
         # 这里可以根据智谱AI的实际API实现
         raise NotImplementedError("智谱AI接口尚未实现")
     
+    async def _acall_llm_api(self, prompt: str, max_tokens: int = 1000,
+                             latency_budget_ms: Optional[int] = None, json_object: bool = False) -> str:
+        """
+        异步调用LLM API
+        
+        延迟预算足够时走批处理API；安装了aiohttp时直接发起异步请求；否则在线程池中执行同步的 _call_llm_api
+        """
+        loop = asyncio.get_running_loop()
+        if self._batch_enabled and latency_budget_ms and latency_budget_ms >= self._batch_min_latency_ms:
+            cache_key, cached = self._lookup_response(prompt, max_tokens)
+            if cached is not None:
+                return cached
+            try:
+                content = await self._get_batch_dispatcher().submit(prompt, max_tokens, latency_budget_ms)
+                self._store_response(cache_key, prompt, content)
+                return content
+            except Exception as e:
+                self.logger.warning(f"批处理请求失败，改为直接调用: {e}")
+        
+        if not AIOHTTP_AVAILABLE:
+            return await loop.run_in_executor(None, self._call_llm_api, prompt, max_tokens, json_object)
+        
+        provider = self.config.get('provider', 'openai').lower()
+        if provider == 'openai':
+            url, headers, data = self._build_openai_request(prompt, max_tokens, json_object)
+        elif provider == 'anthropic':
+            url, headers, data = self._build_anthropic_request(prompt, max_tokens)
+        else:
+            return await loop.run_in_executor(None, self._call_llm_api, prompt, max_tokens, json_object)
+        
+        cache_key, cached = self._lookup_response(prompt, max_tokens)
+        if cached is not None:
+            return cached
+        
+        session = self._get_async_session()
+        await loop.run_in_executor(None, self._throttle)
+        body = _json_body(data)
+        max_retries = self.config.get('max_retries', 3)
+        async with self._async_slots:
+            timeout = aiohttp.ClientTimeout(total=self.config.get('timeout', 30))
+            for attempt in range(max_retries + 1):
+                async with session.post(url, headers=headers, data=body, timeout=timeout) as response:
+                    if response.status == 200:
+                        result = _json_loads(await response.read())
+                        break
+                    text = await response.text()
+                    if response.status not in _RETRY_STATUSES or attempt == max_retries:
+                        raise Exception(f"API调用失败: {response.status} - {text}")
+                    delay = _retry_delay(attempt, response.headers.get('Retry-After'))
+                    if delay is None:
+                        raise Exception(f"API调用失败: {response.status} - Retry-After 超过 {_MAX_RETRY_AFTER} 秒，放弃重试")
+                
+                # 限流或服务端错误时退避重试，等待期间仍占用并发名额，避免加剧限流
+                self.logger.warning(f"API返回 {response.status}，{delay:.1f} 秒后重试 ({attempt + 1}/{max_retries})")
+                await asyncio.sleep(delay)
+        
+        if provider == 'openai':
+            content = result['choices'][0]['message']['content']
+        else:
+            content = result['content'][0]['text']
+        self._store_response(cache_key, prompt, content)
+        return content
+    
+    def _get_batch_dispatcher(self) -> BatchDispatcher:
+        """获取当前事件循环的批处理调度器"""
+        loop = asyncio.get_running_loop()
+        if self._batch_dispatcher is None or self._batch_loop is not loop:
+            self._batch_dispatcher = BatchDispatcher(
+                self,
+                window_ms=self.config.get('batch_window_ms', 30000),
+                min_size=self.config.get('batch_min_size', 10),
+                poll_interval=self.config.get('batch_poll_interval', 30)
+            )
+            self._batch_loop = loop
+        return self._batch_dispatcher
+    
+    def _get_async_session(self):
+        """获取当前事件循环的aiohttp会话；会话和信号量都绑定事件循环，循环变化时重新创建"""
+        loop = asyncio.get_running_loop()
+        if self._async_session is None or self._async_session.closed or self._async_loop is not loop:
+            connector = aiohttp.TCPConnector(limit=self._max_concurrent, keepalive_timeout=60)
+            self._async_session = aiohttp.ClientSession(connector=connector)
+            self._async_slots = asyncio.Semaphore(self._max_concurrent)
+            self._async_loop = loop
+        return self._async_session
+    
     def _parse_subject_response(self, response: str) -> Dict[str, Any]:
         """解析主体提取响应"""
         try:
             # 首先尝试直接解析JSON
-            result = json.loads(response.strip())
+            result = _json_loads(response.strip())
             
             # 验证必需字段
             if 'subject' not in result:
@@ -593,27 +1785,10 @@ class LLMClient:
         except (json.JSONDecodeError, ValueError) as e:
             self.logger.warning(f"尝试JSON解析失败: {e}，尝试其他解析方法")
             
-            # 尝试提取被```包围的JSON
-            json_match = re.search(r'```(?:json)?\s*(\{.*?\})\s*```', response, re.DOTALL)
-            if json_match:
-                try:
-                    result = json.loads(json_match.group(1))
-                    subject = self._clean_filename(result.get('subject', ''))
-                    if subject:
-                        return {
-                            'subject': subject,
-                            'suggested_folder': result.get('suggested_folder', '').strip(),
-                            'confidence': float(result.get('confidence', 0.5)),
-                            'reasoning': result.get('reasoning', '')
-                        }
-                except (json.JSONDecodeError, ValueError):
-                    pass
-            
-            # 尝试查找单独JSON对象
-            json_match = re.search(r'\{[^{}]*"subject"[^{}]*\}', response, re.DOTALL)
-            if json_match:
+            # 在响应文本中查找包含subject的JSON对象（含```代码块中的JSON）
+            result = _extract_json_object(response, 'subject')
+            if result is not None:
                 try:
-                    result = json.loads(json_match.group(0))
                     subject = self._clean_filename(result.get('subject', ''))
                     if subject:
                         return {
@@ -622,7 +1797,7 @@ class LLMClient:
                             'confidence': float(result.get('confidence', 0.5)),
                             'reasoning': result.get('reasoning', '')
                         }
-                except (json.JSONDecodeError, ValueError):
+                except (AttributeError, TypeError, ValueError):
                     pass
             
             self.logger.warning(f"所有解析方法失败，使用文本提取")
@@ -642,7 +1817,7 @@ class LLMClient:
             # 如果还是没找到，尝试直接提取文档内容中的标题
             if not subject:
                 # 尝试从原始响应中提取可能的主体信息
-                potential_subjects = re.findall(r'["\']([^"\']{3,50})["\']', response)
+                potential_subjects = _POTENTIAL_SUBJECT_RE.findall(response)
                 for ps in potential_subjects:
                     if ps and not any(skip in ps.lower() for skip in ['json', 'format', '格式', '示例']):
                         subject = ps
@@ -658,6 +1833,60 @@ class LLMClient:
                 'reasoning': '响应解析失败，使用文本提取'
             }
     
+    def _extract_json_array(self, response: str) -> List[Any]:
+        """从批量响应中提取JSON数组，解析失败时返回空列表"""
+        text = response.strip()
+        json_match = _JSON_ARRAY_FENCED_RE.search(text)
+        if json_match:
+            text = json_match.group(1)
+        else:
+            start, end = text.find('['), text.rfind(']')
+            if start != -1 and end > start:
+                text = text[start:end + 1]
+        
+        try:
+            items = _json_loads(text)
+        except json.JSONDecodeError as e:
+            self.logger.warning(f"批量响应JSON解析失败: {e}")
+            return []
+        
+        return items if isinstance(items, list) else []
+    
+    def _parse_batch_subject_response(self, response: str) -> Dict[int, Dict[str, Any]]:
+        """解析批量主体提取响应，返回 index 到结果的映射"""
+        parsed = {}
+        for item in self._extract_json_array(response):
+            if not isinstance(item, dict) or 'subject' not in item:
+                continue
+            try:
+                index = int(item.get('index'))
+                subject = self._clean_filename(str(item.get('subject', '')))
+                parsed[index] = {
+                    'subject': subject,
+                    'suggested_folder': str(item.get('suggested_folder', '')).strip(),
+                    'confidence': float(item.get('confidence', 0.5)),
+                    'reasoning': item.get('reasoning', '')
+                }
+            except (TypeError, ValueError):
+                continue
+        return parsed
+    
+    def _parse_batch_similarity_response(self, response: str) -> Dict[int, Dict[str, Any]]:
+        """解析批量相似性检查响应，返回 index 到结果的映射"""
+        parsed = {}
+        for item in self._extract_json_array(response):
+            if not isinstance(item, dict) or 'is_similar' not in item:
+                continue
+            try:
+                parsed[int(item.get('index'))] = {
+                    'is_similar': bool(item.get('is_similar', False)),
+                    'similarity_score': float(item.get('similarity_score', 0.0)),
+                    'reasoning': item.get('reasoning', '')
+                }
+            except (TypeError, ValueError):
+                continue
+        return parsed
+    
     def _clean_filename(self, name: str) -> str:
         """清理文件名，去除不符合文件系统规范的字符"""
         if not name:
@@ -666,13 +1895,8 @@ class LLMClient:
         # 去除首尾的引号和空格
         name = name.strip().strip('"\'""''')
         
-        # 替换不符合Windows文件系统规范的字符
-        invalid_chars = ['<', '>', ':', '"', '|', '?', '*', '/', '\\']
-        for char in invalid_chars:
-            name = name.replace(char, '_')
-        
-        # 去除尾部的点、空格、逗号、下划线等
-        name = name.rstrip('.,_ ')
+        # 替换不符合Windows文件系统规范的字符，并去除尾部的点、空格、逗号、下划线等
+        name = name.translate(_FILENAME_TRANS).rstrip('.,_ ')
         
         # 限制长度（Windows路径限制）
         if len(name) > 100:
@@ -683,7 +1907,7 @@ class LLMClient:
     def _parse_similarity_response(self, response: str) -> Dict[str, Any]:
         """解析相似性检查响应"""
         try:
-            result = json.loads(response)
+            result = _json_loads(response)
             return {
                 'is_similar': bool(result.get('is_similar', False)),
                 'similarity_score': float(result.get('similarity_score', 0.0)),
@@ -700,7 +1924,7 @@ class LLMClient:
         """解析文件夹建议响应"""
         try:
             # 首先尝试直接解析JSON
-            result = json.loads(response.strip())
+            result = _json_loads(response.strip())
             return {
                 'suggested_path': result.get('suggested_path', '').strip(),
                 'create_new': bool(result.get('create_new', True)),
@@ -709,30 +1933,16 @@ class LLMClient:
         except (json.JSONDecodeError, ValueError) as e:
             self.logger.warning(f"尝试JSON解析失败: {e}，尝试其他解析方法")
             
-            # 尝试提取被```包围的JSON
-            json_match = re.search(r'```(?:json)?\s*(\{.*?\})\s*```', response, re.DOTALL)
-            if json_match:
-                try:
-                    result = json.loads(json_match.group(1))
-                    return {
-                        'suggested_path': result.get('suggested_path', '').strip(),
-                        'create_new': bool(result.get('create_new', True)),
-                        'reasoning': result.get('reasoning', '')
-                    }
-                except (json.JSONDecodeError, ValueError):
-                    pass
-            
-            # 尝试查找单独JSON对象
-            json_match = re.search(r'\{[^{}]*"suggested_path"[^{}]*\}', response, re.DOTALL)
-            if json_match:
+            # 在响应文本中查找包含suggested_path的JSON对象（含```代码块中的JSON）
+            result = _extract_json_object(response, 'suggested_path')
+            if result is not None:
                 try:
-                    result = json.loads(json_match.group(0))
                     return {
                         'suggested_path': result.get('suggested_path', '').strip(),
                         'create_new': bool(result.get('create_new', True)),
                         'reasoning': result.get('reasoning', '')
                     }
-                except (json.JSONDecodeError, ValueError):
+                except (AttributeError, TypeError, ValueError):
                     pass
             
             # 文本提取作为回退
@@ -749,15 +1959,9 @@ class LLMClient:
             
             # 如果还是没找到，尝试从响应中提取可能的路径
             if not suggested_path:
-                # 查找可能的文件夹路径
-                folder_patterns = [
-                    r'会议纪要', r'项目文档', r'技术文档', r'财务报告', r'人力资源',
-                    r'管理制度', r'客户资料', r'培训材料', r'技术方案', r'项目管理'
-                ]
-                for pattern in folder_patterns:
-                    if re.search(pattern, response, re.IGNORECASE):
-                        suggested_path = pattern
-                        break
+                # 查找可能的文件夹路径：一次扫描找出所有出现的名称，再按优先级选取
+                found = set(_FALLBACK_FOLDERS_RE.findall(response))
+                suggested_path = next((name for name in _FALLBACK_FOLDERS if name in found), '')
             
             return {
                 'suggested_path': self._clean_filename(suggested_path),
@@ -780,26 +1984,72 @@ class LLMClient:
         # 最后的回退
         return '未分类文档'
     
-    def _find_exact_folder_match(self, subject: str, folders: List[str]) -> Optional[str]:
-        """查找精确匹配的文件夹 - 基于文本直接匹配"""
+    def _find_exact_folder_match(self, subject: str, folders: List[str],
+                                 leaf_names: Optional[List[str]] = None) -> Optional[str]:
+        """查找精确匹配的文件夹 - 基于文本直接匹配（leaf_names 为预先计算的各文件夹小写名称）"""
         subject_lower = subject.lower()
-        self.logger.info(f"精确匹配检查 - 主体: {subject_lower}")
-        self.logger.info(f"可用文件夹: {folders}")
-        
-        # 直接文本包含匹配
-        for folder_path in folders:
-            folder_name = folder_path.split('/')[-1].lower()
-            
-            # 检查文件夹名是否包含在主体中，或主体包含文件夹名
-            if folder_name in subject_lower or any(word in folder_name for word in subject_lower.split()):
-                self.logger.info(f"直接文本匹配: {folder_path}")
+        self.logger.info("精确匹配检查 - 主体: %s", subject_lower)
+        self.logger.info("可用文件夹: %s", folders)
+        
+        # 检查文件夹名是否包含在主体中，或主体中的词包含在文件夹名中
+        if leaf_names is None:
+            leaf_names = [folder_path.split('/')[-1].lower() for folder_path in folders]
+        matched_names = self._match_folder_names(subject_lower, frozenset(leaf_names))
+        for folder_path, folder_name in zip(folders, leaf_names):
+            if folder_name in matched_names:
+                self.logger.info("直接文本匹配: %s", folder_path)
                 return folder_path
         
         self.logger.info("未找到精确匹配")
         return None
     
-    def _find_semantic_folder_match(self, subject: str, folders: List[str]) -> Optional[str]:
-        """基于语义相似性的文件夹匹配 - 使用配置化规则，支持二级文件夹"""
+    def _match_folder_names(self, subject_lower: str, names: frozenset) -> set:
+        """找出出现在主体中、或包含主体中某个词的文件夹名"""
+        index = _folder_name_index(names)
+        
+        # 文件夹名包含在主体中：有自动机时一次扫描主体，否则逐个检查
+        automaton = index['automaton']
+        if automaton is not None:
+            matched = {name for _, name in automaton.iter(subject_lower)}
+            if '' in names:
+                matched.add('')
+        else:
+            matched = {name for name in names if name in subject_lower}
+        
+        # 主体中的词包含在文件夹名中：在拼接串中查找词的每次出现，再按起始位置反查文件夹名
+        joined, offsets, ordered = index['joined'], index['offsets'], index['names']
+        for word in set(subject_lower.split()):
+            position = joined.find(word)
+            while position != -1:
+                slot = bisect.bisect_right(offsets, position) - 1
+                matched.add(ordered[slot])
+                # 跳到下一个文件夹名，同一名称只需命中一次
+                next_start = offsets[slot + 1] if slot + 1 < len(offsets) else len(joined)
+                position = joined.find(word, next_start)
+        return matched
+    
+    def _find_semantic_folder_match(self, subject: str, folders: List[str],
+                                    folder_set: Optional[frozenset] = None,
+                                    memo: Optional[Dict[str, dict]] = None) -> Optional[str]:
+        """
+        基于语义相似性的文件夹匹配 - 使用配置化规则，支持二级文件夹
+        
+        folder_set 为预先构建的文件夹集合，memo 为与 folders 对应的匹配结果缓存（见 _get_folder_index），
+        同一文件夹列表下相同主体的结果直接复用
+        """
+        if memo is None:
+            return self._semantic_folder_match(subject, folders, folder_set, None)
+        
+        subject_lower = subject.lower()
+        result = memo['semantic_folders'].get(subject_lower, _MISSING)
+        if result is _MISSING:
+            result = self._semantic_folder_match(subject_lower, folders, folder_set, memo)
+            _memo_put(memo['semantic_folders'], subject_lower, result)
+        return result
+    
+    def _semantic_folder_match(self, subject: str, folders: List[str], folder_set: Optional[frozenset],
+                               memo: Optional[Dict[str, dict]]) -> Optional[str]:
+        """_find_semantic_folder_match 的实际匹配逻辑，不查结果缓存"""
         if not self.classification_rules:
             return None
         
@@ -811,107 +2061,115 @@ class LLMClient:
         strategy = self.classification_rules.get('strategy', {})
         threshold = strategy.get('semantic_threshold', 0.05)
         
-        category_scores = {}
-        
-        # 计算每个类别的匹配分数
-        for category_name, category_info in rules.items():
-            keywords = category_info.get('keywords', [])
-            priority = category_info.get('priority', 99)
-            
-            # 计算关键词匹配分数
-            matched_keywords = 0
-            for keyword in keywords:
-                if isinstance(keyword, str) and keyword.lower() in subject_lower:
-                    matched_keywords += 1
-            
-            if matched_keywords > 0:
-                # 基础分数：关键词匹配数 / 总关键词数
-                base_score = matched_keywords / len(keywords) if keywords else 0
-                # 优先级调整：优先级越高（数值越小），加分越多
-                priority_boost = max(0, (100 - priority) / 100 * 0.1)
-                # 最终分数
-                final_score = base_score + priority_boost
-                
-                if final_score >= threshold:
-                    category_scores[category_name] = {
-                        'score': final_score,
-                        'priority': priority,
-                        'info': category_info
-                    }
-        
-        if not category_scores:
+        # 计算每个命中关键词的类别的匹配分数，选择最佳匹配类别
+        category_scores = self._score_categories(subject_lower)
+        best_category_name = _best_scored_category(category_scores)
+        if best_category_name is None:
             return None
         
-        # 选择最佳匹配类别
-        best_category_name, best_info = max(
-            category_scores.items(),
-            key=lambda x: (x[1]['score'], -x[1]['priority'])
-        )
+        best_score, _, best_priority = category_scores[best_category_name]
+        if best_score < threshold:
+            return None
         
-        category_config = best_info['info']
+        category_config = rules[best_category_name]
         target_patterns = category_config.get('target_patterns', [])
         
-        self.logger.info(f"最佳语义类别: {best_category_name}, 分数: {best_info['score']:.3f}, 优先级: {best_info['priority']}")
+        self.logger.info("最佳语义类别: %s, 分数: %.3f, 优先级: %s", best_category_name, best_score, best_priority)
         
         # 第一步：在现有文件夹中寻找匹配的一级文件夹
-        primary_folder = None
-        for pattern in target_patterns:
-            for folder_path in folders:
-                if pattern in folder_path:
-                    primary_folder = folder_path
-                    break
-            if primary_folder:
-                break
+        primary_match = _first_pattern_folder(target_patterns, folders, memo['pattern_folders'] if memo is not None else None)
+        primary_folder = primary_match[1] if primary_match else None
         
         # 如果找到了一级文件夹，尝试智能匹配二级文件夹
         if primary_folder:
-            subfolder_name = self._find_best_subfolder(subject_lower, category_config)
+            subfolder_name = self._find_best_subfolder(subject_lower, best_category_name)
             
             if subfolder_name:
                 # 构建二级文件夹路径
                 secondary_path = f"{primary_folder}/{subfolder_name}"
                 
                 # 检查二级文件夹是否已存在于folders列表中
-                secondary_exists = any(folder == secondary_path for folder in folders)
+                if folder_set is None:
+                    folder_set = frozenset(folders)
                 
-                if secondary_exists:
+                if secondary_path in folder_set:
                     # 如果二级文件夹已存在，返回它
-                    self.logger.info(f"二级文件夹已存在 - 类别: {best_category_name}, 路径: {secondary_path}")
+                    self.logger.info("二级文件夹已存在 - 类别: %s, 路径: %s", best_category_name, secondary_path)
                     return secondary_path
                 else:
                     # 如果二级文件夹不存在，返回新的二级路径用于创建
-                    self.logger.info(f"创建二级文件夹 - 类别: {best_category_name}, 主文件夹: {primary_folder}, 子文件夹: {subfolder_name}")
+                    self.logger.info("创建二级文件夹 - 类别: %s, 主文件夹: %s, 子文件夹: %s", best_category_name, primary_folder, subfolder_name)
                     return secondary_path
             
             # 如果没有合适的二级分类，返回一级文件夹
-            self.logger.info(f"语义匹配成功 - 类别: {best_category_name}, 模式: {primary_folder}, 文件夹: {primary_folder}")
+            self.logger.info("语义匹配成功 - 类别: %s, 模式: %s, 文件夹: %s", best_category_name, primary_folder, primary_folder)
             return primary_folder
         
         # 如果没有找到现有的一级文件夹，尝试创建新的（可能包含二级）
         if target_patterns:
             primary_folder_name = target_patterns[0]  # 使用第一个模式作为主文件夹
-            subfolder_name = self._find_best_subfolder(subject_lower, category_config)
+            subfolder_name = self._find_best_subfolder(subject_lower, best_category_name)
             
             if subfolder_name:
                 new_path = f"{primary_folder_name}/{subfolder_name}"
-                self.logger.info(f"创建新的二级文件夹结构 - 类别: {best_category_name}, 路径: {new_path}")
+                self.logger.info("创建新的二级文件夹结构 - 类别: %s, 路径: %s", best_category_name, new_path)
                 return new_path
             else:
-                self.logger.info(f"创建新的一级文件夹 - 类别: {best_category_name}, 路径: {primary_folder_name}")
+                self.logger.info("创建新的一级文件夹 - 类别: %s, 路径: %s", best_category_name, primary_folder_name)
                 return primary_folder_name
         
         return None
     
+    def _count_category_keywords(self, subject_lower: str) -> Dict[str, int]:
+        """统计主体命中的各类别关键词数，只返回有命中的类别（按规则中的顺序）"""
+        index = self._keyword_index
+        categories = index['categories']
+        
+        # 找出主体中出现的关键词：有自动机时一次扫描主体，否则每个不同的关键词只检查一次
+        automaton = index['automaton']
+        if automaton is not None:
+            present = {keyword for _, keyword in automaton.iter(subject_lower)}
+            if '' in categories:
+                present.add('')
+        else:
+            present = [keyword for keyword in categories if keyword in subject_lower]
+        
+        counts = {}
+        for keyword in present:
+            for category_name, occurrences in categories[keyword].items():
+                counts[category_name] = counts.get(category_name, 0) + occurrences
+        
+        order = index['order']
+        return {name: counts[name] for name in sorted(counts, key=order.__getitem__)}
+    
+    def _score_categories(self, subject_lower: str) -> Dict[str, tuple]:
+        """
+        计算主体命中的各类别的匹配分数
+        
+        Returns:
+            类别到 (最终分数, 关键词匹配数, 优先级) 的映射，按规则中的顺序
+        """
+        scoring = self._keyword_index['scoring']
+        scores = {}
+        for category_name, keyword_matches in self._count_category_keywords(subject_lower).items():
+            keyword_count, priority, priority_boost = scoring[category_name]
+            # 基础分数：关键词匹配数 / 总关键词数，加上预先计算的优先级加分
+            base_score = keyword_matches / keyword_count if keyword_count else 0
+            scores[category_name] = (base_score + priority_boost, keyword_matches, priority)
+        return scores
+    
     def _find_similar_folder_match(self, subject: str, folders: List[str]) -> Optional[str]:
         """查找相似的文件夹（基于编辑距离或包含关系）"""
         subject_lower = subject.lower()
         
+        subject_words = set(subject_lower.split())
+        
         # 检查是否有文件夹名包含在主体中，或主体包含文件夹名
         best_match = None
         best_score = 0
         
         for folder_path in folders:
-            folder_name = folder_path.split('/')[-1].lower()  # 获取文件夹名称
+            folder_name = folder_path.rsplit('/', 1)[-1].lower()  # 获取文件夹名称
             
             # 计算相似度分数
             score = 0
@@ -921,77 +2179,40 @@ class LLMClient:
                 score += 0.8
             
             # 关键词重叠检查
-            subject_words = set(subject_lower.split())
-            folder_words = set(folder_name.split())
-            if subject_words & folder_words:  # 有交集
+            if not subject_words.isdisjoint(folder_name.split()):  # 有交集
                 score += 0.6
             
             # 如果分数足够高，记录为最佳匹配
             if score > best_score and score >= 0.6:
                 best_score = score
                 best_match = folder_path
+                # 两项检查都命中已是最高分，后面的文件夹不可能超过
+                if score >= 1.4:
+                    break
         
         return best_match 
     
-    def _force_existing_folder_match(self, subject: str, folders: List[str]) -> Optional[str]:
-        """强制从现有文件夹中选择一个匹配的 - 通用分类策略"""
+    def _force_existing_folder_match(self, subject: str, folders: List[str],
+                                     folder_set: Optional[frozenset] = None,
+                                     memo: Optional[Dict[str, dict]] = None) -> Optional[str]:
+        """强制从现有文件夹中选择一个匹配的 - 通用分类策略（参数含义同 _find_semantic_folder_match）"""
         subject_lower = subject.lower()
         
         # 第一步：尝试语义匹配
-        semantic_match = self._find_semantic_folder_match(subject_lower, folders)
+        semantic_match = self._find_semantic_folder_match(subject_lower, folders, folder_set, memo)
         if semantic_match:
             return semantic_match
         
-        # 第二步：基于通用分类策略的强制分配
-        # 优先级从高到低的通用分类
-        generic_classification_rules = [
-            # 技术相关
-            {
-                'keywords': ['技术', '开发', '系统', '软件', '代码', '程序', '工程', 'tech', 'dev'],
-                'target_patterns': ['技术', '开发', '工程', 'tech']
-            },
-            # 管理相关
-            {
-                'keywords': ['管理', '项目', '计划', '规划', '策略', 'management', 'project'],
-                'target_patterns': ['项目', '管理', 'project']
-            },
-            # 业务相关
-            {
-                'keywords': ['业务', '流程', '规范', '标准', '需求', 'business'],
-                'target_patterns': ['业务', '流程', 'business']
-            },
-            # 人事相关
-            {
-                'keywords': ['人事', '人力', '员工', '招聘', '培训', '面试', 'hr'],
-                'target_patterns': ['人力资源', '人事', 'hr', '培训']
-            },
-            # 财务相关
-            {
-                'keywords': ['财务', '预算', '成本', '费用', '报告', 'finance'],
-                'target_patterns': ['财务', 'finance', '报告']
-            },
-            # 会议交流相关
-            {
-                'keywords': ['会议', '纪要', '讨论', '沟通', 'meeting'],
-                'target_patterns': ['会议', 'meeting', '沟通']
-            },
-            # 学习成长相关
-            {
-                'keywords': ['学习', '成长', '知识', '教育', '哲学', '思考'],
-                'target_patterns': ['学习', '成长', '知识', '教育']
-            }
-        ]
-        
-        # 按规则检查并分配
-        for rule in generic_classification_rules:
-            # 检查主体是否包含该分类的关键词
-            if any(keyword in subject_lower for keyword in rule['keywords']):
-                # 在现有文件夹中寻找匹配的模式
-                for pattern in rule['target_patterns']:
-                    for folder_path in folders:
-                        if pattern in folder_path:
-                            self.logger.info(f"通用分类匹配 - 关键词: {rule['keywords']}, 模式: {pattern}, 文件夹: {folder_path}")
-                            return folder_path
+        # 第二步：基于通用分类策略的强制分配（优先级从高到低）
+        # 按规则检查并分配：只检查主体中出现了关键词的分类
+        for rule_index in _match_generic_rules(subject_lower):
+            rule = _GENERIC_CLASSIFICATION_RULES[rule_index]
+            # 在现有文件夹中寻找匹配的模式
+            match = _first_pattern_folder(rule['target_patterns'], folders, memo['pattern_folders'] if memo is not None else None)
+            if match:
+                pattern, folder_path = match
+                self.logger.info("通用分类匹配 - 关键词: %s, 模式: %s, 文件夹: %s", rule['keywords'], pattern, folder_path)
+                return folder_path
         
         # 第三步：如果还是没有匹配，使用最通用的策略
         return self._get_most_generic_folder(folders)
@@ -1003,30 +2224,41 @@ class LLMClient:
             '文档', '资料', '其他', '未分类', '通用', 'documents', 'files', 'misc'
         ])
         
-        # 寻找最通用的文件夹
+        # 寻找最通用的文件夹（文件夹名只转换一次小写）
+        folders_lower = [folder_path.lower() for folder_path in folders]
         for priority_name in fallback_list:
-            for folder_path in folders:
-                if priority_name.lower() in folder_path.lower():
-                    self.logger.info(f"使用配置化回退文件夹: {folder_path}")
+            priority_lower = priority_name.lower()
+            for folder_path, folder_lower in zip(folders, folders_lower):
+                if priority_lower in folder_lower:
+                    self.logger.info("使用配置化回退文件夹: %s", folder_path)
                     return folder_path
         
         # 如果还是没有，使用第一个顶级文件夹
         top_level_folders = [f for f in folders if '/' not in f and '\\' not in f]
         if top_level_folders:
             result = top_level_folders[0]
-            self.logger.info(f"使用第一个顶级文件夹: {result}")
+            self.logger.info("使用第一个顶级文件夹: %s", result)
             return result
         
         # 最后的回退：使用第一个可用文件夹
         if folders:
             result = folders[0]
-            self.logger.info(f"使用第一个可用文件夹: {result}")
+            self.logger.info("使用第一个可用文件夹: %s", result)
             return result
         
         return None
     
     def _find_semantic_category_match(self, subject: str) -> Optional[str]:
-        """基于语义相似性找到分类类别（不依赖现有文件夹）"""
+        """基于语义相似性找到分类类别（不依赖现有文件夹，分类规则只在初始化时加载，结果按小写主体缓存）"""
+        subject_lower = subject.lower()
+        result = self._category_matches.get(subject_lower, _MISSING)
+        if result is _MISSING:
+            result = self._semantic_category_match(subject_lower)
+            _memo_put(self._category_matches, subject_lower, result)
+        return result
+    
+    def _semantic_category_match(self, subject: str) -> Optional[str]:
+        """_find_semantic_category_match 的实际匹配逻辑，不查结果缓存"""
         if not self.classification_rules:
             self.logger.warning("分类规则未加载")
             return None
@@ -1037,56 +2269,24 @@ class LLMClient:
             return None
         
         subject_lower = subject.lower()
-        category_scores = {}
         
-        # 计算每个分类的匹配分数
-        for category_name, category_info in rules.items():
-            keywords = category_info.get('keywords', [])
-            priority = category_info.get('priority', 99)
-            
-            # 计算关键词匹配分数
-            keyword_matches = 0
-            for keyword in keywords:
-                if isinstance(keyword, str) and keyword.lower() in subject_lower:
-                    keyword_matches += 1
-            
-            if keyword_matches > 0:
-                # 基础分数：关键词匹配数 / 总关键词数
-                base_score = keyword_matches / len(keywords) if keywords else 0
-                
-                # 优先级调整：优先级越高（数值越小），加分越多
-                priority_boost = max(0, (100 - priority) / 100 * 0.1)
-                
-                # 最终分数
-                final_score = base_score + priority_boost
-                
-                category_scores[category_name] = {
-                    'score': final_score,
-                    'keyword_matches': keyword_matches,
-                    'priority': priority
-                }
-                
-                self.logger.info(f"分类匹配 - {category_name}: 分数={final_score:.3f}, 关键词匹配={keyword_matches}, 优先级={priority}")
+        # 计算每个命中关键词的分类的匹配分数
+        category_scores = self._score_categories(subject_lower)
+        if self.logger.isEnabledFor(logging.INFO):
+            for category_name, (final_score, keyword_matches, priority) in category_scores.items():
+                self.logger.info("分类匹配 - %s: 分数=%.3f, 关键词匹配=%s, 优先级=%s", category_name, final_score, keyword_matches, priority)
+        
+        # 选择最佳匹配：优先按分数，然后按优先级
+        best_category_name = _best_scored_category(category_scores)
         
-        # 检查是否有足够高的匹配分数
+        # 检查是否有足够高的匹配分数（最高分未达到阈值时没有类别达到阈值）
         strategy = self.classification_rules.get('strategy', {})
         min_threshold = strategy.get('semantic_threshold', 0.05)
         
-        valid_categories = {k: v for k, v in category_scores.items() if v['score'] >= min_threshold}
-        
-        if not valid_categories:
-            self.logger.info(f"没有类别达到阈值 {min_threshold}")
-            return None
-        
-        if not category_scores:
+        if best_category_name is None or category_scores[best_category_name][0] < min_threshold:
+            self.logger.info("没有类别达到阈值 %s", min_threshold)
             return None
         
-        # 选择最佳匹配：优先按分数，然后按优先级
-        best_category_name, best_info = max(
-            category_scores.items(),
-            key=lambda x: (x[1]['score'], -x[1]['priority'])
-        )
-        
         # 获取该类别的配置信息
         category_config = rules[best_category_name]
         target_patterns = category_config.get('target_patterns', [])
@@ -1095,23 +2295,23 @@ class LLMClient:
             return None
         
         # 尝试智能匹配二级文件夹
-        subfolder_name = self._find_best_subfolder(subject_lower, category_config)
+        subfolder_name = self._find_best_subfolder(subject_lower, best_category_name)
         
         # 构建最终路径
         primary_folder = target_patterns[0]  # 使用第一个模式作为主文件夹
         
         if subfolder_name:
             final_path = f"{primary_folder}/{subfolder_name}"
-            self.logger.info(f"二级文件夹匹配 - 主分类: {best_category_name}, 主文件夹: {primary_folder}, 子文件夹: {subfolder_name}")
+            self.logger.info("二级文件夹匹配 - 主分类: %s, 主文件夹: %s, 子文件夹: %s", best_category_name, primary_folder, subfolder_name)
         else:
             final_path = primary_folder
-            self.logger.info(f"一级文件夹匹配 - 主分类: {best_category_name}, 文件夹: {primary_folder}")
+            self.logger.info("一级文件夹匹配 - 主分类: %s, 文件夹: %s", best_category_name, primary_folder)
         
         return final_path
     
-    def _find_best_subfolder(self, subject_lower: str, category_config: dict) -> Optional[str]:
-        """根据文档内容智能匹配最合适的二级文件夹"""
-        subfolders = category_config.get('subfolders', {})
+    def _find_best_subfolder(self, subject_lower: str, category_name: str) -> Optional[str]:
+        """根据文档内容智能匹配最合适的二级文件夹（子文件夹关键词已在规则索引中预先转为小写）"""
+        subfolders = self._keyword_index['subfolders'].get(category_name)
         
         if not subfolders:
             return None
@@ -1120,29 +2320,24 @@ class LLMClient:
         best_score = 0
         
         # 计算每个子文件夹的匹配分数
-        for subfolder_name, subfolder_config in subfolders.items():
-            keywords = subfolder_config.get('keywords', [])
-            
+        for subfolder_name, keywords_lower, keyword_count in subfolders:
             # 计算关键词匹配分数
-            matches = 0
-            for keyword in keywords:
-                if isinstance(keyword, str) and keyword.lower() in subject_lower:
-                    matches += 1
+            matches = sum(1 for keyword in keywords_lower if keyword in subject_lower)
             
             if matches > 0:
-                score = matches / len(keywords) if keywords else 0
+                score = matches / keyword_count
                 
                 if score > best_score:
                     best_score = score
                     best_subfolder = subfolder_name
                     
-                self.logger.info(f"子文件夹匹配检查 - {subfolder_name}: 分数={score:.3f}, 匹配数={matches}")
+                self.logger.info("子文件夹匹配检查 - %s: 分数=%.3f, 匹配数=%s", subfolder_name, score, matches)
         
         # 只有当匹配分数足够高时才返回子文件夹
         min_subfolder_threshold = 0.1  # 至少10%的关键词匹配
         if best_score >= min_subfolder_threshold:
-            self.logger.info(f"选中子文件夹: {best_subfolder} (分数: {best_score:.3f})")
+            self.logger.info("选中子文件夹: %s (分数: %.3f)", best_subfolder, best_score)
             return best_subfolder
         
-        self.logger.info(f"子文件夹匹配分数过低 (最高: {best_score:.3f}), 使用一级文件夹")
+        self.logger.info("子文件夹匹配分数过低 (最高: %.3f), 使用一级文件夹", best_score)
         return None 
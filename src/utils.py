@@ -4,12 +4,40 @@
 """
 
 import os
+import re
+import sys
+import queue
+import atexit
+import multiprocessing
+import platform
 import logging
+import logging.handlers
 from pathlib import Path
 from typing import Dict, Any
 from colorama import Fore, Style
 
 
+# Windows和Unix共同的非法字符，统一替换为下划线
+_SANITIZE_TABLE = str.maketrans({char: '_' for char in '<>:"|?*'})
+
+# 后台写日志文件的监听线程，重复调用 setup_logging 时先停止旧的
+_log_listener = None
+_log_queue_handler = None
+
+# 进程池子进程中由 use_parent_log_queue 设置：日志记录交给主进程写入日志文件
+_parent_log_queue = None
+
+# 词数统计：单个中文字符或完整的英文单词
+_WORD_RE = re.compile(r'[\u4e00-\u9fff]|\b[a-zA-Z]+\b')
+
+# Windows保留名称
+_RESERVED_NAMES = frozenset({
+    'CON', 'PRN', 'AUX', 'NUL',
+    'COM1', 'COM2', 'COM3', 'COM4', 'COM5', 'COM6', 'COM7', 'COM8', 'COM9',
+    'LPT1', 'LPT2', 'LPT3', 'LPT4', 'LPT5', 'LPT6', 'LPT7', 'LPT8', 'LPT9'
+})
+
+
 def setup_logging(config: Dict[str, Any], verbose: bool = False):
     """
     设置日志系统
@@ -40,20 +68,45 @@ def setup_logging(config: Dict[str, Any], verbose: bool = False):
     console_formatter = logging.Formatter('%(levelname)s - %(message)s')
     console_handler.setFormatter(console_formatter)
     
-    # 文件处理器
-    log_file = config['output']['log_file']
-    if log_file:
+    # 文件处理器：写文件由后台线程完成，调用日志的线程只把记录放入队列
+    global _log_listener, _log_queue_handler
+    if _log_listener is not None:
+        _log_listener.stop()
+        _log_listener = None
+    if _log_queue_handler is not None:
+        logging.getLogger().removeHandler(_log_queue_handler)
+        _log_queue_handler = None
+    
+    output_config = config['output']
+    log_file = output_config['log_file']
+    if log_file and _parent_log_queue is not None:
+        # 子进程不直接写日志文件（轮转文件不能被多个进程同时写入），记录转交主进程
+        _log_queue_handler = logging.handlers.QueueHandler(_parent_log_queue)
+        logging.getLogger().addHandler(_log_queue_handler)
+    elif log_file:
         log_path = Path(log_file)
         log_path.parent.mkdir(parents=True, exist_ok=True)
         
-        file_handler = logging.FileHandler(log_file, encoding='utf-8')
+        # 按大小轮转，delay=True 时首次写入才打开文件
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_file,
+            maxBytes=output_config.get('log_max_bytes', 10 * 1024 * 1024),
+            backupCount=output_config.get('log_backup_count', 5),
+            encoding='utf-8',
+            delay=True
+        )
         file_handler.setLevel(logging.DEBUG)  # 文件中记录更详细的日志
         file_formatter = logging.Formatter(log_format)
         file_handler.setFormatter(file_formatter)
         
+        log_queue = queue.Queue(-1)
+        _log_queue_handler = logging.handlers.QueueHandler(log_queue)
+        _log_listener = logging.handlers.QueueListener(log_queue, file_handler, respect_handler_level=True)
+        _log_listener.start()
+        
         # 添加处理器到根日志器
         root_logger = logging.getLogger()
-        root_logger.addHandler(file_handler)
+        root_logger.addHandler(_log_queue_handler)
     
     # 只在非详细模式下添加控制台处理器，避免重复输出
     if not verbose:
@@ -65,6 +118,37 @@ def setup_logging(config: Dict[str, Any], verbose: bool = False):
     logging.getLogger('requests').setLevel(logging.WARNING)
 
 
+def forward_worker_logs():
+    """
+    创建进程池子进程使用的日志队列，子进程的记录由主进程写入日志文件
+    
+    需在主进程调用 setup_logging 之后调用，用完后调用返回的监听器的 stop()。
+    
+    Returns:
+        (日志队列, 监听器)，未配置日志文件时为 (None, None)
+    """
+    if _log_queue_handler is None:
+        return None, None
+    
+    log_queue = multiprocessing.Queue(-1)
+    listener = logging.handlers.QueueListener(log_queue, _log_queue_handler)
+    listener.start()
+    return log_queue, listener
+
+
+def use_parent_log_queue(log_queue):
+    """在子进程中调用：之后的 setup_logging 把日志记录交给主进程写入"""
+    global _parent_log_queue
+    _parent_log_queue = log_queue
+
+
+@atexit.register
+def _stop_log_listener():
+    """退出时停止日志监听线程，写完队列中剩余的日志"""
+    if _log_listener is not None:
+        _log_listener.stop()
+
+
 def print_banner():
     """打印程序横幅"""
     banner = f"""
@@ -180,23 +264,11 @@ def sanitize_path_component(component: str) -> str:
     Returns:
         清理后的路径组件
     """
-    # Windows和Unix共同的非法字符
-    invalid_chars = '<>:"|?*'
-    
-    for char in invalid_chars:
-        component = component.replace(char, '_')
-    
-    # 移除首尾空格和点
-    component = component.strip(' .')
+    # 一次替换全部非法字符，并移除首尾空格和点
+    component = component.translate(_SANITIZE_TABLE).strip(' .')
     
     # 检查是否为保留名称（Windows）
-    reserved_names = {
-        'CON', 'PRN', 'AUX', 'NUL',
-        'COM1', 'COM2', 'COM3', 'COM4', 'COM5', 'COM6', 'COM7', 'COM8', 'COM9',
-        'LPT1', 'LPT2', 'LPT3', 'LPT4', 'LPT5', 'LPT6', 'LPT7', 'LPT8', 'LPT9'
-    }
-    
-    if component.upper() in reserved_names:
+    if component.upper() in _RESERVED_NAMES:
         component = f"_{component}"
     
     return component
@@ -237,15 +309,8 @@ def count_words(text: str) -> int:
     Returns:
         词数
     """
-    import re
-    
-    # 中文字符计数
-    chinese_chars = len(re.findall(r'[\u4e00-\u9fff]', text))
-    
-    # 英文单词计数
-    english_words = len(re.findall(r'\b[a-zA-Z]+\b', text))
-    
-    return chinese_chars + english_words
+    # 中文字符和英文单词一次扫描计数，subn 只返回替换次数，不构建匹配列表
+    return _WORD_RE.subn('', text)[1]
 
 
 def progress_bar(current: int, total: int, width: int = 50) -> str:
@@ -277,9 +342,6 @@ def get_system_info() -> Dict[str, str]:
     Returns:
         系统信息字典
     """
-    import platform
-    import sys
-    
     return {
         'platform': platform.system(),
         'platform_version': platform.version(),